@@ -5,6 +5,7 @@ import time
 import uuid
 import json
 import shutil
+import hashlib
 import logging
 import datetime
 from pathlib import Path
@@ -14,28 +15,39 @@ import csv
 import tempfile
 
 from flask import Flask, request, render_template, redirect, url_for, flash, session, jsonify, send_file, abort
-from flask_wtf.csrf import CSRFProtect
+from flask_wtf.csrf import CSRFProtect, CSRFError, generate_csrf
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_mail import Mail, Message
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import RequestEntityTooLarge, Forbidden, NotFound
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
-import string
 import pandas as pd
 
 # Local imports
-from models import db, User, ResumeAnalysis, ResumeFile, ScoringWeights, initialize_db
+from models import db, ResumeAnalysis, ResumeFile, ScoringWeights, initialize_db, ALL_USERS, UNFINISHED_STATUSES
 from auth import auth_bp, init_login_manager
 from forms import LoginForm, RegistrationForm, ResetPasswordRequestForm, ResetPasswordForm
-from forms import ProfileForm, ResumeAnalysisForm, ScoringWeightsForm, ExportResultsForm
-from utils import extract_text_from_file
+from forms import ProfileForm, ResumeAnalysisForm, ScoringWeightsForm, ExportResultsForm, CorpusSearchForm
+from forms import ReverseMatchForm
+from utils import buffer_upload, write_upload, sniff_upload, sniff_bytes, rejection_reason, InMemoryUpload
+from utils import iter_zip_members
+from scoring import score_resumes
+from preprocessing import get_preprocessor
+from sections import tokenize_sections
+from idf_model import init_idf_model, get_idf_model
+from lsa_model import init_lsa_model, get_lsa_model
+from pipeline import extraction_options, persist_uploads, DEFAULT_WORKERS, DEFAULT_TIMEOUT, DEFAULT_MEMORY_LIMIT_MB
+from cache import init_extraction_cache, init_score_cache, get_score_cache, init_count_cache, get_count_cache
+from jobs import run_analysis, enqueue_analysis, get_analysis_status, begin_upload, queue_uploaded_files, match_resume
+from jobs import skill_reports, schedule_skill_backfill, expire_uploads
+from chunked_uploads import write_chunk, complete_upload, received_bytes, DEFAULT_CHUNK_SIZE
+from corpus_index import init_corpus_search, get_corpus_search
+from skills import init_skill_matcher
+from pagination import keyset_paginate
+from query_budget import query_budget
+from stats import init_stats_rollup, get_stats_rollup, get_totals, daily_series
 
 # Create Flask application
 app = Flask(__name__)
@@ -52,7 +64,7 @@ app.config.from_mapping(
     SECURITY_PASSWORD_SALT=os.environ.get('SECURITY_PASSWORD_SALT', 'salt_replace_in_production'),
     UPLOAD_FOLDER='uploads/',
     MAX_CONTENT_LENGTH=10 * 1024 * 1024,  # 10 MB max file size
-    ALLOWED_EXTENSIONS={'pdf', 'doc', 'docx', 'txt'},
+    ALLOWED_EXTENSIONS={'pdf', 'doc', 'docx', 'txt', 'zip'},
     SESSION_TIMEOUT=3600,  # 1 hour in seconds
     MAIL_SERVER=os.environ.get('MAIL_SERVER', 'smtp.example.com'),
     MAIL_PORT=int(os.environ.get('MAIL_PORT', 587)),
@@ -60,9 +72,52 @@ app.config.from_mapping(
     MAIL_USERNAME=os.environ.get('MAIL_USERNAME', 'user@example.com'),
     MAIL_PASSWORD=os.environ.get('MAIL_PASSWORD', 'password'),
     MAIL_DEFAULT_SENDER=os.environ.get('MAIL_DEFAULT_SENDER', 'Resume Analyzer <noreply@resumeanalyzer.com>'),
-    RESULTS_PER_PAGE=10
+    RESULTS_PER_PAGE=10,
+    ANALYSIS_RESULTS_PER_PAGE=int(os.environ.get('ANALYSIS_RESULTS_PER_PAGE', 50)),  # Resumes per results page
+    IDF_MODEL_PATH=os.environ.get('IDF_MODEL_PATH'),  # Defaults to instance/models/idf_model.joblib
+    IDF_MIN_DOCUMENTS=int(os.environ.get('IDF_MIN_DOCUMENTS', 20)),
+    SCORING_MODE=os.environ.get('SCORING_MODE', 'tfidf'),  # 'tfidf' or 'lsa' (dense TruncatedSVD vectors)
+    LSA_MODEL_PATH=os.environ.get('LSA_MODEL_PATH'),  # Defaults to instance/models/lsa_model.joblib
+    LSA_COMPONENTS=int(os.environ.get('LSA_COMPONENTS', 256)),  # Dimensions of the dense vectors
+    LSA_MIN_DOCUMENTS=int(os.environ.get('LSA_MIN_DOCUMENTS', 500)),  # Stored resumes before the first fit
+    EXTRACTION_WORKERS=int(os.environ.get('EXTRACTION_WORKERS', DEFAULT_WORKERS)),  # 0 extracts inline, unsandboxed
+    EXTRACTION_TIMEOUT=int(os.environ.get('EXTRACTION_TIMEOUT', DEFAULT_TIMEOUT)),  # Seconds per file
+    EXTRACTION_MEMORY_LIMIT_MB=int(os.environ.get('EXTRACTION_MEMORY_LIMIT_MB', DEFAULT_MEMORY_LIMIT_MB)),
+    ANALYSIS_JOB_CHUNK_SIZE=int(os.environ.get('ANALYSIS_JOB_CHUNK_SIZE', 8)),  # Files scored between progress updates
+    ANALYSIS_JOB_POLL_INTERVAL=float(os.environ.get('ANALYSIS_JOB_POLL_INTERVAL', 2)),  # Seconds
+    ANALYSIS_JOB_STALE_AFTER=int(os.environ.get('ANALYSIS_JOB_STALE_AFTER', 600)),  # Seconds without a heartbeat
+    EXTRACTION_CACHE_PATH=os.environ.get('EXTRACTION_CACHE_PATH'),  # Defaults to instance/extraction_cache.db
+    EXTRACTION_CACHE_MEMORY_MB=int(os.environ.get('EXTRACTION_CACHE_MEMORY_MB', 64)),
+    EXTRACTION_CACHE_DISK_MB=int(os.environ.get('EXTRACTION_CACHE_DISK_MB', 512)),
+    QUERY_BUDGET_ENFORCE=os.environ.get('QUERY_BUDGET_ENFORCE', 'False').lower() in ('true', 'yes', '1'),  # Fail views over their @query_budget (tests)
+    SCORE_CACHE_ENTRIES=int(os.environ.get('SCORE_CACHE_ENTRIES', 100000)),
+    STATS_ROLLUP_INTERVAL=int(os.environ.get('STATS_ROLLUP_INTERVAL', 60)),  # Seconds between dashboard statistics roll-ups
+    LISTING_COUNT_TTL=int(os.environ.get('LISTING_COUNT_TTL', 60)),  # Seconds a history total is reused
+    PDF_MAX_PAGES=int(os.environ.get('PDF_MAX_PAGES', 50)),  # Pages read per PDF
+    EXTRACTED_TEXT_MAX_CHARS=int(os.environ.get('EXTRACTED_TEXT_MAX_CHARS', 200000)),  # Characters kept per file
+    IN_MEMORY_UPLOAD_MAX_BYTES=int(os.environ.get('IN_MEMORY_UPLOAD_MAX_BYTES', 2 * 1024 * 1024)),  # 0 always saves first
+    IN_MEMORY_UPLOADS_MAX_BYTES=int(os.environ.get('IN_MEMORY_UPLOADS_MAX_BYTES', 32 * 1024 * 1024)),  # Per analysis; later files are saved first
+    RETAIN_UPLOADS=os.environ.get('RETAIN_UPLOADS', 'True').lower() in ('true', 'yes', '1'),  # Keep copies in UPLOAD_FOLDER
+    ZIP_MAX_MEMBERS=int(os.environ.get('ZIP_MAX_MEMBERS', 500)),  # Files per uploaded archive
+    ZIP_MAX_UNCOMPRESSED_MB=int(os.environ.get('ZIP_MAX_UNCOMPRESSED_MB', 200)),  # Total size of the files read from an archive
+    ZIP_MAX_COMPRESSION_RATIO=int(os.environ.get('ZIP_MAX_COMPRESSION_RATIO', 100)),  # Per member, guards against zip bombs
+    UPLOAD_CHUNK_SIZE=int(os.environ.get('UPLOAD_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)),  # Must stay below MAX_CONTENT_LENGTH
+    CHUNKED_UPLOAD_MAX_FILE_MB=int(os.environ.get('CHUNKED_UPLOAD_MAX_FILE_MB', 50)),  # Per file
+    CHUNKED_UPLOAD_TTL=int(os.environ.get('CHUNKED_UPLOAD_TTL', 24 * 3600)),  # Seconds without a chunk before an upload expires
+    UPLOAD_API_RATE_LIMIT=os.environ.get('UPLOAD_API_RATE_LIMIT', '5000 per hour'),  # Chunked upload API requests
+    MAX_FILES_PER_ANALYSIS=int(os.environ.get('MAX_FILES_PER_ANALYSIS', 500)),  # Resume files per analysis, archive members included
+    ANALYSIS_STATUS_RATE_LIMIT=os.environ.get('ANALYSIS_STATUS_RATE_LIMIT', '2000 per hour'),  # Results page and its progress polling
+    CORPUS_INDEX_MAX_USERS=int(os.environ.get('CORPUS_INDEX_MAX_USERS', 32)),  # Resume pool indexes kept in memory
+    CORPUS_SEARCH_MAX_RESULTS=int(os.environ.get('CORPUS_SEARCH_MAX_RESULTS', 100)),
+    REVERSE_MATCH_MAX_JOBS=int(os.environ.get('REVERSE_MATCH_MAX_JOBS', 500)),  # Job descriptions per reverse match
+    SKILLS_DICTIONARY_PATH=os.environ.get('SKILLS_DICTIONARY_PATH')  # Defaults to data/skills.txt
 )
 
+# Ensure the logs and uploads directories exist
+for directory in ['logs', app.config['UPLOAD_FOLDER']]:
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, 
@@ -74,11 +129,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger('resume_analyzer')
 
-# Ensure the logs and uploads directories exist
-for directory in ['logs', app.config['UPLOAD_FOLDER']]:
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-
 # Download required NLTK resources
 try:
     nltk.download('punkt', quiet=True)
@@ -105,6 +155,28 @@ initialize_db(app)
 # Initialize login manager
 init_login_manager(app)
 
+# Load the corpus IDF model and refresh it in the background
+init_idf_model(app)
+
+# Load the LSA projection when the 'lsa' scoring mode is enabled
+init_lsa_model(app)
+
+# Initialize the extracted text, score and listing count caches
+init_extraction_cache(app)
+init_score_cache(app)
+init_count_cache(app)
+
+# Per-user indexes for searching the stored resume pool
+init_corpus_search(app)
+
+# Build the skill dictionary matcher once per process, and rescan files
+# whose skill hits predate it in the background
+init_skill_matcher(app)
+schedule_skill_backfill(app)
+
+# Bring the dashboard statistics up to date in the background
+init_stats_rollup(app)
+
 # Admin required decorator
 def admin_required(f):
     @wraps(f)
@@ -121,14 +193,23 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
 def clean_old_uploads():
-    """Clean up upload files older than the session timeout"""
+    """Expire abandoned uploads, then clean up upload files older than the session timeout, except those of unfinished files"""
     try:
         current_time = time.time()
         timeout = app.config['SESSION_TIMEOUT']
         
+        # Abandoned uploads are failed first so their files are no longer kept
+        expire_uploads(app.config['UPLOAD_FOLDER'], app.config['CHUNKED_UPLOAD_TTL'])
+        
+        # Files still uploading or waiting in the job queue are kept however old they are
+        in_use = set()
+        for (stored_filename,) in ResumeFile.query.filter(ResumeFile.status.in_(UNFINISHED_STATUSES)) \
+                .with_entities(ResumeFile.stored_filename):
+            in_use.update((stored_filename, f"{stored_filename}.part"))
+        
         for file_path in Path(app.config['UPLOAD_FOLDER']).glob('*'):
-            # Skip directories
-            if file_path.is_dir():
+            # Skip directories and unfinished files
+            if file_path.is_dir() or file_path.name in in_use:
                 continue
                 
             # Check file age
@@ -157,84 +238,25 @@ def send_email(to, subject, template):
 
 def preprocess_text(text):
     """
-    Preprocess text by performing:
-    1. Lowercase conversion
-    2. Punctuation removal
-    3. Stopword removal
-    4. Lemmatization
+    Preprocess text into a single string using the shared preprocessor.
+    Prefer get_preprocessor().tokenize() when the tokens are scored directly.
     """
-    if not text:
-        return ""
-    
-    try:
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove punctuation
-        text = text.translate(str.maketrans('', '', string.punctuation))
-        
-        # Remove numbers
-        text = re.sub(r'\d+', '', text)
-        
-        # Simple word tokenization
-        tokens = text.split()
-        
-        # Remove stopwords
-        stop_words = set(stopwords.words('english'))
-        filtered_tokens = [w for w in tokens if not w in stop_words]
-        
-        # Lemmatize
-        lemmatizer = WordNetLemmatizer()
-        lemmatized_tokens = [lemmatizer.lemmatize(token) for token in filtered_tokens]
-        
-        # Join tokens back into text
-        return ' '.join(lemmatized_tokens)
-    except Exception as e:
-        logger.error(f"Error preprocessing text: {e}")
-        return text  # Return original text if preprocessing fails
+    return get_preprocessor().preprocess(text)
 
 def calculate_similarity(resume_text, job_description, weights=None):
     """
-    Calculate similarity between resume text and job description using:
-    1. TF-IDF vectorization
-    2. Cosine similarity
-    3. Optional scoring weights
+    Calculate similarity between a single resume text and job description.
+    Thin wrapper around the batch scorer for one-off comparisons; weights
+    are applied to the resume sections.
     """
     try:
         if not resume_text or not job_description:
             return 0.0
         
-        documents = [resume_text, job_description]
-        
-        # Default weights if none provided
-        if weights is None:
-            weights = {
-                'skills': 0.4,
-                'education': 0.2,
-                'experience': 0.3,
-                'certifications': 0.1
-            }
-        
-        # TF-IDF with advanced parameters
-        vectorizer = TfidfVectorizer(
-            max_features=10000,  # Limit features to improve performance
-            min_df=1,           # Minimum document frequency
-            max_df=0.95,         # Maximum document frequency
-            ngram_range=(1, 2),  # Use unigrams and bigrams
-            stop_words='english' # Built-in stopwords
-        )
-        
-        tfidf_matrix = vectorizer.fit_transform(documents)
-        
-        # Calculate cosine similarity
-        base_similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
-        
-        # Apply weights if document sections are identified
-        # This is a simplified approach; in a real implementation, you'd need to identify
-        # document sections more robustly
-        final_score = base_similarity
-        
-        return max(0.0, min(final_score, 1.0))  # Constrain between 0 and 1
+        preprocessor = get_preprocessor()
+        resume_tokens, resume_sections = tokenize_sections(resume_text, preprocessor)
+        return score_resumes(preprocessor.tokenize(job_description), [resume_tokens], get_idf_model(),
+                             [resume_sections], weights)[0]
     except Exception as e:
         logger.error(f"Error calculating similarity: {e}")
         return 0.0  # Return 0 similarity on error
@@ -242,8 +264,10 @@ def calculate_similarity(resume_text, job_description, weights=None):
 def export_results_as_csv(analysis):
     """Export analysis results as CSV file"""
     try:
-        results = analysis.get_results()
-        resume_files = analysis.resume_files.all()
+        rows = analysis.ranked_files() \
+            .with_entities(ResumeFile.original_filename, ResumeFile.score, ResumeFile.file_type,
+                           ResumeFile.created_at) \
+            .yield_per(500)
         
         # Create a temporary file
         with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as tmp:
@@ -254,17 +278,14 @@ def export_results_as_csv(analysis):
             # Write header
             writer.writerow(['Filename', 'Score', 'File Type', 'Date Analyzed'])
             
-            # Write data rows
-            for result in results:
-                filename, score = result
-                file_obj = next((f for f in resume_files if f.original_filename == filename), None)
-                if file_obj:
-                    writer.writerow([
-                        filename,
-                        f"{score:.2f}",
-                        file_obj.file_type,
-                        file_obj.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                    ])
+            # Write data rows, best match first
+            for filename, score, file_type, created_at in rows:
+                writer.writerow([
+                    filename,
+                    f"{score:.2f}",
+                    file_type,
+                    created_at.strftime('%Y-%m-%d %H:%M:%S')
+                ])
             
             csv_file.close()
             
@@ -293,6 +314,15 @@ def request_entity_too_large(error):
 def forbidden(error):
     return render_template('errors/403.html'), 403
 
+@app.errorhandler(CSRFError)
+def csrf_error(error):
+    # Scripted API clients get a reason they can act on, see /api/csrf-token
+    if request.path.startswith('/api/'):
+        return jsonify({'error': f'{error.description} Send the token from /api/csrf-token '
+                                 f'in an X-CSRFToken header.'}), 400
+    flash('Your session expired, please try again', 'warning')
+    return redirect(request.referrer or url_for('main.index'))
+
 # Main Blueprint
 from flask import Blueprint
 main_bp = Blueprint('main', __name__)
@@ -308,32 +338,35 @@ def index():
 # Dashboard
 @main_bp.route('/dashboard')
 @login_required
+@query_budget(8)
 def dashboard():
     """Dashboard with user statistics and recent analyses"""
-    # Get recent analyses
+    # Get recent analyses, with their resume counts in one grouped query
     recent_analyses = ResumeAnalysis.query.filter_by(user_id=current_user.id) \
-                                .order_by(ResumeAnalysis.created_at.desc()) \
+                                .order_by(ResumeAnalysis.created_at.desc(), ResumeAnalysis.id.desc()) \
                                 .limit(5).all()
+    ResumeAnalysis.load_resume_counts(recent_analyses)
     
-    # Get user statistics
-    total_analyses = ResumeAnalysis.query.filter_by(user_id=current_user.id).count()
-    total_resumes = db.session.query(db.func.count(ResumeFile.id)) \
-                             .join(ResumeAnalysis) \
-                             .filter(ResumeAnalysis.user_id == current_user.id) \
-                             .scalar() or 0
+    # User and system statistics come from the rolled-up tables, which are
+    # refreshed in the background at most once per STATS_ROLLUP_INTERVAL
+    get_stats_rollup().schedule(app)
+    totals = get_totals(current_user.id)
+    total_analyses = totals.analysis_count if totals else 0
+    total_resumes = totals.resume_count if totals else 0
+    trends = daily_series(current_user.id)
     
     # If admin, get system-wide statistics
     if current_user.is_admin:
-        user_count = User.query.count()
-        active_users = User.query.filter_by(is_active=True).count()
-        inactive_users = user_count - active_users
-        total_system_analyses = ResumeAnalysis.query.count()
+        system = get_totals(ALL_USERS)
+        user_count = system.user_count if system else 0
+        active_users = system.active_user_count if system else 0
         
         admin_stats = {
             'user_count': user_count,
             'active_users': active_users,
-            'inactive_users': inactive_users,
-            'total_system_analyses': total_system_analyses
+            'inactive_users': user_count - active_users,
+            'total_system_analyses': system.analysis_count if system else 0,
+            'trends': daily_series(ALL_USERS, days=7)
         }
     else:
         admin_stats = None
@@ -343,6 +376,7 @@ def dashboard():
                           recent_analyses=recent_analyses,
                           total_analyses=total_analyses,
                           total_resumes=total_resumes,
+                          trends=trends,
                           admin_stats=admin_stats,
                           days_active=(datetime.datetime.now() - current_user.created_at).days)
 
@@ -377,51 +411,148 @@ def analyze():
             selected_weights = ScoringWeights.query.get(form.weights_id.data)
             weights_dict = selected_weights.get_weights() if selected_weights else None
             
-            # Process resume files
-            results = []
+            # Read resume files; small uploads stay in memory
+            saved_files = []
+            rejected_files = []
+            in_memory_uploads = {}
+            stored_filenames = set()
             files = request.files.getlist('resume_files')
+            max_files = app.config['MAX_FILES_PER_ANALYSIS']
+            
+            # Uploads kept in memory for extraction, bounded per analysis so a
+            # large archive is not held in memory whole; the rest goes to disk
+            in_memory_bytes = 0
+            
+            def memory_allowance():
+                """Bytes the next upload may keep in memory"""
+                return max(0, min(app.config['IN_MEMORY_UPLOAD_MAX_BYTES'],
+                                  app.config['IN_MEMORY_UPLOADS_MAX_BYTES'] - in_memory_bytes))
+            
+            def stored_filename_for(filename):
+                """Unique stored name, as archives may hold files with the same name"""
+                unique_filename = f"{analysis.session_id}_{filename}"
+                counter = 1
+                while unique_filename in stored_filenames:
+                    unique_filename = f"{analysis.session_id}_{counter}_{filename}"
+                    counter += 1
+                stored_filenames.add(unique_filename)
+                return unique_filename
+            
+            def add_resume_file(filename, unique_filename, file_type, file_size, content_hash, data):
+                """Create a pending resume file record for an accepted upload"""
+                nonlocal in_memory_bytes
+                resume_file = ResumeFile(
+                    analysis_id=analysis.id,
+                    original_filename=filename,
+                    stored_filename=unique_filename,
+                    file_size=file_size,
+                    file_type=file_type,
+                    status='pending',
+                    content_hash=content_hash
+                )
+                db.session.add(resume_file)
+                saved_files.append(resume_file)
+                if data is not None:
+                    in_memory_uploads[resume_file] = InMemoryUpload(filename, data)
+                    in_memory_bytes += len(data)
             
             for file in files:
                 if file and file.filename and allowed_file(file.filename):
-                    # Secure filename and create unique file path
                     filename = secure_filename(file.filename)
-                    unique_filename = f"{analysis.session_id}_{filename}"
-                    file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
                     
-                    # Get file size and type
-                    file.save(file_path)
-                    file_size = os.path.getsize(file_path)
-                    file_type = file.filename.rsplit('.', 1)[1].lower()
+                    # Check the real file type before spending disk or CPU on it
+                    file_type = sniff_upload(file)
                     
-                    # Create resume file record
-                    resume_file = ResumeFile(
-                        analysis_id=analysis.id,
-                        original_filename=filename,
-                        stored_filename=unique_filename,
-                        file_size=file_size,
-                        file_type=file_type
-                    )
-                    db.session.add(resume_file)
+                    if file_type == 'zip':
+                        # Archive members are read one at a time and go to extraction from
+                        # memory while the in-memory budget lasts, from disk after it
+                        try:
+                            members = iter_zip_members(
+                                file.stream,
+                                app.config['ALLOWED_EXTENSIONS'],
+                                max_members=app.config['ZIP_MAX_MEMBERS'],
+                                max_total_bytes=app.config['ZIP_MAX_UNCOMPRESSED_MB'] * 1024 * 1024,
+                                max_ratio=app.config['ZIP_MAX_COMPRESSION_RATIO']
+                            )
+                            for member_name, data, reason in members:
+                                member_name = secure_filename(member_name)
+                                if reason is None and len(saved_files) >= max_files:
+                                    reason = f"more than {max_files} files per analysis"
+                                if reason is None:
+                                    member_type = sniff_bytes(data)
+                                    reason = rejection_reason(member_type)
+                                if reason:
+                                    rejected_files.append(f"{filename}/{member_name}: {reason}")
+                                    continue
+                                unique_filename = stored_filename_for(member_name)
+                                content_hash = hashlib.sha256(data).hexdigest()
+                                if len(data) > memory_allowance():
+                                    # Over the in-memory budget: extract this member from disk
+                                    write_upload(os.path.join(app.config['UPLOAD_FOLDER'], unique_filename), data)
+                                    add_resume_file(member_name, unique_filename, member_type,
+                                                    len(data), content_hash, None)
+                                else:
+                                    add_resume_file(member_name, unique_filename, member_type,
+                                                    len(data), content_hash, data)
+                        except ValueError as e:
+                            logger.warning(f"Rejected archive {filename}: {e}")
+                            rejected_files.append(f"{filename}: {e}")
+                        continue
                     
-                    # Extract and preprocess text
-                    try:
-                        # Extract text from file
-                        resume_text = extract_text_from_file(file_path)
-                        resume_file.extracted_text = resume_text  # Store the extracted text
-                        
-                        # Preprocess text
-                        processed_resume = preprocess_text(resume_text)
-                        processed_job = preprocess_text(form.job_description.data)
-                        
-                        # Calculate similarity
-                        score = calculate_similarity(processed_resume, processed_job, weights_dict)
-                        resume_file.score = score
-                        
-                        # Add to results
-                        results.append((filename, score))
-                    except Exception as e:
-                        logger.error(f"Error processing file {filename}: {e}")
-                        db.session.delete(resume_file)  # Remove the record if processing fails
+                    reason = rejection_reason(file_type)
+                    if reason is None and len(saved_files) >= max_files:
+                        reason = f"more than {max_files} files per analysis"
+                    if reason:
+                        logger.warning(f"Rejected upload {filename}: {reason}")
+                        rejected_files.append(f"{filename}: {reason}")
+                        continue
+                    
+                    # Read the file, hashing it on the way
+                    unique_filename = stored_filename_for(filename)
+                    file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+                    file_size, content_hash, data = buffer_upload(
+                        file, file_path, max_memory_bytes=memory_allowance())
+                    add_resume_file(filename, unique_filename, file_type, file_size, content_hash, data)
+            
+            upload_folder = app.config['UPLOAD_FOLDER']
+            
+            for rejected in rejected_files:
+                flash(f'Skipped {rejected}', 'warning')
+            
+            if form.run_in_background.data:
+                if not saved_files:
+                    flash('No valid resume files were uploaded', 'warning')
+                    return redirect(url_for('main.analyze'))
+                
+                # The worker reads from disk, so persist everything before queueing
+                persist_uploads([(os.path.join(upload_folder, f.stored_filename), upload)
+                                 for f, upload in in_memory_uploads.items()], background=False)
+                
+                # Hand the analysis to the background worker and return immediately
+                enqueue_analysis(analysis, weights_dict)
+                db.session.commit()
+                
+                flash('Resume analysis queued. Results will appear as files are processed.', 'info')
+                return redirect(url_for('main.analysis_results', analysis_id=analysis.id))
+            
+            # Extract, preprocess and score in this request
+            results = run_analysis(
+                analysis,
+                saved_files,
+                upload_folder,
+                weights_dict=weights_dict,
+                max_workers=app.config['EXTRACTION_WORKERS'],
+                timeout=app.config['EXTRACTION_TIMEOUT'],
+                memory_limit_mb=app.config['EXTRACTION_MEMORY_LIMIT_MB'],
+                discard_failed=True,
+                extract_options=extraction_options(app.config),
+                in_memory_uploads=in_memory_uploads
+            )
+            
+            # Keep copies of in-memory uploads without delaying the response
+            if app.config['RETAIN_UPLOADS'] and in_memory_uploads:
+                persist_uploads([(os.path.join(upload_folder, f.stored_filename), upload)
+                                 for f, upload in in_memory_uploads.items() if f.status == 'processed'])
             
             if not results:
                 flash('No valid resume files were processed', 'warning')
@@ -431,6 +562,12 @@ def analyze():
             analysis.set_results(results)
             db.session.commit()
             
+            # Fold the new resumes into the corpus IDF and LSA models and the statistics
+            get_idf_model().schedule_refresh(app)
+            if get_lsa_model() is not None:
+                get_lsa_model().schedule_fit(app)
+            get_stats_rollup().schedule(app, force=True)
+            
             flash('Resume analysis completed successfully!', 'success')
             return redirect(url_for('main.analysis_results', analysis_id=analysis.id))
             
@@ -441,9 +578,15 @@ def analyze():
     
     return render_template('analyze.html', form=form, title="Analyze Resumes")
 
+def analysis_status_rate_limit():
+    """Rate limit of the results page and its status polling, reloaded while a queued analysis runs"""
+    return app.config['ANALYSIS_STATUS_RATE_LIMIT']
+
 # Analysis Results
 @main_bp.route('/analysis/<int:analysis_id>')
 @login_required
+@limiter.limit(analysis_status_rate_limit)
+@query_budget(10)
 def analysis_results(analysis_id):
     """View results of a specific analysis"""
     analysis = ResumeAnalysis.query.get_or_404(analysis_id)
@@ -453,11 +596,12 @@ def analysis_results(analysis_id):
         flash('You do not have permission to view this analysis', 'danger')
         return redirect(url_for('main.dashboard'))
     
-    # Get resume files
-    resume_files = analysis.resume_files.all()
-    
-    # Get results
-    results = analysis.get_results()
+    # One page of scored files, best first; pending and failed files of
+    # queued analyses have no score yet
+    page = request.args.get('page', 1, type=int)
+    pagination = analysis.ranked_files().options(db.joinedload(ResumeFile.duplicate_of)).paginate(
+        page=page, per_page=app.config['ANALYSIS_RESULTS_PER_PAGE'], error_out=False)
+    resume_files = pagination.items
     
     # Prepare export form
     export_form = ExportResultsForm()
@@ -466,11 +610,209 @@ def analysis_results(analysis_id):
     return render_template('results.html', 
                           title=f"Analysis Results: {analysis.job_title}",
                           analysis=analysis,
-                          results=results,
                           resume_files=resume_files,
+                          pagination=pagination,
+                          score_distribution=analysis.score_distribution(),
+                          skills=skill_reports(analysis, resume_files),
                           export_form=export_form,
                           now=datetime.datetime.now())
 
+# Analysis Status
+@main_bp.route('/analysis/<int:analysis_id>/status')
+@login_required
+@limiter.limit(analysis_status_rate_limit)
+def analysis_status(analysis_id):
+    """Report the processing state and per-file progress of an analysis"""
+    analysis = ResumeAnalysis.query.get_or_404(analysis_id)
+    
+    # Ensure the user can only access their own analyses unless they're an admin
+    if analysis.user_id != current_user.id and not current_user.is_admin:
+        return jsonify({'error': 'You do not have permission to view this analysis'}), 403
+    
+    return jsonify(get_analysis_status(analysis))
+
+# Chunked Uploads
+def upload_file_status(resume_file):
+    """Upload progress of one file of a chunked upload"""
+    return {
+        'id': resume_file.id,
+        'filename': resume_file.original_filename,
+        'size': resume_file.file_size,
+        'received': received_bytes(app.config['UPLOAD_FOLDER'], resume_file),
+        'status': resume_file.status,
+        'error': resume_file.error
+    }
+
+def upload_rate_limit():
+    """Rate limit of the chunked upload API, which takes many small requests"""
+    return app.config['UPLOAD_API_RATE_LIMIT']
+
+# CSRF token for the JSON API
+@main_bp.route('/api/csrf-token')
+@login_required
+def csrf_token():
+    """Token that scripted clients send in an X-CSRFToken header with POST and PUT API requests"""
+    return jsonify({'csrf_token': generate_csrf()})
+
+@main_bp.route('/api/uploads', methods=['POST'])
+@login_required
+@limiter.limit(upload_rate_limit)
+def start_chunked_upload():
+    """
+    Start an analysis whose resume files are uploaded in chunks.
+    Expects JSON with job_title, job_description, weights_id and files,
+    a list of {filename, size, sha256}.
+    """
+    data = request.get_json(silent=True) or {}
+    job_description = (data.get('job_description') or '').strip()
+    files = data.get('files') or []
+    max_file_bytes = app.config['CHUNKED_UPLOAD_MAX_FILE_MB'] * 1024 * 1024
+    
+    if len(job_description) < 50:
+        return jsonify({'error': 'Job description should be at least 50 characters'}), 400
+    if not files:
+        return jsonify({'error': 'At least one resume file is required'}), 400
+    if len(files) > app.config['MAX_FILES_PER_ANALYSIS']:
+        return jsonify({'error': f'At most {app.config["MAX_FILES_PER_ANALYSIS"]} files can be analyzed at once'}), 400
+    
+    declared = []
+    for entry in files:
+        filename = secure_filename(str(entry.get('filename') or ''))
+        checksum = str(entry.get('sha256') or '').lower()
+        try:
+            size = int(entry.get('size'))
+        except (TypeError, ValueError):
+            size = 0
+        
+        if not allowed_file(filename) or filename.rsplit('.', 1)[1].lower() == 'zip':
+            return jsonify({'error': f'File {filename or "(unnamed)"} has an unsupported extension'}), 400
+        if not 0 < size <= max_file_bytes:
+            return jsonify({'error': f'File {filename} must be between 1 byte and '
+                                     f'{app.config["CHUNKED_UPLOAD_MAX_FILE_MB"]} MB'}), 400
+        if not re.fullmatch(r'[0-9a-f]{64}', checksum):
+            return jsonify({'error': f'File {filename} needs a SHA-256 hex digest'}), 400
+        declared.append((filename, size, checksum))
+    
+    try:
+        analysis = ResumeAnalysis(
+            user_id=current_user.id,
+            job_description=job_description,
+            job_title=data.get('job_title')
+        )
+        db.session.add(analysis)
+        db.session.flush()  # Get the analysis ID
+        
+        selected_weights = ScoringWeights.query.get(data.get('weights_id')) if data.get('weights_id') else None
+        if selected_weights and selected_weights.user_id != current_user.id and not selected_weights.is_default:
+            selected_weights = None
+        if selected_weights is None:
+            selected_weights = ScoringWeights.query.filter_by(is_default=True).first()
+        begin_upload(analysis, selected_weights.get_weights() if selected_weights else None)
+        
+        resume_files = []
+        for index, (filename, size, checksum) in enumerate(declared):
+            resume_file = ResumeFile(
+                analysis_id=analysis.id,
+                original_filename=filename,
+                stored_filename=f"{analysis.session_id}_{index}_{filename}",
+                file_size=size,
+                status='uploading',
+                content_hash=checksum
+            )
+            db.session.add(resume_file)
+            resume_files.append(resume_file)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error starting chunked upload: {e}")
+        return jsonify({'error': 'Could not start the upload'}), 500
+    
+    return jsonify({
+        'analysis_id': analysis.id,
+        'chunk_size': app.config['UPLOAD_CHUNK_SIZE'],
+        'files': [upload_file_status(f) for f in resume_files]
+    }), 201
+
+def get_upload_file(analysis_id, file_id):
+    """Load a file of the current user's chunked upload, or abort"""
+    analysis = ResumeAnalysis.query.get_or_404(analysis_id)
+    if analysis.user_id != current_user.id:
+        abort(403)
+    resume_file = analysis.resume_files.filter_by(id=file_id).first_or_404()
+    return analysis, resume_file
+
+@main_bp.route('/api/uploads/<int:analysis_id>')
+@login_required
+@limiter.limit(upload_rate_limit)
+def chunked_upload_status(analysis_id):
+    """Report how much of each file has been received, so clients can resume"""
+    analysis = ResumeAnalysis.query.get_or_404(analysis_id)
+    if analysis.user_id != current_user.id:
+        return jsonify({'error': 'You do not have permission to view this upload'}), 403
+    
+    return jsonify({
+        'analysis_id': analysis.id,
+        'state': analysis.state,
+        'chunk_size': app.config['UPLOAD_CHUNK_SIZE'],
+        'files': [upload_file_status(f) for f in analysis.resume_files.order_by(ResumeFile.id)]
+    })
+
+@main_bp.route('/api/uploads/<int:analysis_id>/files/<int:file_id>', methods=['PUT'])
+@login_required
+@limiter.limit(upload_rate_limit)
+def upload_chunk(analysis_id, file_id):
+    """
+    Receive one chunk of a file. The chunk is the raw request body, its
+    position the `offset` query parameter; an optional X-Chunk-SHA256
+    header is verified before the chunk is written.
+    """
+    _, resume_file = get_upload_file(analysis_id, file_id)
+    data = request.get_data(cache=False)
+    
+    if len(data) > app.config['UPLOAD_CHUNK_SIZE']:
+        return jsonify({'error': f'Chunks may be at most {app.config["UPLOAD_CHUNK_SIZE"]} bytes'}), 413
+    
+    offset = request.args.get('offset', type=int)
+    if offset is None or offset < 0:
+        return jsonify({'error': 'offset must be a non-negative integer'}), 400
+    
+    try:
+        received = write_chunk(app.config['UPLOAD_FOLDER'], resume_file, offset, data,
+                               checksum=request.headers.get('X-Chunk-SHA256'))
+    except ValueError as e:
+        return jsonify({**upload_file_status(resume_file), 'error': str(e)}), 409
+    
+    return jsonify({'id': resume_file.id, 'received': received})
+
+@main_bp.route('/api/uploads/<int:analysis_id>/files/<int:file_id>/complete', methods=['POST'])
+@login_required
+@limiter.limit(upload_rate_limit)
+def complete_chunked_file(analysis_id, file_id):
+    """
+    Verify an assembled file and queue it for analysis.
+    Completed files are processed while the remaining ones upload.
+    """
+    analysis, resume_file = get_upload_file(analysis_id, file_id)
+    
+    try:
+        complete_upload(app.config['UPLOAD_FOLDER'], resume_file)
+    except ValueError as e:
+        return jsonify({**upload_file_status(resume_file), 'error': str(e)}), 409
+    
+    try:
+        if resume_file.status == 'pending':
+            queue_uploaded_files(analysis)
+        elif analysis.state == 'uploading' and not analysis.resume_files.filter_by(status='uploading').count():
+            # The last file was rejected; let a job settle the final state
+            queue_uploaded_files(analysis)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error completing upload of file {file_id}: {e}")
+        return jsonify({'error': 'Could not complete the upload'}), 500
+    
+    return jsonify(upload_file_status(resume_file))
+
 # Export Results
 @main_bp.route('/export_analysis', methods=['POST'])
 @login_required
@@ -521,25 +863,177 @@ def export_analysis():
 # History
 @main_bp.route('/history')
 @login_required
+@query_budget(5)
 def history():
-    """View analysis history"""
-    page = request.args.get('page', 1, type=int)
+    """View analysis history, newest first, paged with opaque keyset cursors"""
     per_page = app.config['RESULTS_PER_PAGE']
+    show_all = bool(current_user.is_admin and request.args.get('all'))
     
-    if current_user.is_admin and request.args.get('all'):
-        # Admin can view all analyses
-        analyses = ResumeAnalysis.query.order_by(ResumeAnalysis.created_at.desc())
+    if show_all:
+        # Admin can view all analyses, loaded with their owners
+        analyses = ResumeAnalysis.query.options(db.joinedload(ResumeAnalysis.user))
     else:
         # Regular users can only view their own analyses
-        analyses = ResumeAnalysis.query.filter_by(user_id=current_user.id) \
-                              .order_by(ResumeAnalysis.created_at.desc())
+        analyses = ResumeAnalysis.query.filter_by(user_id=current_user.id)
+    
+    # The total is optional and reused for a short while; counting scans the whole listing
+    total = None
+    if request.args.get('count', '1') != '0':
+        total = get_count_cache().get(('analyses', None if show_all else current_user.id), analyses.count)
     
-    # Paginate results
-    paginated_analyses = analyses.paginate(page=page, per_page=per_page)
+    try:
+        paginated_analyses = keyset_paginate(
+            analyses,
+            [ResumeAnalysis.created_at, ResumeAnalysis.id],
+            per_page,
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            total=total
+        )
+    except ValueError:
+        flash('That page of the history is no longer available', 'warning')
+        return redirect(url_for('main.history', all=1 if show_all else None))
+    ResumeAnalysis.load_resume_counts(paginated_analyses.items)
     
     return render_template('history.html',
                           title="Analysis History",
-                          analyses=paginated_analyses)
+                          analyses=paginated_analyses,
+                          show_all=show_all)
+
+# Resume Pool Search
+@main_bp.route('/search', methods=['GET', 'POST'])
+@login_required
+def search():
+    """Match a job description against every resume the user has stored"""
+    form = CorpusSearchForm()
+    matches = None
+    
+    if form.validate_on_submit():
+        try:
+            matches = get_corpus_search().search(
+                current_user.id,
+                form.job_description.data,
+                k=min(form.top_k.data, app.config['CORPUS_SEARCH_MAX_RESULTS'])
+            )
+        except Exception as e:
+            logger.error(f"Error searching resume pool: {e}")
+            flash(f'An error occurred during the search: {str(e)}', 'danger')
+    
+    return render_template('search.html', form=form, matches=matches, title="Search Resumes")
+
+# API route for searching the resume pool
+@main_bp.route('/api/search', methods=['POST'])
+@login_required
+def search_api():
+    """Return the top-k stored resumes for a job description as JSON"""
+    data = request.get_json(silent=True) or {}
+    job_description = (data.get('job_description') or '').strip()
+    if not job_description:
+        return jsonify({'error': 'A job description is required'}), 400
+    
+    try:
+        k = int(data.get('k', 10))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'k must be an integer'}), 400
+    k = max(1, min(k, app.config['CORPUS_SEARCH_MAX_RESULTS']))
+    
+    try:
+        matches = get_corpus_search().search(current_user.id, job_description, k=k)
+    except Exception as e:
+        logger.error(f"Error searching resume pool: {e}")
+        return jsonify({'error': 'Error searching resumes'}), 500
+    
+    return jsonify({'matches': matches})
+
+# Reverse Matching
+def match_candidates(analysis_ids=None):
+    """The current user's analyses to match against, most recent first"""
+    query = ResumeAnalysis.query.filter_by(user_id=current_user.id)
+    if analysis_ids:
+        query = query.filter(ResumeAnalysis.id.in_(analysis_ids))
+    return query.order_by(ResumeAnalysis.created_at.desc()) \
+                .limit(app.config['REVERSE_MATCH_MAX_JOBS']).all()
+
+def rank_job_descriptions(file, analyses):
+    """Extract an uploaded resume once and rank the analyses' job descriptions for it"""
+    filename = secure_filename(file.filename)
+    reason = rejection_reason(sniff_upload(file))
+    if reason:
+        raise ValueError(reason)
+    
+    # Keep the resume in memory; it is not stored with any analysis
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"match_{uuid.uuid4().hex}_{filename}")
+    file_size, content_hash, data = buffer_upload(file, file_path, max_memory_bytes=app.config['MAX_CONTENT_LENGTH'])
+    upload = InMemoryUpload(filename, data) if data is not None else file_path
+    
+    return match_resume(
+        upload,
+        content_hash,
+        analyses,
+        max_workers=app.config['EXTRACTION_WORKERS'],
+        timeout=app.config['EXTRACTION_TIMEOUT'],
+        memory_limit_mb=app.config['EXTRACTION_MEMORY_LIMIT_MB'],
+        extract_options=extraction_options(app.config)
+    )
+
+@main_bp.route('/match', methods=['GET', 'POST'])
+@login_required
+def reverse_match():
+    """Rank past job descriptions for a single resume"""
+    form = ReverseMatchForm()
+    candidates = match_candidates()
+    form.analysis_ids.choices = [
+        (a.id, f"{a.job_title or 'Untitled'} ({a.created_at.strftime('%Y-%m-%d')})") for a in candidates
+    ]
+    matches = None
+    
+    if form.validate_on_submit():
+        # No selection matches against every past analysis
+        analyses = match_candidates(form.analysis_ids.data) if form.analysis_ids.data else candidates
+        if not analyses:
+            flash('Run an analysis first; its job description is what the resume is matched against', 'warning')
+        else:
+            try:
+                matches = rank_job_descriptions(form.resume_file.data, analyses)
+            except ValueError as e:
+                flash(f'Could not read the resume: {e}', 'warning')
+            except Exception as e:
+                logger.error(f"Error during reverse matching: {e}")
+                flash(f'An error occurred during matching: {str(e)}', 'danger')
+    
+    return render_template('match.html', form=form, matches=matches, title="Match a Resume")
+
+# API route for reverse matching
+@main_bp.route('/api/match', methods=['POST'])
+@login_required
+def reverse_match_api():
+    """
+    Rank past job descriptions for a single resume as JSON.
+    Expects a multipart upload with `resume_file` and optional repeated
+    `analysis_ids`; without them every past analysis is matched.
+    """
+    file = request.files.get('resume_file')
+    if not file or not file.filename or not allowed_file(file.filename):
+        return jsonify({'error': 'A PDF, DOCX or TXT resume_file is required'}), 400
+    
+    try:
+        analysis_ids = [int(i) for i in request.form.getlist('analysis_ids')]
+    except ValueError:
+        return jsonify({'error': 'analysis_ids must be integers'}), 400
+    
+    analyses = match_candidates(analysis_ids)
+    if not analyses:
+        return jsonify({'error': 'No analyses to match against'}), 400
+    
+    try:
+        matches = rank_job_descriptions(file, analyses)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 422
+    except Exception as e:
+        logger.error(f"Error during reverse matching: {e}")
+        return jsonify({'error': 'Error matching resume'}), 500
+    
+    return jsonify({'filename': secure_filename(file.filename), 'matches': matches})
 
 # Scoring Weights
 @main_bp.route('/weights')
@@ -621,7 +1115,8 @@ def edit_weights(weight_id=None):
                 db.session.add(weights)
                 flash('New scoring weights created successfully!', 'success')
             else:
-                # Update existing weights
+                # Update existing weights; scores memoized with the old values are stale
+                get_score_cache().invalidate_weights(weights.get_weights())
                 weights.name = form.name.data
                 weights.description = form.description.data
                 weights.set_weights(weights_dict)
@@ -674,6 +1169,7 @@ def delete_weights(weight_id):
     
     try:
         name = weights.name
+        get_score_cache().invalidate_weights(weights.get_weights())
         db.session.delete(weights)
         db.session.commit()
         flash(f'Scoring weights "{name}" deleted successfully', 'success')
@@ -748,6 +1244,14 @@ def validate_weights():
         logger.error(f"Error validating weights: {e}")
         return jsonify({'valid': False, 'message': 'Error validating weights'})
 
+# API route for cache statistics
+@main_bp.route('/api/cache_stats')
+@login_required
+@admin_required
+def cache_stats():
+    """Report score cache hit/miss counters (admin only)"""
+    return jsonify({'score_cache': get_score_cache().stats()})
+
 # Register main blueprint
 app.register_blueprint(main_bp)
 
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Corpus search benchmark
+Builds a CorpusIndex over synthetic resumes and measures index size, build
+time and top-k query latency of the sparse matmul + argpartition search.
+
+Usage:
+    python benchmarks/bench_corpus_search.py [--resumes N] [--queries N] [--k N]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus_index import CorpusIndex, IndexEntry
+
+SKILLS = [
+    'python', 'java', 'javascript', 'typescript', 'golang', 'rust', 'sql', 'postgresql', 'mysql',
+    'redis', 'kafka', 'spark', 'hadoop', 'airflow', 'docker', 'kubernetes', 'terraform', 'aws',
+    'azure', 'gcp', 'linux', 'flask', 'django', 'react', 'angular', 'vue', 'node', 'spring',
+    'pandas', 'numpy', 'tensorflow', 'pytorch', 'scikit', 'tableau', 'excel', 'salesforce',
+    'agile', 'scrum', 'jira', 'git', 'graphql', 'rest', 'microservices', 'security', 'networking'
+]
+WORDS = [
+    'led', 'team', 'designed', 'built', 'deployed', 'service', 'platform', 'customer', 'data',
+    'pipeline', 'migration', 'performance', 'reliability', 'project', 'stakeholder', 'report',
+    'analysis', 'automation', 'testing', 'mentored', 'engineer', 'manager', 'senior', 'product',
+    'delivery', 'budget', 'roadmap', 'cloud', 'infrastructure', 'monitoring', 'release'
+]
+
+# Long tail of rarer terms (names, employers, tools), drawn with Zipf-like weights
+RARE_TERMS = [f'term{i}' for i in range(20000)]
+RARE_WEIGHTS = [1.0 / (rank + 1) for rank in range(len(RARE_TERMS))]
+
+def synthetic_document(rng, length):
+    """A preprocessed resume: a token list mixing skills, common and rare words"""
+    rare = rng.choices(RARE_TERMS, weights=RARE_WEIGHTS, k=length)
+    tokens = []
+    for i in range(length):
+        draw = rng.random()
+        if draw < 0.25:
+            tokens.append(rng.choice(SKILLS))
+        elif draw < 0.6:
+            tokens.append(rng.choice(WORDS))
+        else:
+            tokens.append(rare[i])
+    return tokens
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark corpus-wide top-k resume search')
+    parser.add_argument('--resumes', type=int, default=100000)
+    parser.add_argument('--length', type=int, default=200, help='Tokens per resume')
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    documents = [synthetic_document(rng, args.length) for _ in range(args.resumes)]
+    entries = [IndexEntry(i, i // 50, f'resume_{i}.pdf', None) for i in range(args.resumes)]
+    queries = [synthetic_document(rng, 80) for _ in range(args.queries)]
+
+    index = CorpusIndex()
+    tracemalloc.start()
+    start = time.perf_counter()
+    index.fit(documents, entries)
+    build_time = time.perf_counter() - start
+    _, build_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"Resumes:       {len(index)} ({args.length} tokens each)")
+    print(f"Build:         {build_time:.1f} s, peak {build_peak / 1024 / 1024:.0f} MB")
+    print(f"Index matrix:  {index.matrix.shape[1]} terms, {index.matrix.nnz} non-zeros, "
+          f"{index.nbytes / 1024 / 1024:.1f} MB")
+
+    index.top_k(queries[0], args.k)  # Warm up
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.top_k(query, args.k)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies = np.array(latencies)
+    print(f"Top-{args.k} query:  median {np.median(latencies):.1f} ms, "
+          f"p95 {np.percentile(latencies, 95):.1f} ms over {args.queries} queries")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+DOCX extraction benchmark
+Compares the streaming lxml extractor with the python-docx extractor on
+large, table-heavy synthetic resumes, measuring throughput and peak memory.
+
+Usage:
+    python benchmarks/bench_docx_extraction.py [--tables N] [--rows N] [--repeat N]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import docx
+
+from utils import extract_text_from_docx_xml, extract_text_from_docx_python_docx
+
+def build_resume(path, tables, rows, paragraphs):
+    """Write a synthetic resume with many paragraphs and merged-cell tables"""
+    document = docx.Document()
+    document.add_heading('Jane Doe - Senior Software Engineer', 0)
+
+    for i in range(paragraphs):
+        document.add_paragraph(
+            f"Led project {i}: designed Python and Flask services, "
+            "deployed on AWS with Docker and Kubernetes, mentored engineers."
+        )
+
+    for t in range(tables):
+        table = document.add_table(rows=rows, cols=4)
+        for r, row in enumerate(table.rows):
+            for c, cell in enumerate(row.cells):
+                cell.text = f"Skill {t}-{r}-{c} SQL PostgreSQL Redis"
+        # Merged header cell, which python-docx returns once per grid column
+        table.cell(0, 0).merge(table.cell(0, 3))
+
+    document.save(path)
+
+def measure(extractor, path, repeat):
+    """Return (seconds per file, peak bytes, characters) for one extractor"""
+    extractor(path)  # Warm up imports and caches
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = extractor(path)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    extractor(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak, len(text)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DOCX text extraction')
+    parser.add_argument('--tables', type=int, default=40)
+    parser.add_argument('--rows', type=int, default=25)
+    parser.add_argument('--paragraphs', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'resume.docx')
+        build_resume(path, args.tables, args.rows, args.paragraphs)
+        size_kb = os.path.getsize(path) / 1024
+        print(f"Synthetic resume: {args.paragraphs} paragraphs, {args.tables} tables x {args.rows} rows, {size_kb:.0f} KB")
+
+        extractors = [
+            ('lxml iterparse', lambda p: extract_text_from_docx_xml(p, max_chars=0)),
+            ('python-docx', extract_text_from_docx_python_docx),
+        ]
+        print(f"{'Extractor':<16} {'ms/file':>10} {'files/s':>10} {'peak MB':>10} {'chars':>10}")
+        for name, extractor in extractors:
+            elapsed, peak, chars = measure(extractor, path, args.repeat)
+            print(f"{name:<16} {elapsed * 1000:>10.1f} {1 / elapsed:>10.1f} {peak / 1024 / 1024:>10.1f} {chars:>10}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+LSA similarity benchmark
+Scores one job description against a pool of synthetic resumes with:
+1. calculate_similarity: one score_resumes() call per resume
+2. score_resumes: one sparse TF-IDF batch
+3. The stored sparse TF-IDF matrix of a corpus index
+4. Stored dense LSA vectors (TruncatedSVD), one contiguous matmul
+and reports the time per query and the memory held by each representation.
+
+Usage:
+    python benchmarks/bench_lsa_similarity.py [--resumes N] [--components N] [--queries N]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_corpus_search import synthetic_document
+from scoring import score_resumes, score_vectors
+from idf_model import IdfModel
+from lsa_model import LsaModel
+
+def timed(function, repeat):
+    """Median wall time of a call in milliseconds"""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.median(latencies))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dense LSA scoring against sparse TF-IDF scoring')
+    parser.add_argument('--resumes', type=int, default=20000)
+    parser.add_argument('--length', type=int, default=200, help='Tokens per resume')
+    parser.add_argument('--components', type=int, default=256)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--pairwise-sample', type=int, default=200,
+                        help='Resumes timed with calculate_similarity; the result is extrapolated')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    documents = [synthetic_document(rng, args.length) for _ in range(args.resumes)]
+    queries = [synthetic_document(rng, 80) for _ in range(args.queries)]
+
+    idf_model = IdfModel(min_documents=0)
+    idf_model.partial_fit(documents)
+    idf_model.rebuild()
+
+    start = time.perf_counter()
+    lsa_model = LsaModel(n_components=args.components)
+    lsa_model.fit(documents, idf_model)
+    fit_time = time.perf_counter() - start
+
+    sparse = idf_model.transform(documents).astype(np.float32).tocsr()
+    sparse_bytes = sparse.data.nbytes + sparse.indices.nbytes + sparse.indptr.nbytes
+
+    tracemalloc.start()
+    dense = np.ascontiguousarray(lsa_model.transform(documents))
+    _, transform_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"Resumes:         {args.resumes} ({args.length} tokens each)")
+    print(f"LSA fit:         {fit_time:.1f} s, {lsa_model.dimensions} dimensions, "
+          f"{lsa_model.explained_variance:.0%} of variance explained")
+    print(f"Sparse TF-IDF:   {sparse.shape[1]} terms, {sparse.nnz} non-zeros, {sparse_bytes / 1024 / 1024:.1f} MB")
+    print(f"Dense LSA:       {dense.nbytes / 1024 / 1024:.1f} MB (transform peak {transform_peak / 1024 / 1024:.0f} MB)")
+    print()
+
+    job = queries[0]
+    sample = documents[:args.pairwise_sample]
+    pairwise = timed(lambda: [score_resumes(job, [resume], idf_model) for resume in sample], 3)
+    pairwise *= args.resumes / len(sample)
+    batch = timed(lambda: score_resumes(job, documents, idf_model), 3)
+
+    def sparse_query(query):
+        vector = idf_model.transform([query]).astype(np.float32)
+        return np.clip((sparse @ vector.T).toarray().ravel(), 0.0, 1.0)
+
+    def dense_query(query):
+        return score_vectors(lsa_model.transform([query])[0], dense)
+
+    stored_sparse = float(np.median([timed(lambda: sparse_query(q), 1) for q in queries]))
+    stored_dense = float(np.median([timed(lambda: dense_query(q), 1) for q in queries]))
+
+    print(f"{'Method':<34}{'ms per query':>14}")
+    print(f"{'calculate_similarity (per pair)':<34}{pairwise:>14.1f}  (extrapolated from {len(sample)})")
+    print(f"{'score_resumes (batch)':<34}{batch:>14.1f}")
+    print(f"{'stored sparse TF-IDF matmul':<34}{stored_sparse:>14.1f}")
+    print(f"{'stored dense LSA matmul':<34}{stored_dense:>14.1f}")
+
+    # Agreement of the two rankings on the top candidates
+    sparse_top = set(np.argsort(-sparse_query(job))[:50])
+    dense_top = set(np.argsort(-np.array(dense_query(job)))[:50])
+    print(f"\nTop-50 overlap between sparse and dense rankings: {len(sparse_top & dense_top)}/50")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+from utils import EXTRACTOR_VERSION
+
+# Configure logging
+logger = logging.getLogger('resume_analyzer.cache')
+
+# Default size limits
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024   # 64 MB in-process tier
+DEFAULT_DISK_BYTES = 512 * 1024 * 1024    # 512 MB on-disk tier
+
+class ExtractionCache:
+    """
+    Content-addressed cache of extracted resume text.
+
+    Entries are keyed by the SHA-256 of the uploaded file plus the
+    extractor version and extraction options (see
+    pipeline.extraction_options), so a change to the extractors or to
+    limits such as PDF_MAX_PAGES invalidates them.
+    An in-process LRU sits in front of a zlib-compressed SQLite tier;
+    both tiers evict least recently used entries once over their size limit.
+    """
+
+    def __init__(self, path, max_memory_bytes=DEFAULT_MEMORY_BYTES, max_disk_bytes=DEFAULT_DISK_BYTES):
+        self.path = path
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS extraction_cache ('
+                ' key TEXT PRIMARY KEY,'
+                ' text BLOB NOT NULL,'
+                ' size INTEGER NOT NULL,'
+                ' accessed_at REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS ix_extraction_cache_accessed_at '
+                'ON extraction_cache (accessed_at)'
+            )
+
+    def _connect(self):
+        """Open a connection to the on-disk tier"""
+        return sqlite3.connect(self.path, timeout=10)
+
+    @staticmethod
+    def make_key(content_hash, options=None):
+        """Build the cache key for a file hash, the current extractor version and extraction options"""
+        options_hash = hashlib.sha256(json.dumps(options or {}, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        return f"{content_hash}:{EXTRACTOR_VERSION}:{options_hash}"
+
+    def get(self, content_hash, options=None):
+        """Return the cached text for a file hash extracted with some options, or None on a miss"""
+        if not content_hash:
+            return None
+
+        key = self.make_key(content_hash, options)
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                return text
+
+        try:
+            with self._connect() as conn:
+                row = conn.execute('SELECT text FROM extraction_cache WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute('UPDATE extraction_cache SET accessed_at = ? WHERE key = ?', (time.time(), key))
+            text = zlib.decompress(row[0]).decode('utf-8')
+        except Exception as e:
+            logger.error(f"Error reading extraction cache: {e}")
+            return None
+
+        self._remember(key, text)
+        return text
+
+    def put(self, content_hash, text, options=None):
+        """Store text extracted from a file with some options in both tiers"""
+        if not content_hash or text is None:
+            return
+
+        key = self.make_key(content_hash, options)
+        self._remember(key, text)
+
+        try:
+            blob = zlib.compress(text.encode('utf-8'))
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO extraction_cache (key, text, size, accessed_at) VALUES (?, ?, ?, ?)',
+                    (key, blob, len(blob), time.time())
+                )
+                self._evict_disk(conn)
+        except Exception as e:
+            logger.error(f"Error writing extraction cache: {e}")
+
+    def _remember(self, key, text):
+        """Add an entry to the in-process tier, evicting the oldest ones"""
+        size = len(text)
+        if size > self.max_memory_bytes:
+            return
+
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= len(self._memory.pop(key))
+            self._memory[key] = text
+            self._memory_bytes += size
+
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self, conn):
+        """Trim the on-disk tier to 90% of its limit once it grows past it"""
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM extraction_cache').fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+
+        target = int(self.max_disk_bytes * 0.9)
+        rows = conn.execute('SELECT key, size FROM extraction_cache ORDER BY accessed_at').fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= target:
+                break
+            evicted.append((key,))
+            total -= size
+
+        conn.executemany('DELETE FROM extraction_cache WHERE key = ?', evicted)
+        logger.info(f"Evicted {len(evicted)} entries from the extraction cache")
+
+
+_extraction_cache = None
+
+def init_extraction_cache(app):
+    """Create the process-wide extraction cache from the app config"""
+    global _extraction_cache
+    path = app.config.get('EXTRACTION_CACHE_PATH') or os.path.join(app.instance_path, 'extraction_cache.db')
+    _extraction_cache = ExtractionCache(
+        path,
+        max_memory_bytes=app.config.get('EXTRACTION_CACHE_MEMORY_MB', 64) * 1024 * 1024,
+        max_disk_bytes=app.config.get('EXTRACTION_CACHE_DISK_MB', 512) * 1024 * 1024
+    )
+    return _extraction_cache
+
+def get_extraction_cache():
+    """Return the process-wide extraction cache, or None before init_extraction_cache()"""
+    return _extraction_cache
+
+
+# Default number of memoized scores kept per process
+DEFAULT_SCORE_ENTRIES = 100000
+
+class ScoreCache:
+    """
+    Memoized similarity scores.
+
+    Entries are keyed by (model version, weights, job hash, resume hash),
+    where the hashes cover the preprocessed documents and their sections.
+    Scores are only memoized when they do not depend on the rest of the
+    batch, i.e. when the corpus IDF model is used.
+    """
+
+    def __init__(self, max_entries=DEFAULT_SCORE_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.model_version = None
+
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def hash_document(document, sections=None):
+        """
+        Hash a preprocessed document (token list or string), together with
+        its section token lists when given: the same tokens laid out in
+        other sections get another weighted score.
+        """
+        text = document if isinstance(document, str) else ' '.join(document)
+        if sections:
+            text += ''.join(f"\x1e{section}\x1f{' '.join(tokens)}" for section, tokens in sorted(sections.items()))
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def weights_key(weights):
+        """Canonical representation of a scoring weights payload"""
+        return json.dumps(weights, sort_keys=True) if weights else ''
+
+    def get_many(self, model_version, weights, job_hash, resume_hashes):
+        """Return cached scores for the resume hashes, None for misses"""
+        weights_key = self.weights_key(weights)
+        scores = []
+
+        with self._lock:
+            self._check_model_version(model_version)
+            for resume_hash in resume_hashes:
+                key = (weights_key, job_hash, resume_hash)
+                score = self._scores.get(key)
+                if score is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self._scores.move_to_end(key)
+                scores.append(score)
+
+        return scores
+
+    def put_many(self, model_version, weights, job_hash, resume_hashes, scores):
+        """Store scores for the resume hashes"""
+        weights_key = self.weights_key(weights)
+
+        with self._lock:
+            self._check_model_version(model_version)
+            for resume_hash, score in zip(resume_hashes, scores):
+                self._scores[(weights_key, job_hash, resume_hash)] = score
+
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+
+    def invalidate_weights(self, weights):
+        """Drop every score computed with a weights payload"""
+        weights_key = self.weights_key(weights)
+        with self._lock:
+            for key in [k for k in self._scores if k[0] == weights_key]:
+                del self._scores[key]
+
+    def clear(self):
+        """Drop every memoized score"""
+        with self._lock:
+            self._scores.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._scores),
+                'model_version': self.model_version
+            }
+
+    def _check_model_version(self, model_version):
+        """Drop every entry once the scoring model changes (caller holds the lock)"""
+        if model_version != self.model_version:
+            if self._scores:
+                logger.info(f"Scoring model changed to {model_version}; dropping {len(self._scores)} cached scores")
+            self._scores.clear()
+            self.model_version = model_version
+
+
+_score_cache = None
+
+def init_score_cache(app):
+    """Create the process-wide score cache from the app config"""
+    global _score_cache
+    _score_cache = ScoreCache(max_entries=app.config.get('SCORE_CACHE_ENTRIES', DEFAULT_SCORE_ENTRIES))
+    return _score_cache
+
+def get_score_cache():
+    """Return the process-wide score cache, or None before init_score_cache()"""
+    return _score_cache
+
+
+# Defaults for cached listing counts
+DEFAULT_COUNT_TTL = 60  # seconds
+DEFAULT_COUNT_ENTRIES = 10000
+
+class CountCache:
+    """
+    Row counts of listings, kept for a short time.
+
+    Counting a large listing scans its whole index, so paginated views
+    show a count that is at most `ttl` seconds old instead of counting
+    on every page.
+    """
+
+    def __init__(self, ttl=DEFAULT_COUNT_TTL, max_entries=DEFAULT_COUNT_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, count):
+        """Return the cached count for a key, calling count() when it is missing or stale"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._counts.move_to_end(key)
+                return entry[0]
+
+        value = count()
+        with self._lock:
+            self._counts[key] = (value, now)
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return value
+
+    def invalidate(self, key):
+        """Drop the cached count of a key"""
+        with self._lock:
+            self._counts.pop(key, None)
+
+
+_count_cache = None
+
+def init_count_cache(app):
+    """Create the process-wide count cache from the app config"""
+    global _count_cache
+    _count_cache = CountCache(ttl=app.config.get('LISTING_COUNT_TTL', DEFAULT_COUNT_TTL))
+    return _count_cache
+
+def get_count_cache():
+    """Return the process-wide count cache, or None before init_count_cache()"""
+    return _count_cache
@@ -0,0 +1,112 @@
+import os
+import hashlib
+import logging
+
+from utils import SNIFF_BYTES, sniff_file_type, rejection_reason
+
+# Configure logging
+logger = logging.getLogger('resume_analyzer.chunked_uploads')
+
+# Default chunk size offered to clients; must stay below MAX_CONTENT_LENGTH
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+def partial_path(upload_folder, resume_file):
+    """Path of the file being assembled for an upload"""
+    return os.path.join(upload_folder, f"{resume_file.stored_filename}.part")
+
+def received_bytes(upload_folder, resume_file):
+    """Number of bytes received so far; clients resume from this offset"""
+    if resume_file.status != 'uploading':
+        return resume_file.file_size or 0
+    try:
+        return os.path.getsize(partial_path(upload_folder, resume_file))
+    except OSError:
+        return 0
+
+def write_chunk(upload_folder, resume_file, offset, data, checksum=None):
+    """
+    Write one chunk of an upload at the given offset.
+
+    Chunks must be contiguous: an offset past the received bytes is
+    rejected, while an offset before it rewrites data, so a retried chunk
+    is harmless.
+
+    Args:
+        upload_folder: Folder holding the partial files
+        resume_file: ResumeFile record in the 'uploading' state
+        offset: Byte offset of the chunk in the file
+        data: Chunk contents
+        checksum: Optional SHA-256 hex digest of the chunk
+
+    Returns:
+        Number of bytes received so far
+
+    Raises:
+        ValueError: If the chunk does not fit the upload
+    """
+    if resume_file.status != 'uploading':
+        raise ValueError("Upload has already been completed")
+
+    received = received_bytes(upload_folder, resume_file)
+    if offset < 0 or offset > received:
+        raise ValueError(f"Chunk offset must be between 0 and {received}")
+    if offset + len(data) > resume_file.file_size:
+        raise ValueError(f"Chunk ends past the declared file size of {resume_file.file_size} bytes")
+    if checksum and hashlib.sha256(data).hexdigest() != checksum.lower():
+        raise ValueError("Chunk checksum mismatch")
+
+    path = partial_path(upload_folder, resume_file)
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as out:
+        out.seek(offset)
+        out.write(data)
+
+    return max(received, offset + len(data))
+
+def _file_sha256(path, chunk_size=64 * 1024):
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def complete_upload(upload_folder, resume_file):
+    """
+    Verify an assembled upload and hand it to the analysis pipeline.
+
+    The file is checked against the size and SHA-256 declared when the
+    upload was started, then sniffed like a regular upload. Accepted files
+    become 'pending'; files of an unsupported type become 'failed'.
+
+    Raises:
+        ValueError: If the file is incomplete or fails checksum
+            verification; a corrupt file is discarded so it can be re-sent
+    """
+    if resume_file.status != 'uploading':
+        return
+
+    path = partial_path(upload_folder, resume_file)
+    received = received_bytes(upload_folder, resume_file)
+    if received != resume_file.file_size:
+        raise ValueError(f"Upload is incomplete: {received} of {resume_file.file_size} bytes received")
+
+    if _file_sha256(path) != resume_file.content_hash:
+        os.remove(path)
+        logger.warning(f"Checksum mismatch for upload {resume_file.original_filename}")
+        raise ValueError("Checksum mismatch; the file has been discarded, please upload it again")
+
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    file_type = sniff_file_type(head, path)
+    reason = rejection_reason(file_type)
+    if reason:
+        os.remove(path)
+        resume_file.status = 'failed'
+        resume_file.error = reason
+        resume_file.file_type = file_type
+        logger.warning(f"Rejected upload {resume_file.original_filename}: detected type {file_type}")
+        return
+
+    os.replace(path, os.path.join(upload_folder, resume_file.stored_filename))
+    resume_file.file_type = file_type
+    resume_file.status = 'pending'
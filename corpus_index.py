@@ -0,0 +1,355 @@
+import time
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from scoring import VECTORIZER_PARAMS
+from preprocessing import get_preprocessor
+from idf_model import get_idf_model
+from lsa_model import get_lsa_model, vector_from_bytes
+
+# Configure logging
+logger = logging.getLogger('resume_analyzer.corpus_index')
+
+# Number of ResumeFile rows read per query during a refresh
+REFRESH_BATCH_SIZE = 500
+
+# Refit the index vocabulary once the corpus has grown by this fraction
+REBUILD_GROWTH = 0.5
+
+# Default number of per-user indexes kept in memory
+DEFAULT_MAX_INDEXES = 32
+
+# One indexed resume
+IndexEntry = namedtuple('IndexEntry', ['resume_file_id', 'analysis_id', 'filename', 'content_hash'])
+
+class CorpusIndex:
+    """
+    Sparse TF-IDF matrix over a pool of stored resumes.
+
+    Rows are L2-normalized float32 TF-IDF vectors, stored column-major so
+    a search only touches the columns of terms in the job description:
+    the scores against the whole pool are one sparse matrix-vector
+    product over those columns. The vectorizer is frozen when the index is built and new
+    resumes are appended with it; the index is refitted once the pool has
+    grown by REBUILD_GROWTH, or when the corpus IDF model becomes usable.
+
+    With a fitted LSA model the matrix is instead a contiguous float32
+    array of dense resume vectors, and a search is one dense
+    matrix-vector product. Documents may then be given as stored vectors.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.matrix = None
+        self.vectorizer = None
+        self.model_version = None
+        self.built_size = 0
+        self.last_resume_id = 0
+        self.collected_ids = set()  # Files above last_resume_id already read, see CorpusSearch.refresh
+        self.seen_hashes = set()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def nbytes(self):
+        """Memory held by the sparse matrix"""
+        if self.matrix is None:
+            return 0
+        if isinstance(self.matrix, np.ndarray):
+            return self.matrix.nbytes
+        return self.matrix.data.nbytes + self.matrix.indices.nbytes + self.matrix.indptr.nbytes
+
+    def _dense_rows(self, documents):
+        """LSA vectors of documents; stored vectors (arrays) are taken as they are"""
+        rows = [document if isinstance(document, np.ndarray) else None for document in documents]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if missing:
+            for i, vector in zip(missing, self.vectorizer.transform([documents[i] for i in missing])):
+                rows[i] = vector
+        return np.vstack(rows).astype(np.float32, copy=False)
+
+    def fit(self, documents, entries, idf_model=None, lsa_model=None):
+        """
+        Build the index from preprocessed documents (token lists).
+        Uses a snapshot of the LSA model when it is fitted, a snapshot of
+        the corpus IDF model when it is ready, and a vectorizer fitted on
+        the documents otherwise.
+        """
+        if lsa_model is not None and lsa_model.ready:
+            self.vectorizer = lsa_model.snapshot()
+            self.model_version = f"lsa:{self.vectorizer.version}"
+            matrix = self._dense_rows(documents) if documents else None
+        elif idf_model is not None and idf_model.ready:
+            self.vectorizer = idf_model.snapshot()
+            self.model_version = f"idf:{self.vectorizer.version}"
+            matrix = self.vectorizer.transform(documents) if documents else None
+        else:
+            self.vectorizer = None
+            self.model_version = 'local'
+            matrix = None
+            if documents:
+                vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
+                try:
+                    matrix = vectorizer.fit_transform(documents)
+                    self.vectorizer = vectorizer
+                except ValueError:
+                    # No usable terms in any document
+                    matrix = None
+
+        self.entries = list(entries) if matrix is not None else []
+        if isinstance(matrix, np.ndarray):
+            self.matrix = np.ascontiguousarray(matrix)
+        else:
+            self.matrix = matrix.astype(np.float32).tocsc() if matrix is not None else None
+        self.built_size = len(self.entries)
+        self.seen_hashes = {entry.content_hash for entry in self.entries if entry.content_hash}
+
+    def add(self, documents, entries):
+        """Append preprocessed documents with the frozen vectorizer"""
+        if not documents:
+            return
+        if self.vectorizer is None:
+            raise ValueError("Corpus index has not been fitted")
+
+        if self.dense:
+            rows = self._dense_rows(documents)
+            self.matrix = rows if self.matrix is None else np.vstack([self.matrix, rows])
+        else:
+            rows = self.vectorizer.transform(documents).astype(np.float32)
+            self.matrix = rows.tocsc() if self.matrix is None else sp.vstack([self.matrix, rows], format='csc')
+        self.entries.extend(entries)
+        self.seen_hashes.update(entry.content_hash for entry in entries if entry.content_hash)
+
+    @property
+    def dense(self):
+        """True when the index holds dense LSA vectors"""
+        return self.model_version is not None and self.model_version.startswith('lsa:')
+
+    def needs_rebuild(self, pending, idf_model=None, lsa_model=None):
+        """True when pending new documents call for refitting the vocabulary"""
+        if self.vectorizer is None:
+            return True
+        if lsa_model is not None and lsa_model.ready:
+            # Vectors of different LSA versions live in different spaces
+            return self.model_version != f"lsa:{lsa_model.version}"
+        if self.model_version == 'local' and idf_model is not None and idf_model.ready:
+            return True
+        return pending > max(self.built_size * REBUILD_GROWTH, REFRESH_BATCH_SIZE)
+
+    def top_k(self, job_document, k=10):
+        """
+        Return the k best matching entries for a preprocessed job description.
+
+        Returns:
+            List of (IndexEntry, score) tuples, best match first
+        """
+        if self.matrix is None or not self.entries or k <= 0:
+            return []
+
+        if self.dense:
+            scores = self.matrix @ self.vectorizer.transform([job_document])[0]
+        else:
+            query = self.vectorizer.transform([job_document]).tocsr()
+            scores = self.matrix[:, query.indices] @ query.data.astype(np.float32)
+
+        k = min(k, len(scores))
+        if k < len(scores):
+            # Select the k best in linear time, then sort only those
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        best = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        return [(self.entries[i], float(np.clip(scores[i], 0.0, 1.0))) for i in best]
+
+
+class CorpusSearch:
+    """
+    Per-user corpus indexes, built lazily from the database.
+
+    Each search first folds in resumes stored since the previous one, so
+    the index follows completed analyses without a full rebuild. Indexes
+    of users who have not searched recently are dropped first.
+    """
+
+    def __init__(self, max_indexes=DEFAULT_MAX_INDEXES):
+        self.max_indexes = max_indexes
+        self._indexes = OrderedDict()
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _index_for(self, user_id):
+        """Return the index and lock of a user, creating them if needed"""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                index = CorpusIndex()
+                self._indexes[user_id] = index
+                self._locks[user_id] = threading.Lock()
+                while len(self._indexes) > self.max_indexes:
+                    evicted, _ = self._indexes.popitem(last=False)
+                    self._locks.pop(evicted, None)
+            else:
+                self._indexes.move_to_end(user_id)
+            return index, self._locks[user_id]
+
+    @staticmethod
+    def _user_files(user_id):
+        """Query of every file of a user, whatever its status"""
+        from models import ResumeAnalysis, ResumeFile
+
+        return ResumeFile.query \
+            .join(ResumeAnalysis, ResumeFile.analysis_id == ResumeAnalysis.id) \
+            .filter(ResumeAnalysis.user_id == user_id)
+
+    @classmethod
+    def _user_resumes(cls, user_id, after_id):
+        """Query of the processed resumes of a user stored after a ResumeFile id"""
+        from models import ResumeFile
+
+        return cls._user_files(user_id) \
+            .filter(ResumeFile.id > after_id,
+                    ResumeFile.status == 'processed',
+                    ResumeFile.text_hash.isnot(None))
+
+    def _collect(self, user_id, after_id, seen_hashes, lsa_version=None, skip_ids=()):
+        """
+        Tokenize the resumes of a user stored after a ResumeFile id, except
+        those in skip_ids. Resumes with a stored vector of lsa_version yield
+        that vector instead, and their text is not read.
+        Returns (documents, entries, ids of the ResumeFiles read).
+        """
+        from models import ResumeFile, ResumeText
+
+        preprocessor = get_preprocessor()
+        documents, entries, seen, read_ids = [], [], set(seen_hashes), set()
+        last_id = after_id
+        while True:
+            rows = self._user_resumes(user_id, last_id) \
+                .with_entities(ResumeFile.id, ResumeFile.analysis_id, ResumeFile.original_filename,
+                               ResumeFile.content_hash, ResumeFile.text_hash,
+                               ResumeFile.embedding, ResumeFile.embedding_version) \
+                .order_by(ResumeFile.id) \
+                .limit(REFRESH_BATCH_SIZE).all()
+            if not rows:
+                return documents, entries, read_ids
+            last_id = rows[-1][0]
+
+            batch = []
+            for row in rows:
+                resume_file_id, content_hash = row[0], row[3]
+                if resume_file_id in skip_ids:
+                    continue
+                read_ids.add(resume_file_id)
+                # The same file uploaded to several analyses is indexed once
+                if content_hash and content_hash in seen:
+                    continue
+                if content_hash:
+                    seen.add(content_hash)
+                batch.append(row)
+
+            def stored_vector(embedding, embedding_version):
+                return embedding is not None and lsa_version is not None and embedding_version == lsa_version
+
+            text_hashes = {row[4] for row in batch if not stored_vector(row[5], row[6])}
+            blobs = dict(ResumeText.query
+                         .with_entities(ResumeText.text_hash, ResumeText.data)
+                         .filter(ResumeText.text_hash.in_(text_hashes))) if text_hashes else {}
+
+            for resume_file_id, analysis_id, filename, content_hash, text_hash, embedding, embedding_version in batch:
+                if stored_vector(embedding, embedding_version):
+                    documents.append(vector_from_bytes(embedding))
+                else:
+                    documents.append(preprocessor.tokenize(ResumeText.decode(blobs.get(text_hash)) or ''))
+                entries.append(IndexEntry(resume_file_id, analysis_id, filename, content_hash))
+
+    def refresh(self, user_id):
+        """
+        Bring the index of a user up to date with the database.
+
+        The index has read every file of the user up to last_resume_id,
+        which only advances up to the first file still pending or
+        uploading (models.finished_through); processed files above it are
+        read as they come and remembered in collected_ids, so a file that
+        finishes after later ones is indexed once it does.
+        Must be called inside an application context.
+        Returns the index.
+        """
+        from models import finished_through
+
+        index, lock = self._index_for(user_id)
+
+        with lock:
+            idf_model = get_idf_model()
+            lsa_model = get_lsa_model()
+            lsa_model = lsa_model.snapshot() if lsa_model is not None and lsa_model.ready else None
+            lsa_version = lsa_model.version if lsa_model else None
+            pending = self._user_resumes(user_id, index.last_resume_id).count() - len(index.collected_ids)
+
+            if index.needs_rebuild(pending, idf_model, lsa_model):
+                start = time.perf_counter()
+                mark = finished_through(self._user_files(user_id), 0)
+                documents, entries, read_ids = self._collect(user_id, 0, (), lsa_version)
+                index.fit(documents, entries, idf_model, lsa_model)
+                logger.info(f"Built corpus index for user {user_id}: {len(index)} resumes "
+                            f"in {time.perf_counter() - start:.2f}s")
+            else:
+                mark = finished_through(self._user_files(user_id), index.last_resume_id)
+                read_ids = set(index.collected_ids)
+                if pending:
+                    documents, entries, new_ids = self._collect(
+                        user_id, index.last_resume_id, index.seen_hashes,
+                        index.vectorizer.version if index.dense else None, skip_ids=index.collected_ids)
+                    index.add(documents, entries)
+                    read_ids |= new_ids
+
+            index.last_resume_id = mark
+            index.collected_ids = {resume_file_id for resume_file_id in read_ids if resume_file_id > mark}
+            return index
+
+    def search(self, user_id, job_description, k=10):
+        """
+        Match a job description against every stored resume of a user.
+
+        Returns:
+            List of dicts with resume_file_id, analysis_id, filename and
+            score, best match first
+        """
+        index = self.refresh(user_id)
+        job_document = get_preprocessor().tokenize(job_description)
+        return [
+            {
+                'resume_file_id': entry.resume_file_id,
+                'analysis_id': entry.analysis_id,
+                'filename': entry.filename,
+                'score': score
+            }
+            for entry, score in index.top_k(job_document, k)
+        ]
+
+    def stats(self):
+        """Size of each in-memory index"""
+        with self._lock:
+            return {
+                user_id: {'resumes': len(index), 'bytes': index.nbytes, 'model_version': index.model_version}
+                for user_id, index in self._indexes.items()
+            }
+
+
+_corpus_search = None
+
+def init_corpus_search(app):
+    """Create the process-wide corpus search from the app config"""
+    global _corpus_search
+    _corpus_search = CorpusSearch(max_indexes=app.config.get('CORPUS_INDEX_MAX_USERS', DEFAULT_MAX_INDEXES))
+    return _corpus_search
+
+def get_corpus_search():
+    """Return the process-wide corpus search, or None before init_corpus_search()"""
+    return _corpus_search
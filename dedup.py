@@ -0,0 +1,152 @@
+import re
+import zlib
+import hashlib
+import logging
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger('resume_analyzer.dedup')
+
+# MinHash parameters; changing any of them invalidates stored signatures
+NUM_PERM = 128
+SHINGLE_SIZE = 5  # Words per shingle
+LSH_BANDS = 16    # 8 rows per band: candidates from a Jaccard similarity of about 0.7
+
+# Estimated Jaccard similarity from which two resumes count as duplicates
+DUPLICATE_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Fixed seed so every process draws the same permutations
+_random = np.random.RandomState(1)
+_PERM_A = _random.randint(1, 1 << 32, size=(NUM_PERM, 1), dtype=np.uint64)
+_PERM_B = _random.randint(0, 1 << 32, size=(NUM_PERM, 1), dtype=np.uint64)
+
+_WORD_RE = re.compile(r'\w+')
+
+def shingles(text):
+    """Set of word SHINGLE_SIZE-grams of a text, lowercased"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def minhash_signature(text):
+    """
+    MinHash signature of a text: NUM_PERM uint32 minima of its shingle hashes
+    under random universal hash permutations.
+    Returns None for a text without words.
+    """
+    shingle_set = shingles(text)
+    if not shingle_set:
+        return None
+
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingle_set),
+                         dtype=np.uint64, count=len(shingle_set))
+    # a, x < 2**32, so a * x + b never overflows uint64
+    permuted = ((_PERM_A * hashes + _PERM_B) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=1).astype(np.uint32)
+
+def signature_to_bytes(signature):
+    """Compact storage form of a signature"""
+    return signature.astype('<u4').tobytes()
+
+def signature_from_bytes(data):
+    """Signature back from its storage form"""
+    return np.frombuffer(data, dtype='<u4')
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+def band_keys(signature):
+    """One signed 64-bit key per LSH band; equal keys make two signatures candidates"""
+    rows = len(signature) // LSH_BANDS
+    data = signature_to_bytes(signature)
+    keys = []
+    for band in range(LSH_BANDS):
+        digest = hashlib.blake2b(data[band * rows * 4:(band + 1) * rows * 4],
+                                 digest_size=8, person=band.to_bytes(2, 'little')).digest()
+        keys.append(int.from_bytes(digest, 'little', signed=True))
+    return keys
+
+class ClusterIndex:
+    """
+    In-memory LSH index of near-duplicate clusters, grown one signature at a time.
+
+    Each signature is only compared with earlier cluster representatives
+    sharing a band, so the cost grows with the number of candidates, not
+    the batch squared, and a batch processed in chunks is clustered once.
+    """
+
+    def __init__(self, threshold=DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self.signatures = []
+        self._buckets = {}
+
+    def add(self, signature):
+        """
+        Index the next signature (None for a file without text).
+
+        Returns:
+            The index of the first signature it duplicates, or None when it
+            starts a cluster of its own
+        """
+        index = len(self.signatures)
+        self.signatures.append(signature)
+        if signature is None:
+            return None
+
+        keys = band_keys(signature)
+        candidates = sorted({c for key in keys for c in self._buckets.get(key, ())})
+        for candidate in candidates:
+            if similarity(signature, self.signatures[candidate]) >= self.threshold:
+                return candidate
+
+        # Only cluster representatives are indexed
+        for key in keys:
+            self._buckets.setdefault(key, []).append(index)
+        return None
+
+def find_clusters(signatures, threshold=DUPLICATE_THRESHOLD):
+    """
+    Group near-duplicate signatures, see ClusterIndex.
+
+    Args:
+        signatures: List of signatures (None for files without text)
+
+    Returns:
+        List with, for each signature, the index of the first signature it
+        duplicates, or None when it starts a cluster of its own
+    """
+    index = ClusterIndex(threshold)
+    return [index.add(signature) for signature in signatures]
+
+def find_stored_duplicate(signature, user_id, exclude_analysis_id=None, threshold=DUPLICATE_THRESHOLD):
+    """
+    Find an earlier stored resume of a user that this signature duplicates.
+    Candidates come from the indexed LSH bands, so only resumes sharing a
+    band are compared. Must be called inside an application context.
+
+    Returns:
+        The id of the oldest matching ResumeFile, or None
+    """
+    from models import db, ResumeAnalysis, ResumeFile, ResumeLshBand
+
+    candidates = db.session.query(ResumeFile.id, ResumeFile.minhash) \
+        .join(ResumeLshBand, ResumeLshBand.resume_file_id == ResumeFile.id) \
+        .join(ResumeAnalysis, ResumeFile.analysis_id == ResumeAnalysis.id) \
+        .filter(ResumeLshBand.band_key.in_(band_keys(signature)),
+                ResumeAnalysis.user_id == user_id,
+                ResumeFile.minhash.isnot(None)) \
+        .distinct() \
+        .order_by(ResumeFile.id)
+    if exclude_analysis_id is not None:
+        candidates = candidates.filter(ResumeFile.analysis_id != exclude_analysis_id)
+
+    for resume_file_id, minhash in candidates:
+        if similarity(signature, signature_from_bytes(minhash)) >= threshold:
+            return resume_file_id
+    return None
@@ -1,7 +1,7 @@
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed, FileRequired, MultipleFileField
 from wtforms import StringField, PasswordField, BooleanField, SubmitField
-from wtforms import TextAreaField, SelectField, FloatField, IntegerField, HiddenField
+from wtforms import TextAreaField, SelectField, FloatField, IntegerField, HiddenField, SelectMultipleField
 from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError, NumberRange
 from wtforms.validators import Regexp, Optional
 import re
@@ -121,9 +121,10 @@ class ResumeAnalysisForm(FlaskForm):
     ])
     resume_files = MultipleFileField('Resume Files', validators=[
         FileRequired(message="Please select at least one resume file"),
-        FileAllowed(['pdf', 'doc', 'docx', 'txt'], "Only PDF, DOC, DOCX, and TXT files are allowed")
+        FileAllowed(['pdf', 'doc', 'docx', 'txt', 'zip'], "Only PDF, DOC, DOCX, TXT and ZIP files are allowed")
     ])
     weights_id = SelectField('Scoring Weights', coerce=int)
+    run_in_background = BooleanField('Process in the background')
     submit = SubmitField('Analyze Resumes')
     
     def validate_resume_files(self, resume_files):
@@ -136,8 +137,29 @@ class ResumeAnalysisForm(FlaskForm):
                 raise ValidationError('Please select non-empty files')
             
             extension = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
-            if extension not in ['pdf', 'doc', 'docx', 'txt']:
-                raise ValidationError(f'File {file.filename} has an invalid extension. Only PDF, DOC, DOCX, and TXT files are allowed.')
+            if extension not in ['pdf', 'doc', 'docx', 'txt', 'zip']:
+                raise ValidationError(f'File {file.filename} has an invalid extension. Only PDF, DOC, DOCX, TXT and ZIP files are allowed.')
+
+class CorpusSearchForm(FlaskForm):
+    """Form for searching the stored resume pool with a job description"""
+    job_description = TextAreaField('Job Description', validators=[
+        DataRequired(),
+        Length(min=50, message="Job description should be at least 50 characters")
+    ])
+    top_k = IntegerField('Number of Matches', default=10, validators=[
+        DataRequired(),
+        NumberRange(min=1, max=100, message="Choose between 1 and 100 matches")
+    ])
+    submit = SubmitField('Search Resumes')
+
+class ReverseMatchForm(FlaskForm):
+    """Form for matching one resume against the job descriptions of past analyses"""
+    resume_file = FileField('Resume File', validators=[
+        FileRequired(message="Please select a resume file"),
+        FileAllowed(['pdf', 'doc', 'docx', 'txt'], "Only PDF, DOC, DOCX, and TXT files are allowed")
+    ])
+    analysis_ids = SelectMultipleField('Job Descriptions', coerce=int, validators=[Optional()])
+    submit = SubmitField('Rank Job Descriptions')
 
 class ScoringWeightsForm(FlaskForm):
     """Form for creating or editing scoring weights"""
@@ -0,0 +1,288 @@
+import os
+import hashlib
+import logging
+import threading
+import datetime
+from collections import Counter
+
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+from scoring import analyze_tokens, VECTORIZER_PARAMS
+from preprocessing import get_preprocessor
+
+# Configure logging
+logger = logging.getLogger('resume_analyzer.idf_model')
+
+# Bump when the persisted layout changes; older files are rebuilt from scratch
+FORMAT_VERSION = 1
+
+# Minimum number of historical resumes before the corpus model is used
+MIN_DOCUMENTS = 20
+
+# Upper bound on tracked document frequencies; rare terms are pruned beyond it
+MAX_TRACKED_TERMS = 500000
+
+# Number of ResumeFile rows read per query during a refresh
+REFRESH_BATCH_SIZE = 500
+
+def content_version(*parts):
+    """
+    Version number of a fitted model derived from its content (arrays or
+    strings), so every process that holds the same fit agrees on it and a
+    restart does not reuse the number of a different fit. Fits in a
+    signed 64-bit integer column.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x1e')
+    return int.from_bytes(digest.digest()[:7], 'big')
+
+class IdfModel:
+    """
+    Corpus-level vocabulary and IDF weights fitted over historical resumes.
+
+    Document frequencies are kept so the model can be refreshed
+    incrementally as new ResumeFile rows finish processing. `version`
+    identifies the scores produced with the model; it is derived from the
+    vocabulary and IDF weights, see content_version().
+    """
+
+    def __init__(self, path=None, max_features=VECTORIZER_PARAMS['max_features'],
+                 min_documents=MIN_DOCUMENTS):
+        self.path = path
+        self.max_features = max_features
+        self.min_documents = min_documents
+
+        self.version = 0
+        self.n_docs = 0
+        self.last_resume_id = 0
+        self.fitted_resume_ids = set()  # Fitted files above last_resume_id, see refresh_from_database
+        self.updated_at = None
+        self.document_frequencies = Counter()
+
+        # (vocabulary, idf, vectorizer) swapped as one tuple so readers never
+        # see a vocabulary paired with the wrong IDF vector
+        self._state = None
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread = None
+
+    @property
+    def ready(self):
+        """True once enough resumes have been seen to trust the IDF values"""
+        return self._state is not None and self.n_docs >= self.min_documents
+
+    def partial_fit(self, documents):
+        """Add preprocessed documents (token lists) to the frequency counts"""
+        for document in documents:
+            self.document_frequencies.update(set(analyze_tokens(document)))
+            self.n_docs += 1
+
+        if len(self.document_frequencies) > MAX_TRACKED_TERMS:
+            self.document_frequencies = Counter(
+                dict(self.document_frequencies.most_common(MAX_TRACKED_TERMS)))
+
+    def rebuild(self):
+        """Rebuild the vocabulary and IDF vector from the frequency counts"""
+        if not self.document_frequencies:
+            return
+
+        terms = [term for term, _ in self.document_frequencies.most_common(self.max_features)]
+        terms.sort()
+        vocabulary = {term: index for index, term in enumerate(terms)}
+
+        # Smoothed IDF, matching TfidfTransformer(smooth_idf=True)
+        df = np.array([self.document_frequencies[term] for term in terms], dtype=np.float64)
+        idf = np.log((1 + self.n_docs) / (1 + df)) + 1
+
+        vectorizer = CountVectorizer(analyzer=analyze_tokens, vocabulary=vocabulary)
+
+        self._state = (vocabulary, idf, vectorizer)
+        self.version = content_version('\n'.join(terms), idf)
+        self.updated_at = datetime.datetime.utcnow()
+
+    def transform(self, documents):
+        """Vectorize preprocessed documents into L2-normalized TF-IDF rows"""
+        if self._state is None:
+            raise ValueError("IDF model has not been fitted")
+
+        _, idf, vectorizer = self._state
+        counts = vectorizer.transform(documents)
+        return normalize(counts.multiply(idf).tocsr())
+
+    def snapshot(self):
+        """Copy of the fitted state that later rebuilds leave untouched"""
+        frozen = IdfModel(max_features=self.max_features, min_documents=self.min_documents)
+        frozen.version = self.version
+        frozen.n_docs = self.n_docs
+        frozen.updated_at = self.updated_at
+        frozen._state = self._state
+        return frozen
+
+    def weights(self):
+        """(vocabulary, idf vector) of the fitted model, or None"""
+        return None if self._state is None else self._state[:2]
+
+    @classmethod
+    def from_weights(cls, vocabulary, idf):
+        """Frozen model from a vocabulary and IDF vector, e.g. persisted alongside a derived model"""
+        model = cls(max_features=len(vocabulary), min_documents=0)
+        vectorizer = CountVectorizer(analyzer=analyze_tokens, vocabulary=vocabulary)
+        model._state = (vocabulary, idf, vectorizer)
+        model.version = content_version('\n'.join(sorted(vocabulary, key=vocabulary.get)), idf)
+        return model
+
+    def save(self, path=None):
+        """Persist the model atomically to disk"""
+        path = path or self.path
+        if not path:
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = {
+            'format_version': FORMAT_VERSION,
+            'version': self.version,
+            'n_docs': self.n_docs,
+            'last_resume_id': self.last_resume_id,
+            'fitted_resume_ids': sorted(self.fitted_resume_ids),
+            'updated_at': self.updated_at,
+            'document_frequencies': dict(self.document_frequencies)
+        }
+        tmp_path = f"{path}.tmp"
+        joblib.dump(payload, tmp_path, compress=3)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved IDF model v{self.version} ({self.n_docs} documents) to {path}")
+
+    def load(self, path=None):
+        """Load a persisted model, returning True on success"""
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return False
+
+        try:
+            payload = joblib.load(path)
+            if payload.get('format_version') != FORMAT_VERSION:
+                logger.warning(f"Ignoring IDF model with unsupported format at {path}")
+                return False
+
+            self.n_docs = payload['n_docs']
+            self.last_resume_id = payload['last_resume_id']
+            self.fitted_resume_ids = set(payload.get('fitted_resume_ids', ()))
+            self.document_frequencies = Counter(payload['document_frequencies'])
+            self.rebuild()
+            self.updated_at = payload['updated_at']
+            logger.info(f"Loaded IDF model v{self.version} ({self.n_docs} documents) from {path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error loading IDF model from {path}: {e}")
+            return False
+
+    def refresh_from_database(self):
+        """
+        Incrementally fit resumes processed since the last refresh.
+
+        Every file up to last_resume_id has finished processing and been
+        seen; processed files above it that were fitted while an earlier
+        file was still pending are remembered in fitted_resume_ids, so
+        each file is fitted exactly once whatever order files finish in.
+        Must be called inside an application context.
+        Returns the number of new documents.
+        """
+        from models import ResumeFile, ResumeText, finished_through
+
+        with self._refresh_lock:
+            # Another worker process may have refreshed the file in the meantime
+            if self.path and os.path.exists(self.path):
+                on_disk = IdfModel(self.path)
+                if on_disk.load() and (on_disk.last_resume_id > self.last_resume_id or on_disk.n_docs > self.n_docs):
+                    self._adopt(on_disk)
+
+            # Files up to the mark have all finished, so the scan below reads every processed one of them
+            mark = finished_through(ResumeFile.query, self.last_resume_id)
+
+            preprocessor = get_preprocessor()
+            added = 0
+            after_id = self.last_resume_id
+            while True:
+                rows = ResumeFile.query \
+                    .with_entities(ResumeFile.id, ResumeFile.text_hash) \
+                    .filter(ResumeFile.id > after_id,
+                            ResumeFile.status == 'processed',
+                            ResumeFile.text_hash.isnot(None)) \
+                    .order_by(ResumeFile.id) \
+                    .limit(REFRESH_BATCH_SIZE).all()
+                if not rows:
+                    break
+                after_id = rows[-1][0]
+
+                fresh = [(resume_file_id, text_hash) for resume_file_id, text_hash in rows
+                         if resume_file_id not in self.fitted_resume_ids]
+                if not fresh:
+                    continue
+
+                blobs = dict(ResumeText.query
+                             .with_entities(ResumeText.text_hash, ResumeText.data)
+                             .filter(ResumeText.text_hash.in_({text_hash for _, text_hash in fresh})))
+                texts = [ResumeText.decode(blobs.get(text_hash)) for _, text_hash in fresh]
+                self.partial_fit(preprocessor.tokenize(text) for text in texts if text)
+                self.fitted_resume_ids.update(resume_file_id for resume_file_id, _ in fresh)
+                added += sum(1 for text in texts if text)
+
+            self.last_resume_id = max(self.last_resume_id, mark)
+            self.fitted_resume_ids = {resume_file_id for resume_file_id in self.fitted_resume_ids
+                                      if resume_file_id > self.last_resume_id}
+
+            if added:
+                self.rebuild()
+                self.save()
+
+            return added
+
+    def schedule_refresh(self, app):
+        """Refresh from the database on a background thread"""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+
+        def run():
+            try:
+                with app.app_context():
+                    added = self.refresh_from_database()
+                if added:
+                    logger.info(f"IDF model refreshed with {added} new resumes")
+            except Exception as e:
+                logger.error(f"Error refreshing IDF model: {e}")
+
+        self._refresh_thread = threading.Thread(target=run, name='idf-refresh', daemon=True)
+        self._refresh_thread.start()
+
+    def _adopt(self, other):
+        """Take over the counts and fitted state of another model instance"""
+        self.version = other.version
+        self.n_docs = other.n_docs
+        self.last_resume_id = other.last_resume_id
+        self.fitted_resume_ids = other.fitted_resume_ids
+        self.updated_at = other.updated_at
+        self.document_frequencies = other.document_frequencies
+        self._state = other._state
+
+
+_idf_model = None
+
+def init_idf_model(app):
+    """Load the persisted IDF model and schedule a background refresh"""
+    global _idf_model
+    path = app.config.get('IDF_MODEL_PATH') or os.path.join(app.instance_path, 'models', 'idf_model.joblib')
+    _idf_model = IdfModel(path, min_documents=app.config.get('IDF_MIN_DOCUMENTS', MIN_DOCUMENTS))
+    _idf_model.load()
+    _idf_model.schedule_refresh(app)
+    return _idf_model
+
+def get_idf_model():
+    """Return the process-wide IDF model, or None before init_idf_model()"""
+    return _idf_model
@@ -153,7 +153,7 @@ def setup_configuration(app):
     app.config['SECURITY_PASSWORD_SALT'] = os.environ.get('SECURITY_PASSWORD_SALT', 'salt_replace_in_production')
     app.config['UPLOAD_FOLDER'] = 'uploads/'
     app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10 MB max file size
-    app.config['ALLOWED_EXTENSIONS'] = {'pdf', 'doc', 'docx', 'txt'}
+    app.config['ALLOWED_EXTENSIONS'] = {'pdf', 'doc', 'docx', 'txt', 'zip'}
     app.config['SESSION_TIMEOUT'] = 3600  # 1 hour in seconds
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
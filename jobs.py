@@ -0,0 +1,616 @@
+import os
+import logging
+import datetime
+import threading
+
+import numpy as np
+
+from models import db, UNFINISHED_STATUSES, ResumeAnalysis, ResumeFile, ResumeText, AnalysisJob, ResumeLshBand
+from preprocessing import get_preprocessor
+from sections import tokenize_sections
+from skills import get_skill_matcher
+from scoring import score_resumes_cached, score_jobs, score_vectors, weight_vector, section_documents
+from idf_model import get_idf_model
+from lsa_model import get_lsa_model, vector_to_bytes, vector_from_bytes
+from cache import get_extraction_cache, get_score_cache
+from dedup import minhash_signature, signature_to_bytes, signature_from_bytes, band_keys
+from dedup import ClusterIndex, find_stored_duplicate
+from chunked_uploads import partial_path
+from pipeline import process_files, extraction_options, DEFAULT_WORKERS, DEFAULT_TIMEOUT, DEFAULT_MEMORY_LIMIT_MB
+
+# Configure logging
+logger = logging.getLogger('resume_analyzer.jobs')
+
+# Attempts before a job that keeps dying is marked as failed
+MAX_ATTEMPTS = 3
+
+def fingerprint(resume_file, analysis):
+    """
+    Return the MinHash signature of a processed file, computing it on
+    first use. New signatures are indexed by their LSH bands, and the file
+    is flagged when it near-duplicates a resume of an earlier analysis.
+    """
+    if resume_file.minhash is not None:
+        return signature_from_bytes(resume_file.minhash)
+
+    signature = minhash_signature(resume_file.extracted_text or '')
+    if signature is None:
+        return None
+
+    duplicate_id = find_stored_duplicate(signature, analysis.user_id, exclude_analysis_id=analysis.id)
+    if duplicate_id is not None:
+        resume_file.duplicate_of_id = duplicate_id
+    resume_file.minhash = signature_to_bytes(signature)
+    for key in band_keys(signature):
+        resume_file.lsh_bands.append(ResumeLshBand(key))
+    return signature
+
+def skill_hits(stored, text, skill_matcher):
+    """Skill hits stored with the current dictionary, or a fresh scan of the text"""
+    hits = skill_matcher.hits_from_bytes(stored)
+    return hits if hits is not None else skill_matcher.find(text)
+
+def job_skills(analysis, skill_matcher):
+    """Return and store the dictionary skills of an analysis' job description"""
+    hits = skill_hits(analysis.job_skill_hits, analysis.job_description, skill_matcher)
+    analysis.job_skill_hits = skill_matcher.hits_to_bytes(hits)
+    return hits
+
+def match_skills(resume_file, job_hits, skill_matcher):
+    """Store the dictionary skills of a processed file and its coverage of the job's skills"""
+    hits = skill_hits(resume_file.skill_hits, resume_file.extracted_text, skill_matcher)
+    resume_file.skill_hits = skill_matcher.hits_to_bytes(hits)
+    resume_file.skill_coverage = skill_matcher.report(hits, job_hits)['coverage']
+
+def skill_reports(analysis, resume_files):
+    """
+    Matched and missing skills of each file, keyed by ResumeFile id, for
+    the results page. Only stored hits are read: files whose hits predate
+    the current dictionary get no report until backfill_skill_hits() has
+    rescanned them, so a listing never decompresses resume text. Empty
+    when no dictionary is loaded.
+    """
+    skill_matcher = get_skill_matcher()
+    if skill_matcher is None:
+        return {}
+
+    job_hits = skill_hits(analysis.job_skill_hits, analysis.job_description, skill_matcher)
+    reports = {}
+    for resume_file in resume_files:
+        hits = skill_matcher.hits_from_bytes(resume_file.skill_hits)
+        if hits is not None:
+            reports[resume_file.id] = skill_matcher.report(hits, job_hits)
+    return reports
+
+def backfill_skill_hits(batch_size=200):
+    """
+    Rescan the processed files whose skill hits are missing (rows migrated
+    from before skill matching) or predate the loaded dictionary, and store
+    their hits and coverage, one committed batch at a time.
+    Must be called inside an application context.
+    Returns the number of files updated.
+    """
+    skill_matcher = get_skill_matcher()
+    if skill_matcher is None:
+        return 0
+
+    version = bytes.fromhex(skill_matcher.version)
+    stale = ResumeFile.query.filter(
+        ResumeFile.status == 'processed',
+        ResumeFile.text_hash.isnot(None),
+        db.or_(ResumeFile.skill_hits.is_(None),
+               db.func.substr(ResumeFile.skill_hits, 1, len(version)) != version)
+    ).options(
+        db.joinedload(ResumeFile.analysis),
+        db.joinedload(ResumeFile.text_blob).undefer(ResumeText.data)
+    ).order_by(ResumeFile.id)
+
+    updated = 0
+    last_id = 0
+    while True:
+        batch = stale.filter(ResumeFile.id > last_id).limit(batch_size).all()
+        if not batch:
+            break
+        for resume_file in batch:
+            match_skills(resume_file, job_skills(resume_file.analysis, skill_matcher), skill_matcher)
+        db.session.commit()
+        updated += len(batch)
+        last_id = batch[-1].id
+    return updated
+
+def schedule_skill_backfill(app):
+    """Backfill stale skill hits on a background thread"""
+    def run():
+        try:
+            with app.app_context():
+                updated = backfill_skill_hits()
+            if updated:
+                logger.info(f"Skill hits backfilled for {updated} files")
+        except Exception as e:
+            logger.error(f"Error backfilling skill hits: {e}")
+
+    thread = threading.Thread(target=run, name='skill-backfill', daemon=True)
+    thread.start()
+    return thread
+
+def embed(resume_files, documents, lsa_model):
+    """
+    Return the dense LSA vectors of processed files, one row per file.
+    Vectors stored with the current model version are reused; the others
+    are projected in one batch and stored on the files.
+    """
+    rows = [None] * len(resume_files)
+    missing = []
+    for index, resume_file in enumerate(resume_files):
+        if resume_file.embedding is not None and resume_file.embedding_version == lsa_model.version:
+            rows[index] = vector_from_bytes(resume_file.embedding)
+        else:
+            missing.append(index)
+
+    if missing:
+        vectors = lsa_model.transform([documents[i] for i in missing])
+        for index, vector in zip(missing, vectors):
+            rows[index] = vector
+            resume_files[index].embedding = vector_to_bytes(vector)
+            resume_files[index].embedding_version = lsa_model.version
+
+    if not rows:
+        return np.empty((0, lsa_model.dimensions), dtype=np.float32)
+    return np.vstack(rows)
+
+def run_analysis(analysis, resume_files, upload_folder, weights_dict=None,
+                 max_workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB,
+                 chunk_size=None, discard_failed=False, on_progress=None, extract_options=None,
+                 in_memory_uploads=None):
+    """
+    Extract, preprocess and score the resume files of an analysis.
+
+    Files are processed in chunks; after each chunk its files are clustered
+    and scored and the analysis results are updated, so partial results are
+    visible while a large batch is still running. Earlier files keep their
+    cluster and score, except that scores from a vectorizer fitted on the
+    batch (no corpus IDF model yet) are redone over the whole batch at the
+    end. Near-duplicate files are collapsed: only the first file of each
+    cluster is scored, and the others reuse its score. In the 'lsa' scoring mode, resumes are scored
+    from their stored dense vectors once the LSA model is fitted.
+    Dictionary skills are matched per file for the results page.
+
+    Args:
+        analysis: ResumeAnalysis being processed
+        resume_files: ResumeFile records, saved under upload_folder
+        upload_folder: Folder holding the stored uploads
+        weights_dict: Section weights (see scoring.score_resumes), part of
+            the memoized score key
+        max_workers, timeout, memory_limit_mb: Sandbox settings, see pipeline.process_files
+        chunk_size: Files per chunk; None processes everything in one chunk
+        discard_failed: Delete failed records instead of marking them failed
+        on_progress: Callable invoked after each chunk, e.g. to commit
+        extract_options: Extraction limits, see pipeline.extraction_options
+        in_memory_uploads: Optional {ResumeFile: InMemoryUpload} for files
+            that were never written to upload_folder
+
+    Returns:
+        List of (filename, score) tuples for the processed files
+    """
+    preprocessor = get_preprocessor()
+    processed_job = preprocessor.tokenize(analysis.job_description)
+    extraction_cache = get_extraction_cache()
+    in_memory_uploads = in_memory_uploads or {}
+
+    skill_matcher = get_skill_matcher()
+    job_hits = job_skills(analysis, skill_matcher) if skill_matcher else None
+
+    # Pin one LSA model version for the whole run
+    lsa_model = get_lsa_model()
+    lsa_model = lsa_model.snapshot() if lsa_model is not None and lsa_model.ready else None
+    job_vector = lsa_model.transform([processed_job])[0] if lsa_model else None
+    # Pin one IDF model version too, so every chunk is scored alike
+    idf_model = get_idf_model()
+    idf_model = idf_model.snapshot() if idf_model is not None and idf_model.ready else None
+
+    chunk_size = chunk_size or max(len(resume_files), 1)
+    processed_files = []
+    processed_resumes = []
+    processed_sections = []
+    cluster_index = ClusterIndex()
+    clusters = []
+    scores_by_index = {}
+    results = []
+    scored_chunks = 0
+
+    def score(indices):
+        """Scores of the processed files at the given indices"""
+        sections = [processed_sections[i] for i in indices]
+        if lsa_model:
+            vectors = embed([processed_files[i] for i in indices], [processed_resumes[i] for i in indices], lsa_model)
+            # Sections are projected too when weights combine their scores
+            section_vectors = None
+            if weight_vector(weights_dict) is not None:
+                section_vectors = lsa_model.transform(section_documents(sections))
+            return score_vectors(job_vector, vectors, section_vectors, sections, weights_dict)
+        return score_resumes_cached(processed_job, [processed_resumes[i] for i in indices],
+                                    idf_model, get_score_cache(), weights_dict, sections)
+
+    for start in range(0, len(resume_files), chunk_size):
+        chunk = resume_files[start:start + chunk_size]
+
+        # Files already processed by an earlier, interrupted run or seen in
+        # an earlier upload are reused without parsing them again
+        pending = []
+        for resume_file in chunk:
+            if resume_file.status != 'processed' or resume_file.text_hash is None:
+                cached_text = extraction_cache.get(resume_file.content_hash, extract_options) if extraction_cache else None
+                if cached_text is None:
+                    pending.append(resume_file)
+                    continue
+                resume_file.extracted_text = cached_text
+                resume_file.status = 'processed'
+                resume_file.error = None
+            
+            tokens, sections = tokenize_sections(resume_file.extracted_text, preprocessor)
+            processed_files.append(resume_file)
+            processed_resumes.append(tokens)
+            processed_sections.append(sections)
+            clusters.append(cluster_index.add(fingerprint(resume_file, analysis)))
+            if skill_matcher:
+                match_skills(resume_file, job_hits, skill_matcher)
+
+        extracted = process_files(
+            [in_memory_uploads.get(f) or os.path.join(upload_folder, f.stored_filename) for f in pending],
+            max_workers=max_workers,
+            timeout=timeout,
+            options=extract_options,
+            memory_limit_mb=memory_limit_mb
+        )
+
+        for resume_file, result in zip(pending, extracted):
+            if result['error']:
+                logger.error(f"Error processing file {resume_file.original_filename}: {result['error']}")
+                if discard_failed:
+                    # Remove the record if processing fails
+                    if resume_file in db.session.new:
+                        db.session.expunge(resume_file)
+                    else:
+                        db.session.delete(resume_file)
+                else:
+                    resume_file.status = 'failed'
+                    resume_file.error = result['error']
+                continue
+
+            resume_file.extracted_text = result['text']  # Store the extracted text
+            resume_file.status = 'processed'
+            resume_file.error = None
+            processed_files.append(resume_file)
+            processed_resumes.append(result['tokens'])
+            processed_sections.append(result['sections'])
+            clusters.append(cluster_index.add(fingerprint(resume_file, analysis)))
+            if skill_matcher:
+                match_skills(resume_file, job_hits, skill_matcher)
+            
+            if extraction_cache:
+                extraction_cache.put(resume_file.content_hash, result['text'], extract_options)
+
+        # Score the first file of each new near-duplicate cluster in one pass
+        new_files = range(len(results), len(processed_files))
+        representatives = [i for i in new_files if clusters[i] is None]
+        if representatives:
+            scores_by_index.update(zip(representatives, score(representatives)))
+            scored_chunks += 1
+        
+        for index in new_files:
+            resume_file = processed_files[index]
+            cluster = clusters[index]
+            if cluster is not None:
+                resume_file.duplicate_of = processed_files[cluster]
+            resume_file.score = scores_by_index[index if cluster is None else cluster]
+            results.append((resume_file.original_filename, resume_file.score))
+        analysis.set_results(results)
+
+        if on_progress:
+            on_progress()
+
+    if not lsa_model and idf_model is None and scored_chunks > 1:
+        # Batch-fitted scores depend on the files scored together
+        scores_by_index = dict(zip(scores_by_index, score(list(scores_by_index))))
+        results = []
+        for index, resume_file in enumerate(processed_files):
+            cluster = clusters[index]
+            resume_file.score = scores_by_index[index if cluster is None else cluster]
+            results.append((resume_file.original_filename, resume_file.score))
+        analysis.set_results(results)
+
+    return results
+
+def match_resume(upload, content_hash, analyses, max_workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT,
+                 memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB, extract_options=None):
+    """
+    Rank the job descriptions of past analyses for a single resume.
+
+    The resume is extracted and tokenized once; analyses sharing the same
+    job description are scored once and reported together.
+
+    Args:
+        upload: InMemoryUpload (or path) of the resume
+        content_hash: SHA-256 of the resume, used for the extraction cache
+        analyses: ResumeAnalysis records whose job descriptions are matched
+        max_workers, timeout, memory_limit_mb: Sandbox settings, see pipeline.process_files
+        extract_options: Extraction limits, see pipeline.extraction_options
+
+    Returns:
+        List of dicts with analysis_id, job_title, created_at and score,
+        best match first
+
+    Raises:
+        ValueError: If no text could be extracted from the resume
+    """
+    preprocessor = get_preprocessor()
+    extraction_cache = get_extraction_cache()
+
+    text = extraction_cache.get(content_hash, extract_options) if extraction_cache else None
+    if text is None:
+        result = process_files([upload], max_workers=min(max_workers, 1), timeout=timeout,
+                               options=extract_options, memory_limit_mb=memory_limit_mb)[0]
+        if result['error']:
+            raise ValueError(result['error'])
+        text = result['text']
+        if extraction_cache:
+            extraction_cache.put(content_hash, text, extract_options)
+    resume_document = preprocessor.tokenize(text)
+
+    # Requisitions re-run several times share one job description
+    groups = {}
+    for analysis in analyses:
+        groups.setdefault(analysis.job_description, []).append(analysis)
+    job_descriptions = list(groups)
+
+    scores = score_jobs(resume_document, [preprocessor.tokenize(jd) for jd in job_descriptions],
+                        get_idf_model())
+
+    matches = []
+    for job_description, score in zip(job_descriptions, scores):
+        for analysis in groups[job_description]:
+            matches.append({
+                'analysis_id': analysis.id,
+                'job_title': analysis.job_title,
+                'created_at': analysis.created_at.isoformat() if analysis.created_at else None,
+                'score': score
+            })
+    matches.sort(key=lambda match: match['score'], reverse=True)
+    return matches
+
+def enqueue_analysis(analysis, weights_dict=None):
+    """Queue an analysis for the background worker"""
+    analysis.state = 'queued'
+    job = AnalysisJob(analysis_id=analysis.id, weights_dict=weights_dict)
+    db.session.add(job)
+    return job
+
+def begin_upload(analysis, weights_dict=None):
+    """
+    Hold an analysis whose files are still being uploaded in chunks.
+    The job is parked as 'waiting' to keep the weights until the first
+    file is complete.
+    """
+    analysis.state = 'uploading'
+    job = AnalysisJob(analysis_id=analysis.id, weights_dict=weights_dict)
+    job.status = 'waiting'
+    db.session.add(job)
+    return job
+
+def queue_uploaded_files(analysis):
+    """
+    Make sure a job picks up files completed since the last one started.
+    A running job may already have loaded its file list, so a new job is
+    queued unless one is still waiting in the queue.
+    """
+    if analysis.jobs.filter_by(status='queued').first() is not None:
+        return None
+
+    latest = analysis.jobs.order_by(AnalysisJob.id.desc()).first()
+    if latest is not None and latest.status == 'waiting':
+        latest.status = 'queued'
+        analysis.state = 'queued'
+        return latest
+    return enqueue_analysis(analysis, latest.get_weights() if latest else None)
+
+def expire_uploads(upload_folder, ttl):
+    """
+    Fail the files of abandoned uploads so they stop holding back the
+    readers that wait for every file to finish (see models.finished_through).
+
+    A file still uploading whose last chunk (or start, before any chunk)
+    is older than ttl seconds, and a file pending for longer than that
+    with no queued or running job of its analysis, become 'failed' with
+    the error 'upload expired'; partial files are deleted. Analyses left
+    without unfinished files are closed like a finished job would.
+    Returns the number of files expired.
+    """
+    now = datetime.datetime.utcnow()
+    cutoff = now - datetime.timedelta(seconds=ttl)
+    live_jobs = db.session.query(AnalysisJob.analysis_id) \
+        .filter(AnalysisJob.status.in_(('queued', 'running')))
+
+    expired = []
+    for resume_file in ResumeFile.query.filter(ResumeFile.status == 'uploading', ResumeFile.created_at < cutoff):
+        path = partial_path(upload_folder, resume_file)
+        try:
+            last_chunk = datetime.datetime.utcfromtimestamp(os.path.getmtime(path))
+        except OSError:
+            last_chunk = resume_file.created_at
+        if last_chunk < cutoff:
+            expired.append(resume_file)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    expired.extend(ResumeFile.query.filter(ResumeFile.status == 'pending',
+                                           ResumeFile.created_at < cutoff,
+                                           ~ResumeFile.analysis_id.in_(live_jobs)))
+    if not expired:
+        return 0
+
+    for resume_file in expired:
+        resume_file.status = 'failed'
+        resume_file.error = 'upload expired'
+    db.session.flush()
+
+    for analysis in ResumeAnalysis.query.filter(ResumeAnalysis.id.in_({f.analysis_id for f in expired})):
+        if analysis.resume_files.filter(ResumeFile.status.in_(UNFINISHED_STATUSES)).count():
+            continue
+        if analysis.jobs.filter(AnalysisJob.status.in_(('queued', 'running'))).count():
+            continue
+        for job in analysis.jobs.filter_by(status='waiting'):
+            job.status = 'failed'
+            job.error = 'upload expired'
+            job.finished_at = now
+        analysis.state = 'completed' if analysis.resume_files.filter_by(status='processed').count() else 'failed'
+
+    db.session.commit()
+    logger.info(f"Expired {len(expired)} abandoned upload files")
+    return len(expired)
+
+def claim_next_job(worker_id):
+    """
+    Atomically claim the oldest queued job.
+    The conditional UPDATE guarantees only one worker wins a job; jobs of
+    an analysis that already has a running job wait for it to finish.
+    """
+    running = db.session.query(AnalysisJob.analysis_id).filter(AnalysisJob.status == 'running')
+    while True:
+        job = AnalysisJob.query \
+            .filter(AnalysisJob.status == 'queued', ~AnalysisJob.analysis_id.in_(running)) \
+            .order_by(AnalysisJob.id).first()
+        if job is None:
+            return None
+
+        now = datetime.datetime.utcnow()
+        claimed = AnalysisJob.query \
+            .filter_by(id=job.id, status='queued') \
+            .update({
+                'status': 'running',
+                'worker_id': worker_id,
+                'attempts': AnalysisJob.attempts + 1,
+                'started_at': now,
+                'heartbeat_at': now
+            }, synchronize_session=False)
+        db.session.commit()
+
+        if claimed:
+            return db.session.get(AnalysisJob, job.id)
+
+def requeue_stale_jobs(stale_after):
+    """
+    Return jobs whose worker stopped sending heartbeats to the queue.
+    Jobs that exhausted their attempts are marked as failed instead.
+    """
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=stale_after)
+    stale_jobs = AnalysisJob.query \
+        .filter(AnalysisJob.status == 'running', AnalysisJob.heartbeat_at < cutoff) \
+        .all()
+
+    for job in stale_jobs:
+        if job.attempts >= MAX_ATTEMPTS:
+            job.status = 'failed'
+            job.error = 'Worker stopped responding'
+            job.finished_at = datetime.datetime.utcnow()
+            job.analysis.state = 'failed'
+            logger.error(f"Job {job.id} failed after {job.attempts} attempts")
+        else:
+            job.status = 'queued'
+            logger.warning(f"Requeued stale job {job.id}")
+
+    db.session.commit()
+    return len(stale_jobs)
+
+def run_job(job, config):
+    """Process a claimed job and record its outcome"""
+    analysis = job.analysis
+    analysis.state = 'processing'
+    db.session.commit()
+
+    def heartbeat():
+        job.heartbeat_at = datetime.datetime.utcnow()
+        db.session.commit()
+
+    try:
+        # Files still being uploaded are left for a later job, and files
+        # that already failed are not retried
+        resume_files = analysis.resume_files \
+            .filter(ResumeFile.status.in_(('pending', 'processed'))) \
+            .order_by(ResumeFile.id).all()
+        results = run_analysis(
+            analysis,
+            resume_files,
+            config['UPLOAD_FOLDER'],
+            weights_dict=job.get_weights(),
+            max_workers=config['EXTRACTION_WORKERS'],
+            timeout=config['EXTRACTION_TIMEOUT'],
+            memory_limit_mb=config['EXTRACTION_MEMORY_LIMIT_MB'],
+            chunk_size=config['ANALYSIS_JOB_CHUNK_SIZE'],
+            on_progress=heartbeat,
+            extract_options=extraction_options(config)
+        )
+
+        # Files completed while this job ran belong to another job; the
+        # analysis is only finished once no file or job is left over
+        other_jobs = analysis.jobs.filter(AnalysisJob.id != job.id,
+                                          AnalysisJob.status.in_(('queued', 'running'))).all()
+        pending = analysis.resume_files.filter_by(status='pending').count()
+        uploading = analysis.resume_files.filter_by(status='uploading').count()
+        if other_jobs or pending:
+            if not other_jobs:
+                queue_uploaded_files(analysis)
+            analysis.state = 'processing' if any(j.status == 'running' for j in other_jobs) else 'queued'
+            job.status = 'done'
+        elif uploading:
+            analysis.state = 'uploading'
+            job.status = 'done'
+        else:
+            analysis.state = 'completed' if results else 'failed'
+            job.status = 'done' if results else 'failed'
+            if not results:
+                job.error = 'No valid resume files were processed'
+        job.finished_at = datetime.datetime.utcnow()
+        db.session.commit()
+        logger.info(f"Job {job.id} finished: {len(results)} of {len(resume_files)} files processed")
+        return True
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error running job {job.id}: {e}")
+        job.status = 'failed'
+        job.error = str(e)
+        job.finished_at = datetime.datetime.utcnow()
+        analysis.state = 'failed'
+        db.session.commit()
+        return False
+
+def get_analysis_status(analysis):
+    """Summarize the per-file progress of an analysis"""
+    files = analysis.resume_files.order_by(ResumeFile.id).all()
+    counts = {'uploading': 0, 'pending': 0, 'processed': 0, 'failed': 0}
+    for resume_file in files:
+        counts[resume_file.status] = counts.get(resume_file.status, 0) + 1
+
+    return {
+        'analysis_id': analysis.id,
+        'state': analysis.state,
+        'total': len(files),
+        'uploading': counts['uploading'],
+        'pending': counts['pending'],
+        'processed': counts['processed'],
+        'failed': counts['failed'],
+        'best_match_file': analysis.best_match_file,
+        'best_match_score': analysis.best_match_score,
+        'files': [
+            {
+                'id': f.id,
+                'filename': f.original_filename,
+                'status': f.status,
+                'score': f.score,
+                'error': f.error,
+                'duplicate_of_id': f.duplicate_of_id,
+                'skill_coverage': f.skill_coverage
+            }
+            for f in files
+        ]
+    }
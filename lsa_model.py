@@ -0,0 +1,256 @@
+import os
+import logging
+import threading
+import datetime
+
+import joblib
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+from preprocessing import get_preprocessor
+from idf_model import IdfModel, get_idf_model, content_version
+
+# Configure logging
+logger = logging.getLogger('resume_analyzer.lsa_model')
+
+# Bump when the persisted layout changes; older files are refitted
+FORMAT_VERSION = 1
+
+# Defaults used when the app config does not override them
+DEFAULT_COMPONENTS = 256
+MIN_DOCUMENTS = 500
+MAX_TRAINING_DOCUMENTS = 50000
+
+# Refit once the resume corpus has grown by this fraction
+REFIT_GROWTH = 0.5
+
+class LsaModel:
+    """
+    Latent semantic projection of TF-IDF vectors (TruncatedSVD).
+
+    Resumes and job descriptions are mapped to L2-normalized float32
+    vectors of n_components dimensions, so similarity is a dense dot
+    product and related terms share dimensions. The vocabulary and IDF
+    weights the SVD was fitted on are kept with it. `version` identifies
+    the vectors stored per ResumeFile; it is derived from the IDF model
+    version and the SVD components, see idf_model.content_version().
+    """
+
+    def __init__(self, path=None, n_components=DEFAULT_COMPONENTS, min_documents=MIN_DOCUMENTS,
+                 max_training_documents=MAX_TRAINING_DOCUMENTS):
+        self.path = path
+        self.n_components = n_components
+        self.min_documents = min_documents
+        self.max_training_documents = max_training_documents
+
+        self.version = 0
+        self.n_docs = 0
+        self.corpus_size = 0
+        self.explained_variance = None
+        self.updated_at = None
+
+        # (frozen IdfModel, components) swapped as one tuple
+        self._state = None
+        self._fit_thread = None
+        self._fit_lock = threading.Lock()
+
+    @property
+    def ready(self):
+        """True once the projection has been fitted"""
+        return self._state is not None
+
+    def fit(self, documents, idf_model):
+        """
+        Fit the projection on preprocessed documents (token lists),
+        weighted with the corpus IDF model.
+        """
+        if not idf_model.ready:
+            raise ValueError("The corpus IDF model is not ready")
+
+        weighting = idf_model.snapshot()
+        tfidf = weighting.transform(documents)
+
+        n_components = min(self.n_components, tfidf.shape[0] - 1, tfidf.shape[1] - 1)
+        if n_components < 1:
+            raise ValueError("Not enough documents to fit the projection")
+
+        svd = TruncatedSVD(n_components=n_components, algorithm='randomized', random_state=0)
+        svd.fit(tfidf)
+
+        self._state = (weighting, svd.components_.astype(np.float32))
+        self.n_docs = tfidf.shape[0]
+        self.explained_variance = float(svd.explained_variance_ratio_.sum())
+        self.version = content_version(weighting.version, self._state[1])
+        self.updated_at = datetime.datetime.utcnow()
+
+    @property
+    def dimensions(self):
+        """Length of the projected vectors"""
+        return 0 if self._state is None else self._state[1].shape[0]
+
+    def snapshot(self):
+        """Copy of the fitted state that later refits leave untouched"""
+        frozen = LsaModel(n_components=self.n_components, min_documents=self.min_documents)
+        frozen.version = self.version
+        frozen.n_docs = self.n_docs
+        frozen.updated_at = self.updated_at
+        frozen._state = self._state
+        return frozen
+
+    def transform(self, documents):
+        """Project preprocessed documents into L2-normalized float32 vectors"""
+        if self._state is None:
+            raise ValueError("LSA model has not been fitted")
+
+        weighting, components = self._state
+        tfidf = weighting.transform(documents).astype(np.float32)
+        vectors = np.asarray(tfidf @ components.T, dtype=np.float32)
+        return normalize(vectors)
+
+    def save(self, path=None):
+        """Persist the model atomically to disk"""
+        path = path or self.path
+        if not path or self._state is None:
+            return
+
+        weighting, components = self._state
+        vocabulary, idf = weighting.weights()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = {
+            'format_version': FORMAT_VERSION,
+            'version': self.version,
+            'n_docs': self.n_docs,
+            'corpus_size': self.corpus_size,
+            'explained_variance': self.explained_variance,
+            'updated_at': self.updated_at,
+            'idf_version': weighting.version,
+            'vocabulary': vocabulary,
+            'idf': idf,
+            'components': components
+        }
+        tmp_path = f"{path}.tmp"
+        joblib.dump(payload, tmp_path, compress=3)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved LSA model v{self.version} ({components.shape[0]} dimensions) to {path}")
+
+    def load(self, path=None):
+        """Load a persisted model, returning True on success"""
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return False
+
+        try:
+            payload = joblib.load(path)
+            if payload.get('format_version') != FORMAT_VERSION:
+                logger.warning(f"Ignoring LSA model with unsupported format at {path}")
+                return False
+
+            weighting = IdfModel.from_weights(payload['vocabulary'], payload['idf'])
+            self._state = (weighting, payload['components'])
+            self.version = content_version(weighting.version, payload['components'])
+            self.n_docs = payload['n_docs']
+            self.corpus_size = payload['corpus_size']
+            self.explained_variance = payload['explained_variance']
+            self.updated_at = payload['updated_at']
+            logger.info(f"Loaded LSA model v{self.version} from {path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error loading LSA model from {path}: {e}")
+            return False
+
+    def fit_from_database(self):
+        """
+        Refit on the most recent stored resumes once the corpus has grown
+        enough. Must be called inside an application context.
+        Returns True when the model was refitted.
+        """
+        from models import ResumeFile, ResumeText
+
+        with self._fit_lock:
+            # Another process may have refitted the file in the meantime
+            if self.path and os.path.exists(self.path):
+                on_disk = LsaModel(self.path)
+                if on_disk.load() and on_disk.version != self.version and \
+                        (self.updated_at is None or on_disk.updated_at > self.updated_at):
+                    self._adopt(on_disk)
+
+            idf_model = get_idf_model()
+            if idf_model is None or not idf_model.ready:
+                return False
+
+            query = ResumeFile.query.filter(ResumeFile.text_hash.isnot(None))
+            corpus_size = query.count()
+            if corpus_size < self.min_documents:
+                return False
+            if self.ready and corpus_size < self.corpus_size * (1 + REFIT_GROWTH):
+                return False
+
+            rows = query.join(ResumeText, ResumeFile.text_hash == ResumeText.text_hash) \
+                .with_entities(ResumeText.data) \
+                .order_by(ResumeFile.id.desc()) \
+                .limit(self.max_training_documents).all()
+            preprocessor = get_preprocessor()
+            self.fit([preprocessor.tokenize(ResumeText.decode(data)) for data, in rows], idf_model)
+            self.corpus_size = corpus_size
+            self.save()
+            return True
+
+    def schedule_fit(self, app):
+        """Refit from the database on a background thread when due"""
+        if self._fit_thread is not None and self._fit_thread.is_alive():
+            return
+
+        def run():
+            try:
+                with app.app_context():
+                    if self.fit_from_database():
+                        logger.info(f"LSA model refitted to v{self.version} "
+                                    f"({self.explained_variance:.0%} of variance explained)")
+            except Exception as e:
+                logger.error(f"Error fitting LSA model: {e}")
+
+        self._fit_thread = threading.Thread(target=run, name='lsa-fit', daemon=True)
+        self._fit_thread.start()
+
+    def _adopt(self, other):
+        """Take over the fitted state of another model instance"""
+        self.version = other.version
+        self.n_docs = other.n_docs
+        self.corpus_size = other.corpus_size
+        self.explained_variance = other.explained_variance
+        self.updated_at = other.updated_at
+        self._state = other._state
+
+
+def vector_to_bytes(vector):
+    """Compact storage form of a dense vector"""
+    return np.asarray(vector, dtype='<f4').tobytes()
+
+def vector_from_bytes(data):
+    """Dense vector back from its storage form"""
+    return np.frombuffer(data, dtype='<f4')
+
+
+_lsa_model = None
+
+def init_lsa_model(app):
+    """Load the persisted LSA model when the 'lsa' scoring mode is enabled"""
+    global _lsa_model
+    if app.config.get('SCORING_MODE', 'tfidf') != 'lsa':
+        _lsa_model = None
+        return None
+
+    path = app.config.get('LSA_MODEL_PATH') or os.path.join(app.instance_path, 'models', 'lsa_model.joblib')
+    _lsa_model = LsaModel(
+        path,
+        n_components=app.config.get('LSA_COMPONENTS', DEFAULT_COMPONENTS),
+        min_documents=app.config.get('LSA_MIN_DOCUMENTS', MIN_DOCUMENTS)
+    )
+    _lsa_model.load()
+    _lsa_model.schedule_fit(app)
+    return _lsa_model
+
+def get_lsa_model():
+    """Return the process-wide LSA model, or None when the 'lsa' scoring mode is off"""
+    return _lsa_model
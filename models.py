@@ -1,4 +1,7 @@
 import os
+import zlib
+import hashlib
+import logging
 import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
@@ -6,9 +9,22 @@ from werkzeug.security import generate_password_hash, check_password_hash
 import json
 import uuid
 
+# Configure logging
+logger = logging.getLogger('resume_analyzer.models')
+
 # Initialize SQLAlchemy
 db = SQLAlchemy()
 
+# Score bands of the results page
+HIGH_MATCH_SCORE = 0.7
+MEDIUM_MATCH_SCORE = 0.4
+
+# user_id of the statistics rows that cover all users
+ALL_USERS = 0
+
+# ResumeFile statuses of files still on their way to 'processed' or 'failed'
+UNFINISHED_STATUSES = ('uploading', 'pending')
+
 class User(UserMixin, db.Model):
     """User model for authentication and profile management"""
     __tablename__ = 'users'
@@ -73,13 +89,25 @@ class ResumeAnalysis(db.Model):
     session_id = db.Column(db.String(64), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     
-    # Results are stored as JSON for flexibility
-    results = db.Column(db.Text)
+    # Processing state: uploading, queued, processing, completed or failed
+    state = db.Column(db.String(16), default='completed', server_default='completed', nullable=False)
+    
+    # Scores live on ResumeFile.score; the best match is kept here for listings
     best_match_file = db.Column(db.String(256))
     best_match_score = db.Column(db.Float)
     
+    # Skills named in the job description, see skills.SkillMatcher.hits_to_bytes
+    job_skill_hits = db.Column(db.LargeBinary)
+    
+    __table_args__ = (
+        # History listings are read newest first by (created_at, id), see pagination.keyset_paginate
+        db.Index('ix_resume_analyses_user_created', user_id, created_at, id),
+        db.Index('ix_resume_analyses_created', created_at, id),
+    )
+    
     # Relationships
     resume_files = db.relationship('ResumeFile', backref='analysis', lazy='dynamic', cascade='all, delete-orphan')
+    jobs = db.relationship('AnalysisJob', backref='analysis', lazy='dynamic', cascade='all, delete-orphan')
     
     def __init__(self, user_id, job_description, job_title=None):
         self.user_id = user_id
@@ -88,20 +116,52 @@ class ResumeAnalysis(db.Model):
         self.session_id = str(uuid.uuid4())
     
     def set_results(self, results_list):
-        """Store results as JSON string"""
-        self.results = json.dumps(results_list)
-        
-        # Set best match if available
+        """Record the best match of (filename, score) results already stored on the files"""
         if results_list:
             best_match = max(results_list, key=lambda x: x[1])
             self.best_match_file = best_match[0]
             self.best_match_score = best_match[1]
     
+    @property
+    def resume_count(self):
+        """Number of files, preloaded by load_resume_counts() or counted on first use"""
+        count = getattr(self, '_resume_count', None)
+        if count is None:
+            count = self._resume_count = self.resume_files.count()
+        return count
+    
+    @staticmethod
+    def load_resume_counts(analyses):
+        """Count the files of several analyses in one grouped query instead of one COUNT each"""
+        ids = [analysis.id for analysis in analyses]
+        counts = dict(
+            db.session.query(ResumeFile.analysis_id, db.func.count(ResumeFile.id))
+            .filter(ResumeFile.analysis_id.in_(ids))
+            .group_by(ResumeFile.analysis_id)
+        ) if ids else {}
+        for analysis in analyses:
+            analysis._resume_count = counts.get(analysis.id, 0)
+        return analyses
+    
+    def ranked_files(self):
+        """Query of the scored files, best first, served by the (analysis_id, score) index"""
+        return self.resume_files.filter(ResumeFile.score.isnot(None)) \
+            .order_by(ResumeFile.score.desc(), ResumeFile.id)
+    
     def get_results(self):
-        """Get results as Python list"""
-        if self.results:
-            return json.loads(self.results)
-        return []
+        """(filename, score) pairs, best first, as the former JSON results column held them"""
+        rows = self.ranked_files().with_entities(ResumeFile.original_filename, ResumeFile.score)
+        return [[filename, score] for filename, score in rows]
+    
+    def score_distribution(self):
+        """Number of high, medium and low scores, counted in one aggregate query"""
+        high, medium, low = db.session.query(
+            db.func.count(db.case((ResumeFile.score >= HIGH_MATCH_SCORE, 1))),
+            db.func.count(db.case(((ResumeFile.score >= MEDIUM_MATCH_SCORE)
+                                   & (ResumeFile.score < HIGH_MATCH_SCORE), 1))),
+            db.func.count(db.case((ResumeFile.score < MEDIUM_MATCH_SCORE, 1)))
+        ).filter(ResumeFile.analysis_id == self.id).one()
+        return {'high': high, 'medium': medium, 'low': low}
     
     def to_dict(self):
         """Convert analysis to dictionary for serialization"""
@@ -112,7 +172,8 @@ class ResumeAnalysis(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'best_match_file': self.best_match_file,
             'best_match_score': self.best_match_score,
-            'resume_count': self.resume_files.count(),
+            'state': self.state,
+            'resume_count': self.resume_count,
             'results': self.get_results()
         }
     
@@ -130,16 +191,56 @@ class ResumeFile(db.Model):
     stored_filename = db.Column(db.String(256), nullable=False)
     file_size = db.Column(db.Integer)  # Size in bytes
     file_type = db.Column(db.String(32))
+    content_hash = db.Column(db.String(64), index=True)  # SHA-256 of the uploaded file
     score = db.Column(db.Float)
-    extracted_text = db.Column(db.Text)
+    text_hash = db.Column(db.String(64), db.ForeignKey('resume_texts.text_hash'), index=True)  # Extracted text, see ResumeText
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     
-    def __init__(self, analysis_id, original_filename, stored_filename, file_size=None, file_type=None):
+    # Processing status: uploading, pending, processed or failed
+    status = db.Column(db.String(16), default='processed', server_default='processed', nullable=False)
+    error = db.Column(db.Text)
+    
+    # MinHash signature of the extracted text, and the earlier file it near-duplicates
+    minhash = db.Column(db.LargeBinary)
+    duplicate_of_id = db.Column(db.Integer, db.ForeignKey('resume_files.id'))
+    
+    # Dense LSA vector of the extracted text, and the LSA model version that produced it
+    embedding = db.Column(db.LargeBinary)
+    embedding_version = db.Column(db.Integer)
+    
+    # Dictionary skills found in the extracted text, and the share of the job's skills among them
+    skill_hits = db.Column(db.LargeBinary)
+    skill_coverage = db.Column(db.Float)
+    
+    __table_args__ = (
+        # Results pages and exports read an analysis best first, see ResumeAnalysis.ranked_files
+        db.Index('ix_resume_files_analysis_score', analysis_id, score.desc()),
+    )
+    
+    # Relationships
+    lsh_bands = db.relationship('ResumeLshBand', backref='resume_file', lazy='dynamic', cascade='all, delete-orphan')
+    duplicate_of = db.relationship('ResumeFile', remote_side=[id])
+    text_blob = db.relationship('ResumeText')
+    
+    def __init__(self, analysis_id, original_filename, stored_filename, file_size=None, file_type=None,
+                 status='processed', content_hash=None):
         self.analysis_id = analysis_id
         self.original_filename = original_filename
         self.stored_filename = stored_filename
         self.file_size = file_size
         self.file_type = file_type
+        self.status = status
+        self.content_hash = content_hash
+    
+    @property
+    def extracted_text(self):
+        """Extracted text, loaded and decompressed from the blob store on first access"""
+        return self.text_blob.text if self.text_blob is not None else None
+    
+    @extracted_text.setter
+    def extracted_text(self, text):
+        self.text_blob = ResumeText.for_text(text) if text is not None else None
+        self.text_hash = self.text_blob.text_hash if self.text_blob is not None else None
     
     def to_dict(self):
         """Convert file to dictionary for serialization"""
@@ -150,6 +251,10 @@ class ResumeFile(db.Model):
             'file_size': self.file_size,
             'file_type': self.file_type,
             'score': self.score,
+            'status': self.status,
+            'error': self.error,
+            'duplicate_of_id': self.duplicate_of_id,
+            'skill_coverage': self.skill_coverage,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
     
@@ -157,6 +262,117 @@ class ResumeFile(db.Model):
         return f'<ResumeFile {self.original_filename}: {self.score}>'
 
 
+class ResumeText(db.Model):
+    """
+    Extracted resume text, zlib-compressed and stored once per distinct
+    text. Files with the same text share one row through its SHA-256.
+    """
+    __tablename__ = 'resume_texts'
+    
+    text_hash = db.Column(db.String(64), primary_key=True)  # SHA-256 of the text
+    size = db.Column(db.Integer)  # Uncompressed size in bytes
+    data = db.deferred(db.Column(db.LargeBinary, nullable=False))  # Only loaded when the text is read
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    
+    def __init__(self, text_hash, text):
+        encoded = text.encode('utf-8')
+        self.text_hash = text_hash
+        self.size = len(encoded)
+        self.data = zlib.compress(encoded, 6)
+        self._text = text
+    
+    @property
+    def text(self):
+        """Decompressed text, cached on the instance"""
+        text = getattr(self, '_text', None)
+        if text is None:
+            text = self._text = self.decode(self.data)
+        return text
+    
+    @staticmethod
+    def decode(data):
+        """Text back from its compressed form, e.g. for rows read with with_entities()"""
+        return zlib.decompress(data).decode('utf-8') if data is not None else None
+    
+    @staticmethod
+    def hash_text(text):
+        """Key of a text in the store"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    @classmethod
+    def for_text(cls, text):
+        """Return the stored row of a text, adding it to the session if it is new"""
+        text_hash = cls.hash_text(text)
+        blob = db.session.get(cls, text_hash)
+        if blob is None:
+            blob = cls(text_hash, text)
+            db.session.add(blob)
+        return blob
+    
+    def __repr__(self):
+        return f'<ResumeText {self.text_hash[:12]}: {self.size} bytes>'
+
+
+class ResumeLshBand(db.Model):
+    """LSH band key of a resume's MinHash signature, for near-duplicate lookup"""
+    __tablename__ = 'resume_lsh_bands'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    resume_file_id = db.Column(db.Integer, db.ForeignKey('resume_files.id'), nullable=False, index=True)
+    band_key = db.Column(db.BigInteger, nullable=False, index=True)
+    
+    def __init__(self, band_key):
+        self.band_key = band_key
+    
+    def __repr__(self):
+        return f'<ResumeLshBand {self.resume_file_id}: {self.band_key}>'
+
+
+class AnalysisJob(db.Model):
+    """Model for analyses queued for the background worker"""
+    __tablename__ = 'analysis_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    analysis_id = db.Column(db.Integer, db.ForeignKey('resume_analyses.id'), nullable=False, index=True)
+    status = db.Column(db.String(16), default='queued', nullable=False, index=True)  # waiting, queued, running, done, failed
+    weights = db.Column(db.Text)  # Scoring weights as JSON, captured at submission time
+    worker_id = db.Column(db.String(64))
+    attempts = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def __init__(self, analysis_id, weights_dict=None):
+        self.analysis_id = analysis_id
+        self.status = 'queued'
+        self.attempts = 0
+        self.weights = json.dumps(weights_dict) if weights_dict else None
+    
+    def get_weights(self):
+        """Get weights as Python dictionary, or None for the defaults"""
+        if self.weights:
+            return json.loads(self.weights)
+        return None
+    
+    def to_dict(self):
+        """Convert job to dictionary for serialization"""
+        return {
+            'id': self.id,
+            'analysis_id': self.analysis_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    def __repr__(self):
+        return f'<AnalysisJob {self.id}: {self.status}>'
+
+
 class ScoringWeights(db.Model):
     """Model for storing custom scoring weights"""
     __tablename__ = 'scoring_weights'
@@ -206,6 +422,151 @@ class ScoringWeights(db.Model):
         return f'<ScoringWeights {self.name}>'
 
 
+class DailyStats(db.Model):
+    """Analyses, resumes and best match scores of one user and day, rolled up by stats.StatsRollup"""
+    __tablename__ = 'daily_stats'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)  # ALL_USERS for the system-wide series
+    day = db.Column(db.Date, nullable=False)  # UTC day the analyses were created
+    analysis_count = db.Column(db.Integer, default=0, nullable=False)
+    resume_count = db.Column(db.Integer, default=0, nullable=False)
+    scored_count = db.Column(db.Integer, default=0, nullable=False)  # Analyses with a best match
+    best_score_sum = db.Column(db.Float, default=0.0, nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='uq_daily_stats_user_day'),
+    )
+    
+    @property
+    def average_best_score(self):
+        """Mean best match score of the day's analyses, or None when none was scored"""
+        return self.best_score_sum / self.scored_count if self.scored_count else None
+    
+    def __repr__(self):
+        return f'<DailyStats {self.user_id} {self.day}: {self.analysis_count}>'
+
+
+class StatsTotals(db.Model):
+    """All-time totals of one user, or of all users, rolled up by stats.StatsRollup"""
+    __tablename__ = 'stats_totals'
+    
+    user_id = db.Column(db.Integer, primary_key=True)  # ALL_USERS for the system-wide totals
+    analysis_count = db.Column(db.Integer, default=0, nullable=False)
+    resume_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    # Only kept on the ALL_USERS row
+    user_count = db.Column(db.Integer)
+    active_user_count = db.Column(db.Integer)
+    
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<StatsTotals {self.user_id}: {self.analysis_count}>'
+
+
+def finished_through(query, after_id):
+    """
+    Highest ResumeFile id up to which every file of a query stored after
+    after_id has finished processing: just below the first file still
+    uploading or pending, or the last file when none is.
+
+    Incremental readers advance their high-water mark to it rather than to
+    the last processed file they read, so a file that finishes after
+    files stored later than it is still read once it does.
+    """
+    first_unfinished = query.filter(ResumeFile.id > after_id, ResumeFile.status.in_(UNFINISHED_STATUSES)) \
+        .with_entities(db.func.min(ResumeFile.id)).scalar()
+    if first_unfinished is not None:
+        return first_unfinished - 1
+    last_id = query.filter(ResumeFile.id > after_id).with_entities(db.func.max(ResumeFile.id)).scalar()
+    return last_id if last_id is not None else after_id
+
+def migrate_schema():
+    """
+    Bring an existing database up to date with the models.
+    db.create_all() only creates missing tables, so columns added to
+    existing tables are added here with ALTER TABLE, and their missing
+    indexes are created.
+    """
+    inspector = db.inspect(db.engine)
+    
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+            if column.server_default is not None:
+                default = column.server_default.arg
+                default = default.text if hasattr(default, 'text') else f"'{default}'"
+                ddl += f' DEFAULT {default}'
+                if not column.nullable:
+                    ddl += ' NOT NULL'
+            
+            db.session.execute(db.text(ddl))
+        
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(db.session.connection())
+    
+    db.session.commit()
+
+
+def drop_legacy_column(table_name, column_name):
+    """Drop a column the models no longer map, if the database still has it"""
+    inspector = db.inspect(db.engine)
+    if column_name not in {column['name'] for column in inspector.get_columns(table_name)}:
+        return
+    
+    try:
+        db.session.execute(db.text(f'ALTER TABLE {table_name} DROP COLUMN {column_name}'))
+        db.session.commit()
+    except Exception as e:
+        # SQLite before 3.35 cannot drop columns; the unused column is left in place
+        db.session.rollback()
+        logger.warning(f"Could not drop {table_name}.{column_name}: {e}")
+
+
+def migrate_extracted_text(batch_size=500):
+    """
+    Move text left in the legacy resume_files.extracted_text column into
+    the ResumeText store, then drop the column. Runs in batches, so an
+    interrupted migration resumes where it stopped.
+    """
+    inspector = db.inspect(db.engine)
+    if 'extracted_text' not in {column['name'] for column in inspector.get_columns('resume_files')}:
+        return
+    
+    moved = 0
+    while True:
+        rows = db.session.execute(db.text(
+            'SELECT id, extracted_text FROM resume_files WHERE extracted_text IS NOT NULL LIMIT :limit'
+        ), {'limit': batch_size}).all()
+        if not rows:
+            break
+        
+        updates = [{'id': resume_file_id, 'text_hash': ResumeText.for_text(text).text_hash}
+                   for resume_file_id, text in rows]
+        db.session.flush()  # Insert the new texts before pointing rows at them
+        db.session.execute(db.text(
+            'UPDATE resume_files SET text_hash = :text_hash, extracted_text = NULL WHERE id = :id'
+        ), updates)
+        db.session.commit()
+        moved += len(rows)
+    
+    if moved:
+        logger.info(f"Moved the extracted text of {moved} resume files to the compressed text store")
+    
+    drop_legacy_column('resume_files', 'extracted_text')
+
+
 def initialize_db(app):
     """Initialize the database with the Flask app"""
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
@@ -223,6 +584,10 @@ def initialize_db(app):
     # Create tables
     with app.app_context():
         db.create_all()
+        migrate_schema()
+        migrate_extracted_text()
+        # Scores are read from resume_files; the JSON copy of them is dropped
+        drop_legacy_column('resume_analyses', 'results')
         
         # Create admin user if none exists
         if User.query.filter_by(is_admin=True).first() is None:
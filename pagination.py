@@ -0,0 +1,118 @@
+import json
+import base64
+import logging
+import binascii
+import datetime
+
+from sqlalchemy import tuple_
+
+# Configure logging
+logger = logging.getLogger('resume_analyzer.pagination')
+
+def encode_cursor(values):
+    """Opaque, URL-safe cursor for the sort key values of a row"""
+    payload = json.dumps([value.isoformat() if isinstance(value, datetime.datetime) else value
+                          for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, columns):
+    """
+    Sort key values back from a cursor, typed after the key columns.
+
+    Raises:
+        ValueError: If the cursor was not produced for these columns
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(payload.decode('utf-8'))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Malformed cursor: {e}") from e
+
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError("Cursor does not match the sort key")
+
+    decoded = []
+    for column, value in zip(columns, values):
+        python_type = column.type.python_type
+        if python_type is datetime.datetime:
+            if not isinstance(value, str):
+                raise ValueError("Cursor does not match the sort key")
+            value = datetime.datetime.fromisoformat(value)
+        elif not isinstance(value, python_type) or isinstance(value, bool):
+            raise ValueError("Cursor does not match the sort key")
+        elif python_type is int and not -2 ** 63 <= value < 2 ** 63:
+            # SQLite integers are 64-bit; larger values fail in the driver
+            raise ValueError("Cursor value out of range")
+        decoded.append(value)
+    return decoded
+
+class KeysetPage:
+    """One page of a keyset-paginated listing, with cursors to its neighbours"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, per_page=None, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.per_page = per_page
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+def keyset_paginate(query, columns, per_page, after=None, before=None, total=None):
+    """
+    Page through a query in descending order of a unique sort key.
+
+    Instead of skipping OFFSET rows, each page starts from the key of the
+    last row seen, so with an index on the key columns every page costs
+    the same however deep it is, and rows inserted meanwhile do not shift
+    the pages.
+
+    Args:
+        query: Query to page through, without ORDER BY
+        columns: Sort key columns, the last one unique (e.g. the primary key)
+        per_page: Rows per page
+        after: Cursor of the row the page starts after (next page)
+        before: Cursor of the row the page ends before (previous page)
+        total: Number of rows in the listing, when the caller knows it
+
+    Raises:
+        ValueError: If a cursor is malformed
+    """
+    key = tuple_(*columns)
+    if before:
+        rows = query.filter(key > tuple_(*decode_cursor(before, columns))) \
+            .order_by(*[column.asc() for column in columns]) \
+            .limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        items = rows[:per_page][::-1]
+        has_prev, has_next = has_more, True
+    else:
+        if after:
+            query = query.filter(key < tuple_(*decode_cursor(after, columns)))
+        rows = query.order_by(*[column.desc() for column in columns]).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        items = rows[:per_page]
+        has_prev, has_next = after is not None, has_more
+
+    def cursor(item):
+        return encode_cursor([getattr(item, column.key) for column in columns])
+
+    return KeysetPage(
+        items,
+        next_cursor=cursor(items[-1]) if items and has_next else None,
+        prev_cursor=cursor(items[0]) if items and has_prev else None,
+        per_page=per_page,
+        total=total
+    )
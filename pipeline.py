@@ -0,0 +1,185 @@
+import os
+import time
+import logging
+import multiprocessing
+from multiprocessing.connection import wait
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource  # Unix only; memory limits are skipped elsewhere
+except ImportError:
+    resource = None
+
+from utils import extract_text_from_file, write_upload, InMemoryUpload, MAX_PDF_PAGES, MAX_EXTRACTED_CHARS
+from sections import tokenize_sections
+
+# Configure logging
+logger = logging.getLogger('resume_analyzer.pipeline')
+
+# Defaults used when the app config does not override them
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_TIMEOUT = 30  # Seconds per file
+DEFAULT_MEMORY_LIMIT_MB = 512  # Address space a child may add on top of its parent
+
+def extraction_options(config):
+    """Extraction limits from the app config, passed on to extract_text_from_file"""
+    return {
+        'max_pages': config.get('PDF_MAX_PAGES', MAX_PDF_PAGES),
+        'max_chars': config.get('EXTRACTED_TEXT_MAX_CHARS', MAX_EXTRACTED_CHARS)
+    }
+
+def extract_and_preprocess(file_path, options=None):
+    """
+    Extract and tokenize one resume file (path or InMemoryUpload).
+    Returns (text, tokens, sections), see sections.tokenize_sections.
+    Runs in a worker process, so it must stay a top-level function.
+    """
+    text = extract_text_from_file(file_path, **(options or {}))
+    tokens, sections = tokenize_sections(text)
+    return text, tokens, sections
+
+def _source_name(source):
+    """Name of a file path or in-memory upload, for log messages"""
+    return source.filename if isinstance(source, InMemoryUpload) else source
+
+def _address_space_bytes():
+    """Current virtual memory size of this process, or None if unknown"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _sandbox_main(conn, file_path, options, memory_limit_mb):
+    """
+    Entry point of a sandboxed extraction process.
+    Caps the address space, extracts the file and sends back a result dict.
+    """
+    try:
+        if memory_limit_mb and resource is not None:
+            # A forked child starts with the parent's address space, so the
+            # cap is the memory it may add on top of that
+            limit = memory_limit_mb * 1024 * 1024 + (_address_space_bytes() or 0)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+        text, tokens, sections = extract_and_preprocess(file_path, options)
+        conn.send({'text': text, 'tokens': tokens, 'sections': sections, 'error': None, 'error_type': None})
+    except MemoryError:
+        conn.send({'text': None, 'tokens': None, 'error_type': 'memory',
+                   'error': f"Extraction exceeded the {memory_limit_mb} MB memory limit"})
+    except Exception as e:
+        conn.send({'text': None, 'tokens': None, 'error': str(e), 'error_type': 'extraction'})
+    finally:
+        conn.close()
+
+def _get_context():
+    """Prefer fork so children start instantly with modules already loaded"""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+def process_files(file_paths, max_workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT, options=None,
+                  memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB):
+    """
+    Extract and preprocess files, each in its own sandboxed child process.
+
+    Each child gets an address space cap and a wall-clock deadline, and is
+    killed once the deadline passes, so one pathological file costs at most
+    `timeout` seconds and never takes the calling worker down with it.
+
+    Args:
+        file_paths: Paths of the saved uploads, or InMemoryUpload buffers
+            (forked children inherit the bytes without copying them)
+        max_workers: Number of files processed concurrently; 0 processes
+            files inline in this process, without a sandbox
+        timeout: Seconds each file may take before its process is killed
+        options: Extraction limits, see extraction_options()
+        memory_limit_mb: Memory each child may allocate on top of its parent
+
+    Returns:
+        List of dicts with 'text', 'tokens', 'sections', 'error' and
+        'error_type' keys, in the order of file_paths. 'error' is None when the file was
+        processed successfully; 'error_type' is one of 'extraction',
+        'timeout', 'memory' or 'crashed' otherwise.
+    """
+    if max_workers <= 0:
+        results = []
+        for file_path in file_paths:
+            try:
+                text, tokens, sections = extract_and_preprocess(file_path, options)
+                results.append({'text': text, 'tokens': tokens, 'sections': sections,
+                                'error': None, 'error_type': None})
+            except Exception as e:
+                results.append({'text': None, 'tokens': None, 'error': str(e), 'error_type': 'extraction'})
+        return results
+
+    context = _get_context()
+    results = [None] * len(file_paths)
+    queue = list(enumerate(file_paths))
+    running = {}  # Parent end of the pipe -> (index, process, deadline)
+
+    while queue or running:
+        # Start children up to the concurrency limit
+        while queue and len(running) < max_workers:
+            index, file_path = queue.pop(0)
+            parent_conn, child_conn = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_sandbox_main,
+                args=(child_conn, file_path, options, memory_limit_mb),
+                daemon=True
+            )
+            process.start()
+            child_conn.close()  # Only the child writes; EOF now means it exited
+            running[parent_conn] = (index, process, time.monotonic() + timeout)
+
+        next_deadline = min(deadline for _, _, deadline in running.values())
+        ready = wait(list(running), timeout=max(0.0, next_deadline - time.monotonic()))
+
+        for conn in ready:
+            index, process, _ = running.pop(conn)
+            try:
+                results[index] = conn.recv()
+            except EOFError:
+                # The child died without reporting, e.g. killed by the OS or a segfault
+                process.join()
+                logger.error(f"Extraction process for {_source_name(file_paths[index])} exited with code {process.exitcode}")
+                results[index] = {'text': None, 'tokens': None, 'error_type': 'crashed',
+                                  'error': "Extraction process terminated unexpectedly"}
+            finally:
+                conn.close()
+            process.join()
+
+        # Kill children that ran past their deadline
+        now = time.monotonic()
+        for conn in [c for c, (_, _, deadline) in running.items() if deadline <= now]:
+            index, process, _ = running.pop(conn)
+            process.kill()
+            process.join()
+            conn.close()
+            logger.error(f"Killed extraction of {_source_name(file_paths[index])} after {timeout}s")
+            results[index] = {'text': None, 'tokens': None, 'error_type': 'timeout',
+                              'error': f"Processing timed out after {timeout} seconds"}
+
+    return results
+
+_persist_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='persist-uploads')
+
+def persist_uploads(uploads, background=True):
+    """
+    Write in-memory uploads to disk.
+
+    Args:
+        uploads: List of (file path, InMemoryUpload) tuples
+        background: Write on a background thread, off the request path
+    """
+    def write_all():
+        for file_path, upload in uploads:
+            try:
+                write_upload(file_path, upload.data)
+            except Exception as e:
+                logger.error(f"Error persisting upload {upload.filename}: {e}")
+
+    if background:
+        _persist_executor.submit(write_all)
+    else:
+        write_all()
@@ -0,0 +1,72 @@
+import string
+import logging
+import threading
+from functools import lru_cache
+
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+
+# Configure logging
+logger = logging.getLogger('resume_analyzer.preprocessing')
+
+# Default number of token -> lemma results kept per process
+LEMMA_CACHE_SIZE = 50000
+
+class TextPreprocessor:
+    """
+    Long-lived text preprocessor.
+    Stopwords, the lemmatizer and the translation table are built once,
+    and lemmas are memoized in a bounded LRU cache.
+    """
+
+    def __init__(self, lemma_cache_size=LEMMA_CACHE_SIZE):
+        self.stop_words = frozenset(stopwords.words('english'))
+        self.lemmatizer = WordNetLemmatizer()
+
+        # Strip punctuation and digits in a single translate() call
+        self.translation_table = str.maketrans('', '', string.punctuation + string.digits)
+
+        self._lemmatize = lru_cache(maxsize=lemma_cache_size)(self.lemmatizer.lemmatize)
+
+    def tokenize(self, text):
+        """
+        Preprocess text into a list of tokens by performing:
+        1. Lowercase conversion
+        2. Punctuation and number removal
+        3. Stopword removal
+        4. Lemmatization (once per distinct token)
+        """
+        if not text:
+            return []
+
+        try:
+            tokens = text.lower().translate(self.translation_table).split()
+            filtered_tokens = [w for w in tokens if w not in self.stop_words]
+
+            # Resumes repeat their vocabulary, so look up each distinct token once
+            lemmas = {token: self._lemmatize(token) for token in set(filtered_tokens)}
+            return [lemmas[token] for token in filtered_tokens]
+        except Exception as e:
+            logger.error(f"Error preprocessing text: {e}")
+            return text.split()  # Fall back to the raw tokens if preprocessing fails
+
+    def preprocess(self, text):
+        """Preprocess text and join the tokens back into a string"""
+        return ' '.join(self.tokenize(text))
+
+    def cache_info(self):
+        """Return hit/miss statistics of the lemma cache"""
+        return self._lemmatize.cache_info()
+
+
+_preprocessor = None
+_preprocessor_lock = threading.Lock()
+
+def get_preprocessor():
+    """Return the process-wide preprocessor, creating it on first use"""
+    global _preprocessor
+    if _preprocessor is None:
+        with _preprocessor_lock:
+            if _preprocessor is None:
+                _preprocessor = TextPreprocessor()
+    return _preprocessor
@@ -0,0 +1,67 @@
+import logging
+import threading
+from functools import wraps
+
+from flask import current_app
+from sqlalchemy import event
+
+from models import db
+
+# Configure logging
+logger = logging.getLogger('resume_analyzer.query_budget')
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised when a view issues more SQL statements than its budget allows"""
+
+class QueryCounter:
+    """
+    Count the SQL statements the current thread sends to the database
+    while the counter is active. Other threads are not counted, so
+    background model refreshes do not disturb a request's count.
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+        self._thread_id = None
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread_id:
+            self.count += 1
+            self.statements.append(statement)
+
+    def __enter__(self):
+        self.engine = self.engine or db.engine
+        self._thread_id = threading.get_ident()
+        event.listen(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        event.remove(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return False
+
+def query_budget(max_queries):
+    """
+    Declare the most SQL statements a view may issue.
+
+    Only checked when QUERY_BUDGET_ENFORCE is set (e.g. in tests): the
+    view then fails with QueryBudgetExceeded, listing the statements, as
+    soon as a change adds per-row queries to it. Otherwise the view runs
+    untouched.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('QUERY_BUDGET_ENFORCE'):
+                return view(*args, **kwargs)
+
+            with QueryCounter() as counter:
+                response = view(*args, **kwargs)
+            if counter.count > max_queries:
+                statements = '\n'.join(counter.statements)
+                logger.error(f"{view.__name__} issued {counter.count} queries, budget {max_queries}:\n{statements}")
+                raise QueryBudgetExceeded(f"{view.__name__} issued {counter.count} queries, budget {max_queries}")
+            return response
+        return wrapper
+    return decorator
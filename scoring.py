@@ -0,0 +1,210 @@
+import logging
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer, ENGLISH_STOP_WORDS
+
+from sections import SECTIONS
+
+# Configure logging
+logger = logging.getLogger('resume_analyzer.scoring')
+
+def analyze_tokens(document):
+    """
+    Turn a preprocessed document into unigram and bigram terms.
+    Accepts a token list from the preprocessor, or a preprocessed string
+    for callers that still hold joined text.
+    """
+    tokens = document.split() if isinstance(document, str) else document
+    tokens = [t for t in tokens if len(t) > 1 and t not in ENGLISH_STOP_WORDS]
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+# TF-IDF parameters shared by every scoring path
+VECTORIZER_PARAMS = {
+    'max_features': 10000,     # Limit features to improve performance
+    'min_df': 1,               # Minimum document frequency
+    'analyzer': analyze_tokens # Unigrams and bigrams from pre-tokenized text
+}
+
+def weight_vector(weights):
+    """Section weights as an array in SECTIONS order, or None without weights"""
+    if not weights:
+        return None
+    vector = np.array([float(weights.get(section, 0.0)) for section in SECTIONS])
+    return vector if vector.sum() > 0 else None
+
+def section_documents(resume_sections):
+    """Resume-major section token lists: resume i, section j is item i * len(SECTIONS) + j"""
+    return [sections.get(section, []) for sections in resume_sections for section in SECTIONS]
+
+def combine_sections(overall, by_section, resume_sections, section_weights):
+    """
+    Scores from whole-resume and per-section similarities: the weighted mean
+    of a resume's section similarities over the sections it has, or its
+    whole-document similarity when it has none.
+
+    Args:
+        overall: Array of whole-resume similarities, one per resume
+        by_section: Array of section similarities, one row per resume in SECTIONS order
+        resume_sections: List of {section: tokens}, one per resume
+        section_weights: Weights in SECTIONS order, see weight_vector
+
+    Returns:
+        List of scores between 0 and 1
+    """
+    n = len(resume_sections)
+    by_section = np.asarray(by_section, dtype=np.float64).reshape(n, len(SECTIONS))
+    present = np.array([[bool(sections.get(section)) for section in SECTIONS] for sections in resume_sections],
+                       dtype=np.float64).reshape(n, len(SECTIONS))
+    weight_mass = present @ section_weights
+    weighted = (by_section * present) @ section_weights / np.where(weight_mass > 0, weight_mass, 1.0)
+    scores = np.where(weight_mass > 0, weighted, overall)
+    return np.clip(scores, 0.0, 1.0).tolist()  # Constrain between 0 and 1
+
+def score_resumes(job_document, resume_documents, idf_model=None, resume_sections=None, weights=None):
+    """
+    Score many resumes against one job description in a single pass:
+    1. Build one document-term matrix for the job description and all resumes
+    2. Compute every cosine similarity with one sparse matrix product
+
+    When a fitted corpus IDF model is given the documents are only
+    transformed with it; otherwise a vectorizer is fitted on the batch.
+
+    TF-IDF rows are L2-normalized, so the dot product of a resume row with
+    the job row is their cosine similarity.
+
+    With section weights, the rows of every resume section (see
+    sections.tokenize_sections) are stacked under the resume rows and go
+    through the same matrix product. A resume's score is then the weighted
+    mean of its section similarities over the sections it has; resumes
+    without any recognized section keep their whole-document score.
+
+    Args:
+        job_document: Preprocessed job description (token list or string)
+        resume_documents: List of preprocessed resumes (token lists or strings)
+        idf_model: Optional IdfModel fitted over historical resumes
+        resume_sections: Optional list of {section: tokens}, one per resume
+        weights: Optional ScoringWeights dict (skills, education, experience,
+            certifications), used together with resume_sections
+
+    Returns:
+        List of scores between 0 and 1, in the order of resume_documents
+    """
+    if not resume_documents:
+        return []
+
+    if not job_document:
+        return [0.0] * len(resume_documents)
+
+    section_weights = weight_vector(weights) if resume_sections is not None else None
+
+    try:
+        documents = [job_document] + list(resume_documents)
+        if idf_model is not None and idf_model.ready:
+            vectorizer = idf_model
+            tfidf_matrix = idf_model.transform(documents)
+        else:
+            vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
+            tfidf_matrix = vectorizer.fit_transform(documents)
+
+        if section_weights is None:
+            # One sparse matmul for the whole batch: (N x V) . (V x 1)
+            scores = (tfidf_matrix[1:] @ tfidf_matrix[0].T).toarray().ravel()
+            return np.clip(scores, 0.0, 1.0).tolist()  # Constrain between 0 and 1
+
+        # Resume-major section rows, see section_documents()
+        stacked = sp.vstack([tfidf_matrix[1:], vectorizer.transform(section_documents(resume_sections))],
+                            format='csr')
+
+        # One sparse matmul for every resume and section: ((N + 4N) x V) . (V x 1)
+        similarities = (stacked @ tfidf_matrix[0].T).toarray().ravel()
+        n = len(resume_documents)
+        overall = similarities[:n]
+        by_section = similarities[n:].reshape(n, len(SECTIONS))
+
+        return combine_sections(overall, by_section, resume_sections, section_weights)
+    except ValueError as e:
+        # Raised when no terms remain after stopword removal
+        logger.warning(f"Could not vectorize documents: {e}")
+        return [0.0] * len(resume_documents)
+
+def score_jobs(resume_document, job_documents, idf_model=None):
+    """
+    Score one resume against many job descriptions in a single pass.
+    Cosine similarity is symmetric, so this is score_resumes with the
+    roles swapped: one matrix for the resume and all job descriptions.
+
+    Returns:
+        List of scores between 0 and 1, in the order of job_documents
+    """
+    return score_resumes(resume_document, job_documents, idf_model)
+
+def score_vectors(job_vector, resume_vectors, section_vectors=None, resume_sections=None, weights=None):
+    """
+    Score resumes from dense L2-normalized vectors (see lsa_model.LsaModel).
+    The dot products are one contiguous float32 matrix-vector product.
+
+    With section weights, section_vectors holds the vectors of every
+    resume section (rows in section_documents() order) and the section
+    similarities are combined like in score_resumes.
+
+    Args:
+        job_vector: Vector of the job description
+        resume_vectors: 2D array with one resume vector per row
+        section_vectors: Optional 2D array with len(SECTIONS) rows per resume
+        resume_sections: Optional list of {section: tokens}, one per resume
+        weights: Optional ScoringWeights dict, used together with the sections
+
+    Returns:
+        List of scores between 0 and 1, in the order of resume_vectors
+    """
+    if len(resume_vectors) == 0:
+        return []
+
+    job_vector = np.asarray(job_vector, dtype=np.float32)
+    matrix = np.ascontiguousarray(resume_vectors, dtype=np.float32)
+    scores = matrix @ job_vector
+
+    section_weights = weight_vector(weights) if resume_sections is not None else None
+    if section_weights is not None and section_vectors is not None:
+        by_section = np.ascontiguousarray(section_vectors, dtype=np.float32) @ job_vector
+        return combine_sections(scores, by_section, resume_sections, section_weights)
+    return np.clip(scores, 0.0, 1.0).tolist()  # Constrain between 0 and 1
+
+# Bump when the scoring formula changes, to invalidate memoized scores
+SCORING_VERSION = 2
+
+def score_resumes_cached(job_document, resume_documents, idf_model=None, score_cache=None, weights=None,
+                         resume_sections=None):
+    """
+    Score resumes like score_resumes(), reusing memoized scores.
+
+    Scores are memoized only with a fitted corpus IDF model: a vectorizer
+    fitted on the batch makes every score depend on the other resumes.
+    Only the cache misses are vectorized.
+    """
+    if score_cache is None or idf_model is None or not idf_model.ready:
+        return score_resumes(job_document, resume_documents, idf_model, resume_sections, weights)
+
+    model_version = f"{SCORING_VERSION}:{idf_model.version}"
+    job_hash = score_cache.hash_document(job_document)
+    resume_hashes = [score_cache.hash_document(document, resume_sections[i] if resume_sections is not None else None)
+                     for i, document in enumerate(resume_documents)]
+
+    scores = score_cache.get_many(model_version, weights, job_hash, resume_hashes)
+    misses = [i for i, score in enumerate(scores) if score is None]
+    if not misses:
+        return scores
+
+    fresh_scores = score_resumes(job_document, [resume_documents[i] for i in misses], idf_model,
+                                 [resume_sections[i] for i in misses] if resume_sections is not None else None,
+                                 weights)
+    for i, score in zip(misses, fresh_scores):
+        scores[i] = score
+
+    # Skip memoizing if the model was refreshed while scoring
+    if f"{SCORING_VERSION}:{idf_model.version}" == model_version:
+        score_cache.put_many(model_version, weights, job_hash,
+                             [resume_hashes[i] for i in misses], fresh_scores)
+
+    return scores
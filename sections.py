@@ -0,0 +1,72 @@
+import re
+import logging
+
+from preprocessing import get_preprocessor
+
+# Configure logging
+logger = logging.getLogger('resume_analyzer.sections')
+
+# Sections that ScoringWeights assign a weight to
+SECTIONS = ('skills', 'education', 'experience', 'certifications')
+
+# A heading is a line holding only a known title, or a title followed by a
+# colon and inline content ("Skills: Python, SQL"). Titles of sections that
+# carry no weight are matched too, so their text does not leak into the
+# section above them.
+_HEADING_RE = re.compile(r'''
+    ^[ \t]*(?:
+        (?P<skills>(?:technical\ |core\ |key\ |relevant\ )?(?:skills|competencies|expertise)
+            |skills\ (?:&|and)\ (?:abilities|tools|technologies)|technologies|tools|tech\ stack)
+      | (?P<education>education(?:al\ background)?|academic\ (?:background|history)
+            |academics|qualifications)
+      | (?P<experience>(?:work\ |professional\ |relevant\ )?experience|employment(?:\ history)?
+            |work\ history|career\ history|professional\ background)
+      | (?P<certifications>certifications?|certificates|licen[cs]es(?:\ (?:&|and)\ certifications)?
+            |courses|training)
+      | (?P<other>summary|profile|objective|about\ me|projects|personal\ projects|interests|hobbies
+            |references|languages|awards|honou?rs|publications|volunteer(?:ing)?|activities)
+    )[ \t]*(?::|$)
+''', re.IGNORECASE | re.MULTILINE | re.VERBOSE)
+
+def split_sections(text):
+    """
+    Split resume text into sections in one pass of the heading pattern.
+
+    Returns:
+        List of (section, text) spans in document order. Text before the
+        first heading and under untracked headings is labelled 'other'.
+        The spans cover the whole text, heading lines included.
+    """
+    if not text:
+        return []
+
+    spans = []
+    section, start = 'other', 0
+    for match in _HEADING_RE.finditer(text):
+        if match.start() > start:
+            spans.append((section, text[start:match.start()]))
+        section, start = match.lastgroup, match.start()
+    spans.append((section, text[start:]))
+    return spans
+
+def tokenize_sections(text, preprocessor=None):
+    """
+    Tokenize resume text section by section.
+
+    Tokenization is per word, so the section token lists joined in order
+    are exactly the tokens of the whole text: segmenting costs no extra
+    preprocessing.
+
+    Returns:
+        (tokens, sections): the token list of the whole text, and a dict
+        mapping each weighted section found to its tokens
+    """
+    preprocessor = preprocessor or get_preprocessor()
+    tokens = []
+    sections = {}
+    for section, span in split_sections(text):
+        span_tokens = preprocessor.tokenize(span)
+        tokens.extend(span_tokens)
+        if section != 'other':
+            sections.setdefault(section, []).extend(span_tokens)
+    return tokens, sections
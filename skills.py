@@ -0,0 +1,177 @@
+import os
+import re
+import hashlib
+import logging
+from collections import Counter, deque
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger('resume_analyzer.skills')
+
+# Dictionary shipped with the application
+DEFAULT_DICTIONARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'skills.txt')
+
+# Words of texts and skill terms: letters and digits with '+' and '#'
+# ("c++", "c#"), joined by inner dots ("node.js") or after a leading dot
+# (".net"). Hyphens, slashes and other punctuation separate words.
+_WORD_RE = re.compile(r'\.?[^\W_][\w+#]*(?:\.[^\W_][\w+#]*)*')
+
+# Length of the dictionary version prefix of stored skill hits
+_VERSION_BYTES = 8
+
+def words(text):
+    """Lowercased words of a text, as matched against the dictionary"""
+    return _WORD_RE.findall(text.lower()) if text else []
+
+class SkillMatcher:
+    """
+    Aho-Corasick automaton over the words of a skill dictionary.
+
+    Transitions are on whole words, so multi-word terms ("machine
+    learning") are matched on word boundaries, and a text is scanned once
+    in time linear in its number of words, however many terms the
+    dictionary holds. Aliases map to the id of their canonical skill.
+    """
+
+    def __init__(self, skills, version=None):
+        """
+        Args:
+            skills: List of (canonical name, [aliases]) tuples
+            version: Identifier of the dictionary, stored with the hits
+        """
+        self.skills = [name for name, _ in skills]
+        self.version = version or hashlib.sha256(repr(skills).encode('utf-8')).hexdigest()[:2 * _VERSION_BYTES]
+
+        # State 0 is the root; per state: word -> next state, failure link, matched skill ids
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        for skill_id, (name, aliases) in enumerate(skills):
+            for term in [name] + list(aliases):
+                self._add(words(term), skill_id)
+        self._link()
+
+    def __len__(self):
+        return len(self.skills)
+
+    def _add(self, term_words, skill_id):
+        """Add the word path of one term to the trie"""
+        if not term_words:
+            return
+        state = 0
+        for word in term_words:
+            next_state = self._goto[state].get(word)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][word] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        if skill_id not in self._output[state]:
+            self._output[state] += (skill_id,)
+
+    def _link(self):
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(word, 0)
+                inherited = self._output[self._fail[next_state]]
+                if inherited:
+                    self._output[next_state] = tuple(dict.fromkeys(self._output[next_state] + inherited))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Build a matcher from a dictionary file: one skill per line, aliases
+        after the canonical name separated by '|'. Lines starting with '#'
+        are comments; '#' elsewhere is part of a name ("C#").
+        """
+        with open(path, 'rb') as f:
+            content = f.read()
+
+        skills, seen = [], set()
+        for line in content.decode('utf-8').splitlines():
+            if line.lstrip().startswith('#'):
+                continue
+            names = [name.strip() for name in line.split('|') if name.strip()]
+            if not names or names[0].lower() in seen:
+                continue
+            seen.add(names[0].lower())
+            skills.append((names[0], names[1:]))
+
+        return cls(skills, version=hashlib.sha256(content).hexdigest()[:2 * _VERSION_BYTES])
+
+    def find(self, text):
+        """
+        Scan a text once for dictionary terms.
+
+        Returns:
+            Counter of skill id -> number of occurrences
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        hits = Counter()
+        state = 0
+        for word in words(text):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            if output[state]:
+                hits.update(output[state])
+        return hits
+
+    def report(self, resume_hits, job_hits):
+        """
+        Compare the skills of a resume with those of a job description.
+
+        Returns:
+            Dict with 'matched' and 'missing' skill names (most mentioned
+            first) and 'coverage', the share of the job's skills found in the
+            resume, or None when the job description names no skill
+        """
+        matched = sorted((s for s in job_hits if s in resume_hits), key=lambda s: (-resume_hits[s], s))
+        missing = sorted((s for s in job_hits if s not in resume_hits), key=lambda s: (-job_hits[s], s))
+        return {
+            'matched': [self.skills[s] for s in matched],
+            'missing': [self.skills[s] for s in missing],
+            'coverage': len(matched) / len(job_hits) if job_hits else None
+        }
+
+    def hits_to_bytes(self, hits):
+        """Compact storage form of hits: dictionary version, then (id, count) uint32 pairs"""
+        pairs = np.array(sorted(hits.items()), dtype='<u4').reshape(-1, 2)
+        return bytes.fromhex(self.version) + pairs.tobytes()
+
+    def hits_from_bytes(self, data):
+        """Hits back from their storage form, or None when stored with another dictionary"""
+        if data is None or data[:_VERSION_BYTES] != bytes.fromhex(self.version):
+            return None
+        pairs = np.frombuffer(data[_VERSION_BYTES:], dtype='<u4').reshape(-1, 2)
+        return Counter({int(skill_id): int(count) for skill_id, count in pairs})
+
+
+_skill_matcher = None
+
+def init_skill_matcher(app):
+    """Build the process-wide skill matcher from the configured dictionary"""
+    global _skill_matcher
+    path = app.config.get('SKILLS_DICTIONARY_PATH') or DEFAULT_DICTIONARY_PATH
+    try:
+        _skill_matcher = SkillMatcher.load(path)
+        logger.info(f"Loaded {len(_skill_matcher)} skills from {path}")
+    except OSError as e:
+        logger.warning(f"Skill matching disabled, could not read {path}: {e}")
+        _skill_matcher = None
+    return _skill_matcher
+
+def get_skill_matcher():
+    """Return the process-wide skill matcher, or None when no dictionary is loaded"""
+    return _skill_matcher
@@ -0,0 +1,194 @@
+import time
+import logging
+import datetime
+import threading
+
+from models import db, User, ResumeAnalysis, ResumeFile, DailyStats, StatsTotals, ALL_USERS
+
+# Configure logging
+logger = logging.getLogger('resume_analyzer.stats')
+
+# Defaults used when the app config does not override them
+DEFAULT_INTERVAL = 60  # seconds between periodic roll-ups
+LOOKBACK_DAYS = 2      # recent days recomputed by each roll-up
+SERIES_DAYS = 30       # days shown in the dashboard trends
+
+def _as_date(value):
+    """Date of a DATE() result, which SQLite returns as an ISO string"""
+    return value if isinstance(value, datetime.date) else datetime.date.fromisoformat(value)
+
+class StatsRollup:
+    """
+    Maintains the DailyStats and StatsTotals tables the dashboard reads.
+
+    Each roll-up recomputes the daily buckets of the last few days from
+    the analyses created in them (a range scan on their created_at index),
+    which also picks up queued analyses that finished since the previous
+    roll-up, then refreshes the totals of the users seen in those days.
+    The first roll-up covers the whole history once.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, lookback_days=LOOKBACK_DAYS):
+        self.interval = interval
+        self.lookback_days = lookback_days
+        self.last_run = None
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pending = False
+
+    def run(self):
+        """
+        Roll up analyses created since the lookback window started.
+        Must be called inside an application context.
+        Returns the number of daily buckets written.
+        """
+        with self._lock:
+            now = datetime.datetime.utcnow()
+            system = db.session.get(StatsTotals, ALL_USERS)
+            since = None
+            if system is not None and system.updated_at is not None:
+                since = (system.updated_at - datetime.timedelta(days=self.lookback_days)).date()
+
+            buckets = self._collect(since)
+
+            # Replace the recomputed days in one transaction
+            stale = DailyStats.query
+            if since is not None:
+                stale = stale.filter(DailyStats.day >= since)
+            stale.delete(synchronize_session=False)
+            db.session.bulk_insert_mappings(DailyStats, [
+                dict(user_id=user_id, day=day, **values) for (user_id, day), values in buckets.items()
+            ])
+            db.session.flush()
+
+            self._update_totals({user_id for user_id, _ in buckets} | {ALL_USERS}, now)
+            db.session.commit()
+
+            self.last_run = time.monotonic()
+            return len(buckets)
+
+    def _collect(self, since):
+        """Per (user, day) counts of the analyses created on or after a day, all users included"""
+        day = db.func.date(ResumeAnalysis.created_at)
+        analyses = db.session.query(
+            ResumeAnalysis.user_id, day,
+            db.func.count(ResumeAnalysis.id),
+            db.func.count(ResumeAnalysis.best_match_score),
+            db.func.coalesce(db.func.sum(ResumeAnalysis.best_match_score), 0.0)
+        )
+        resumes = db.session.query(ResumeAnalysis.user_id, day, db.func.count(ResumeFile.id)) \
+            .join(ResumeFile, ResumeFile.analysis_id == ResumeAnalysis.id)
+        if since is not None:
+            start = datetime.datetime.combine(since, datetime.time.min)
+            analyses = analyses.filter(ResumeAnalysis.created_at >= start)
+            resumes = resumes.filter(ResumeAnalysis.created_at >= start)
+
+        buckets = {}
+
+        def bucket(user_id, value):
+            return buckets.setdefault((user_id, _as_date(value)), {
+                'analysis_count': 0, 'resume_count': 0, 'scored_count': 0, 'best_score_sum': 0.0})
+
+        for user_id, value, analysis_count, scored_count, best_score_sum in \
+                analyses.group_by(ResumeAnalysis.user_id, day):
+            for key in (user_id, ALL_USERS):
+                values = bucket(key, value)
+                values['analysis_count'] += analysis_count
+                values['scored_count'] += scored_count
+                values['best_score_sum'] += float(best_score_sum)
+
+        for user_id, value, resume_count in resumes.group_by(ResumeAnalysis.user_id, day):
+            for key in (user_id, ALL_USERS):
+                bucket(key, value)['resume_count'] += resume_count
+
+        return buckets
+
+    def _update_totals(self, user_ids, now):
+        """Sum the daily buckets of some users into their totals"""
+        sums = {user_id: (analysis_count, resume_count) for user_id, analysis_count, resume_count in
+                db.session.query(DailyStats.user_id, db.func.sum(DailyStats.analysis_count),
+                                 db.func.sum(DailyStats.resume_count))
+                .filter(DailyStats.user_id.in_(user_ids))
+                .group_by(DailyStats.user_id)}
+        rows = {totals.user_id: totals for totals in StatsTotals.query.filter(StatsTotals.user_id.in_(user_ids))}
+
+        for user_id in user_ids:
+            totals = rows.get(user_id)
+            if totals is None:
+                totals = rows[user_id] = StatsTotals(user_id=user_id)
+                db.session.add(totals)
+            totals.analysis_count, totals.resume_count = sums.get(user_id, (0, 0))
+            totals.updated_at = now
+
+        system = rows[ALL_USERS]
+        system.user_count, system.active_user_count = db.session.query(
+            db.func.count(User.id), db.func.count(db.case((User.is_active, 1)))).one()
+
+    def schedule(self, app, force=False):
+        """
+        Roll up on a background thread, at most once per interval unless
+        forced. A forced roll-up requested while one runs follows it.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._pending = self._pending or force
+            return
+        if not force and self.last_run is not None and time.monotonic() - self.last_run < self.interval:
+            return
+
+        def run():
+            try:
+                while True:
+                    self._pending = False
+                    with app.app_context():
+                        written = self.run()
+                    logger.debug(f"Statistics rolled up ({written} daily buckets)")
+                    if not self._pending:
+                        break
+            except Exception as e:
+                logger.error(f"Error rolling up statistics: {e}")
+
+        self._thread = threading.Thread(target=run, name='stats-rollup', daemon=True)
+        self._thread.start()
+
+
+def get_totals(user_id):
+    """Rolled-up totals of a user, or of all users for ALL_USERS; None before the first roll-up"""
+    return db.session.get(StatsTotals, user_id)
+
+def daily_series(user_id, days=SERIES_DAYS, today=None):
+    """
+    Per-day trends of the last days, oldest first, with empty days filled in.
+
+    Returns:
+        Dict of equally long lists: 'labels' (ISO dates), 'analyses',
+        'resumes' and 'average_best_score' (None on days without scores)
+    """
+    today = today or datetime.datetime.utcnow().date()
+    start = today - datetime.timedelta(days=days - 1)
+    rows = {row.day: row for row in DailyStats.query.filter(
+        DailyStats.user_id == user_id, DailyStats.day >= start, DailyStats.day <= today)}
+
+    series = {'labels': [], 'analyses': [], 'resumes': [], 'average_best_score': []}
+    for offset in range(days):
+        day = start + datetime.timedelta(days=offset)
+        row = rows.get(day)
+        series['labels'].append(day.isoformat())
+        series['analyses'].append(row.analysis_count if row else 0)
+        series['resumes'].append(row.resume_count if row else 0)
+        series['average_best_score'].append(row.average_best_score if row else None)
+    return series
+
+
+_stats_rollup = None
+
+def init_stats_rollup(app):
+    """Create the process-wide roll-up from the app config and bring the tables up to date"""
+    global _stats_rollup
+    _stats_rollup = StatsRollup(interval=app.config.get('STATS_ROLLUP_INTERVAL', DEFAULT_INTERVAL))
+    _stats_rollup.schedule(app, force=True)
+    return _stats_rollup
+
+def get_stats_rollup():
+    """Return the process-wide roll-up, or None before init_stats_rollup()"""
+    return _stats_rollup
@@ -0,0 +1,115 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """The application, on a throwaway database and working directory, with query budgets enforced"""
+    workdir = tmp_path_factory.mktemp('app')
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{workdir / 'test.db'}",
+        IDF_MODEL_PATH=str(workdir / 'idf_model.joblib'),
+        EXTRACTION_CACHE_PATH=str(workdir / 'extraction_cache.db'),
+        EXTRACTION_WORKERS='0',
+        QUERY_BUDGET_ENFORCE='1',
+    )
+    os.chdir(workdir)  # app.py writes logs/ and uploads/ relative to the working directory
+
+    try:
+        import app as app_module
+    except LookupError as e:
+        pytest.skip(f"NLTK data not installed: {e}")
+
+    app = app_module.app
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    app_module.limiter.enabled = False
+    return app
+
+@pytest.fixture
+def db_session(app):
+    """Database session of a test; every table is emptied afterwards"""
+    from models import db
+    with app.app_context():
+        yield db.session
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+        db.session.remove()
+
+@pytest.fixture
+def user(db_session):
+    from models import User
+    name = f"user-{uuid.uuid4().hex[:8]}"
+    user = User(name, f"{name}@example.com", 'password')
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+@pytest.fixture
+def client(app, user):
+    """Test client logged in as a fresh user"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+    return client
+
+@pytest.fixture
+def make_analysis(db_session):
+    """Create a completed analysis of a user with scored files, their text stored like a processed upload"""
+    from models import ResumeAnalysis, ResumeFile
+
+    def make(user, files=30, skill_hits=True):
+        from skills import get_skill_matcher
+
+        analysis = ResumeAnalysis(user.id, 'Python developer with Flask, SQL and Docker experience',
+                                  job_title='Backend Developer')
+        db_session.add(analysis)
+        db_session.flush()
+
+        skill_matcher = get_skill_matcher()
+        for number in range(files):
+            resume_file = ResumeFile(analysis.id, f"resume_{number}.txt", f"{uuid.uuid4().hex}.txt",
+                                     file_size=100, file_type='txt')
+            resume_file.extracted_text = f"Skills\nPython SQL Docker\nExperience\nEngineer number {number}"
+            resume_file.score = round(1 - number / files, 4)
+            if skill_hits and skill_matcher is not None:
+                resume_file.skill_hits = skill_matcher.hits_to_bytes(
+                    skill_matcher.find(resume_file.extracted_text))
+            analysis.resume_files.append(resume_file)
+
+        analysis.set_results([(f"resume_{number}.txt", 1 - number / files) for number in range(files)])
+        db_session.commit()
+        db_session.expire_all()
+        return analysis
+    return make
+
+@pytest.fixture
+def preprocessor(app):
+    """The text preprocessor, skipping tests when the NLTK data it needs is not installed"""
+    from preprocessing import get_preprocessor
+    try:
+        return get_preprocessor()
+    except LookupError as e:
+        pytest.skip(f"NLTK data not installed: {e}")
+
+@pytest.fixture
+def add_resume(db_session):
+    """Add a resume file with some text to an analysis, in a given processing status"""
+    from models import ResumeFile
+
+    def add(analysis, text, status='processed'):
+        resume_file = ResumeFile(analysis.id, f"{uuid.uuid4().hex[:8]}.txt", f"{uuid.uuid4().hex}.txt",
+                                 file_type='txt', status=status)
+        resume_file.extracted_text = text
+        db_session.add(resume_file)
+        db_session.commit()
+        return resume_file
+    return add
@@ -0,0 +1,45 @@
+import hashlib
+
+import pytest
+
+def declared_files(count):
+    return [{'filename': f"resume_{number}.txt", 'size': 10, 'sha256': hashlib.sha256(b'%d' % number).hexdigest()}
+            for number in range(count)]
+
+def upload_request(files):
+    return {'job_title': 'Backend Developer', 'job_description': 'Python developer ' * 10, 'files': files}
+
+@pytest.fixture
+def csrf_enabled(app):
+    app.config['WTF_CSRF_ENABLED'] = True
+    yield
+    app.config['WTF_CSRF_ENABLED'] = False
+
+def test_api_requires_csrf_header(client, csrf_enabled):
+    response = client.post('/api/uploads', json=upload_request(declared_files(1)))
+    assert response.status_code == 400
+    assert 'X-CSRFToken' in response.get_json()['error']
+
+    token = client.get('/api/csrf-token').get_json()['csrf_token']
+    response = client.post('/api/uploads', json=upload_request(declared_files(1)), headers={'X-CSRFToken': token})
+    assert response.status_code == 201
+
+def test_chunked_upload_enforces_file_limit(app, client):
+    limit = app.config['MAX_FILES_PER_ANALYSIS']
+    response = client.post('/api/uploads', json=upload_request(declared_files(limit + 1)))
+    assert response.status_code == 400
+    assert f'At most {limit} files' in response.get_json()['error']
+
+    assert client.post('/api/uploads', json=upload_request(declared_files(limit))).status_code == 201
+
+@pytest.mark.parametrize('query', ['', '?offset=abc', '?offset=-10'])
+def test_chunk_requires_a_valid_offset(client, query):
+    upload = client.post('/api/uploads', json=upload_request(declared_files(1))).get_json()
+    url = f"/api/uploads/{upload['analysis_id']}/files/{upload['files'][0]['id']}{query}"
+    response = client.put(url, data=b'0')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'offset must be a non-negative integer'
+
+    response = client.put(f"/api/uploads/{upload['analysis_id']}/files/{upload['files'][0]['id']}?offset=0", data=b'0')
+    assert response.status_code == 200
+    assert response.get_json()['received'] == 1
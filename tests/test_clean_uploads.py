@@ -0,0 +1,34 @@
+import os
+import time
+
+from models import ResumeAnalysis
+
+def make_old(path):
+    path.write_bytes(b'resume')
+    old = time.time() - 10 * 24 * 3600
+    os.utime(path, (old, old))
+    return path
+
+def test_clean_old_uploads_keeps_unfinished_files(app, db_session, user, add_resume, tmp_path):
+    import app as app_module
+
+    analysis = ResumeAnalysis(user.id, 'Data engineer')
+    db_session.add(analysis)
+    db_session.commit()
+    queued = add_resume(analysis, 'Queued resume', status='pending')
+    uploading = add_resume(analysis, 'Resume being uploaded', status='uploading')
+    done = add_resume(analysis, 'Processed resume')
+
+    folder = tmp_path / 'uploads'
+    folder.mkdir()
+    app.config['UPLOAD_FOLDER'] = str(folder)
+    try:
+        kept = [make_old(folder / queued.stored_filename), make_old(folder / f"{uploading.stored_filename}.part")]
+        removed = [make_old(folder / done.stored_filename), make_old(folder / 'abandoned.pdf')]
+
+        app_module.clean_old_uploads()
+    finally:
+        app.config['UPLOAD_FOLDER'] = 'uploads/'
+
+    assert all(path.exists() for path in kept)
+    assert not any(path.exists() for path in removed)
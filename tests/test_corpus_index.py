@@ -0,0 +1,28 @@
+from corpus_index import CorpusSearch
+from models import ResumeAnalysis
+
+def indexed_ids(index):
+    return {entry.resume_file_id for entry in index.entries}
+
+def test_refresh_indexes_files_that_finish_out_of_order(db_session, user, preprocessor, add_resume):
+    analysis = ResumeAnalysis(user.id, 'Data engineer')
+    db_session.add(analysis)
+    db_session.commit()
+    first = add_resume(analysis, 'Airflow and dbt pipelines on Postgres')
+
+    search = CorpusSearch()
+    assert indexed_ids(search.refresh(user.id)) == {first.id}
+
+    slow = add_resume(analysis, 'Terraform modules written in Go', status='pending')
+    fast = add_resume(analysis, 'Spark jobs feeding a warehouse')
+    index = search.refresh(user.id)
+    assert indexed_ids(index) == {first.id, fast.id}
+    assert index.last_resume_id < slow.id
+
+    slow.status = 'processed'
+    db_session.commit()
+    index = search.refresh(user.id)
+    assert indexed_ids(index) == {first.id, slow.id, fast.id}
+    assert len(index) == 3
+    assert index.last_resume_id == fast.id
+    assert index.collected_ids == set()
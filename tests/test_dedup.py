@@ -0,0 +1,36 @@
+from dedup import minhash_signature, find_clusters, find_stored_duplicate
+from jobs import fingerprint
+from models import ResumeAnalysis
+
+RESUME = ('Jane Doe, backend engineer. Eight years building Flask services with PostgreSQL, Redis queues and '
+          'Docker images. Owned the deployment pipeline, code reviews and the on call rotation for payments. '
+          'Mentored four junior developers and led the migration from a monolith to event driven services. '
+          'Education: BSc Computer Science, Example University, graduated with honours in 2014. '
+          'Certifications: AWS Solutions Architect Associate and Certified Kubernetes Administrator. '
+          'Languages: English, Spanish and German. Interests include open source tooling and cycling.')
+EDITED = RESUME.replace('payments', 'billing')
+UNRELATED = ('John Roe, registered nurse. Ten years of intensive care experience in a university hospital, '
+             'patient assessment, medication administration and training new staff on ward procedures.')
+
+def test_one_word_edit_joins_the_cluster():
+    clusters = find_clusters([minhash_signature(text) for text in (RESUME, UNRELATED, EDITED, '')])
+    assert clusters == [None, None, 0, None]
+
+def test_duplicate_of_an_earlier_analysis_found_through_stored_bands(db_session, user, add_resume):
+    earlier = ResumeAnalysis(user.id, 'Backend engineer')
+    current = ResumeAnalysis(user.id, 'Backend engineer')
+    db_session.add_all([earlier, current])
+    db_session.commit()
+
+    original = add_resume(earlier, RESUME)
+    fingerprint(original, earlier)
+    db_session.commit()
+    assert original.lsh_bands.count() == 16
+
+    edited = add_resume(current, EDITED)
+    fingerprint(edited, current)
+    assert edited.duplicate_of_id == original.id
+
+    assert find_stored_duplicate(minhash_signature(UNRELATED), user.id, exclude_analysis_id=current.id) is None
+    # Only the user's own resumes are candidates
+    assert find_stored_duplicate(minhash_signature(RESUME), user.id + 1) is None
@@ -0,0 +1,47 @@
+import docx
+import fitz
+from docx.shared import Inches
+
+from utils import iter_pdf_pages, extract_text_from_file, InMemoryUpload
+from utils import extract_text_from_docx_xml, extract_text_from_docx_python_docx
+
+def multi_page_pdf(pages):
+    with fitz.open() as doc:
+        for number in range(pages):
+            doc.new_page().insert_text((72, 72), f"Page {number} of the resume")
+        return doc.tobytes()
+
+def test_pdf_extraction_stops_at_the_page_limit(tmp_path):
+    path = tmp_path / 'resume.pdf'
+    path.write_bytes(multi_page_pdf(5))
+
+    pages = list(iter_pdf_pages(str(path), max_pages=2, max_chars=0))
+    assert len(pages) == 2
+    assert 'Page 1' in pages[1]
+
+    text = extract_text_from_file(str(path), max_pages=3)
+    assert 'Page 2' in text and 'Page 3' not in text
+
+def test_pdf_extraction_stops_at_the_character_limit():
+    data = multi_page_pdf(5)
+    page_length = len(next(iter_pdf_pages(data)))
+
+    pages = list(iter_pdf_pages(data, max_pages=0, max_chars=page_length + 4))
+    assert len(pages) == 2
+    assert pages[1] == 'Page'
+
+    text = extract_text_from_file(InMemoryUpload('resume.pdf', data), max_chars=page_length * 2)
+    assert 'Page 1' in text and 'Page 2' not in text
+
+def test_docx_tab_stops_are_not_text(tmp_path):
+    document = docx.Document()
+    paragraph = document.add_paragraph('Python\tFive years')
+    paragraph.paragraph_format.tab_stops.add_tab_stop(Inches(2))
+    paragraph.paragraph_format.tab_stops.add_tab_stop(Inches(4))
+    document.add_paragraph('Experience')
+    path = tmp_path / 'resume.docx'
+    document.save(str(path))
+
+    text = extract_text_from_docx_xml(str(path))
+    assert text == extract_text_from_docx_python_docx(str(path))
+    assert text.count('\t') == 1
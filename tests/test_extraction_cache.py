@@ -0,0 +1,16 @@
+from cache import ExtractionCache
+from pipeline import extraction_options
+
+def test_entries_are_keyed_by_extraction_options(tmp_path):
+    cache = ExtractionCache(str(tmp_path / 'cache.db'))
+    short = extraction_options({'PDF_MAX_PAGES': 2, 'EXTRACTED_TEXT_MAX_CHARS': 1000})
+    full = extraction_options({'PDF_MAX_PAGES': 50, 'EXTRACTED_TEXT_MAX_CHARS': 200000})
+
+    cache.put('abc123', 'first two pages', short)
+    assert cache.get('abc123', short) == 'first two pages'
+    assert cache.get('abc123', full) is None
+
+    # The on-disk tier keys entries the same way
+    reopened = ExtractionCache(str(tmp_path / 'cache.db'))
+    assert reopened.get('abc123', dict(reversed(list(short.items())))) == 'first two pages'
+    assert reopened.get('abc123', full) is None
@@ -0,0 +1,41 @@
+import io
+import zipfile
+
+from werkzeug.datastructures import FileStorage
+
+from utils import sniff_upload, sniff_bytes, rejection_reason, OLE2_MAGIC
+
+def upload(filename, data):
+    return FileStorage(stream=io.BytesIO(data), filename=filename)
+
+def archive(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_file:
+        for name in members:
+            zip_file.writestr(name, 'x' * 100)
+    return buffer.getvalue()
+
+def test_pdf_name_with_zip_body_is_sniffed_by_content():
+    file = upload('resume.pdf', archive(['resume.txt', 'photo.jpg']))
+    assert sniff_upload(file) == 'zip'
+    assert file.stream.tell() == 0
+    assert rejection_reason('zip') == 'File content is not a supported document (detected: zip).'
+
+    # A Word document is accepted whatever it is called
+    assert sniff_upload(upload('resume.pdf', archive(['[Content_Types].xml', 'word/document.xml']))) == 'docx'
+    assert rejection_reason('docx') is None
+
+def test_ole2_doc_is_rejected_with_a_conversion_hint():
+    file_type = sniff_upload(upload('resume.doc', OLE2_MAGIC + b'\x00' * 504))
+    assert file_type == 'ole2'
+    assert rejection_reason(file_type).startswith('Old DOC format detected.')
+
+def test_text_with_a_binary_tail_is_binary():
+    text = b'Skills\nPython SQL Docker\nExperience\nBackend engineer\n' * 20
+    assert sniff_bytes(text) == 'txt'
+    assert sniff_bytes(text + bytes(range(256))) == 'binary'
+    assert rejection_reason('binary') == 'File content is not a supported document (detected: binary).'
+
+def test_empty_file_is_rejected():
+    assert sniff_upload(upload('resume.txt', b'')) == 'empty'
+    assert rejection_reason('empty') == 'The file is empty.'
@@ -0,0 +1,80 @@
+import os
+import datetime
+
+from idf_model import IdfModel
+from jobs import expire_uploads
+from models import ResumeAnalysis
+
+def test_refresh_fits_files_that_finish_out_of_order(db_session, user, preprocessor, add_resume):
+    model = IdfModel()
+    model.refresh_from_database()
+    terraform = model.document_frequencies['terraform']
+
+    analysis = ResumeAnalysis(user.id, 'Data engineer')
+    db_session.add(analysis)
+    db_session.commit()
+    slow = add_resume(analysis, 'Terraform modules written in Go', status='pending')
+    fast = add_resume(analysis, 'Spark pipelines feeding a warehouse')
+
+    assert model.refresh_from_database() == 1
+    assert model.last_resume_id < slow.id
+    assert fast.id in model.fitted_resume_ids
+
+    slow.status = 'processed'
+    db_session.commit()
+
+    assert model.refresh_from_database() == 1
+    assert model.last_resume_id >= fast.id
+    assert model.fitted_resume_ids == set()
+    assert model.refresh_from_database() == 0
+    assert model.document_frequencies['terraform'] == terraform + 1
+
+DOCUMENTS = [['python', 'flask', 'sql'], ['java', 'spring', 'sql'], ['python', 'pandas', 'spark'],
+             ['go', 'kubernetes', 'terraform']]
+
+def fitted(documents):
+    model = IdfModel(min_documents=0)
+    model.partial_fit(documents)
+    model.rebuild()
+    return model
+
+def test_version_is_derived_from_the_fitted_content(tmp_path):
+    first = fitted(DOCUMENTS)
+    assert first.version != 0
+    assert fitted(DOCUMENTS).version == first.version
+    assert fitted(DOCUMENTS[:3]).version != first.version
+
+    # A restarted process loading the same fit agrees on its version
+    first.save(str(tmp_path / 'idf_model.joblib'))
+    reloaded = IdfModel(str(tmp_path / 'idf_model.joblib'))
+    assert reloaded.load()
+    assert reloaded.version == first.version
+    assert IdfModel.from_weights(*first.weights()).version == first.version
+
+def test_expired_upload_stops_holding_back_the_refresh(db_session, user, preprocessor, add_resume, tmp_path):
+    model = IdfModel()
+    model.refresh_from_database()
+
+    analysis = ResumeAnalysis(user.id, 'Data engineer')
+    analysis.state = 'uploading'
+    db_session.add(analysis)
+    db_session.commit()
+    abandoned = add_resume(analysis, '', status='uploading')
+    abandoned.stored_filename = 'abandoned.pdf'
+    abandoned.created_at = datetime.datetime.utcnow() - datetime.timedelta(hours=2)
+    db_session.commit()
+    (tmp_path / 'abandoned.pdf.part').write_bytes(b'%PDF-1.4')
+    os.utime(tmp_path / 'abandoned.pdf.part', (0, 0))
+    later = add_resume(analysis, 'Spark pipelines feeding a warehouse')
+
+    model.refresh_from_database()
+    assert model.last_resume_id < abandoned.id
+
+    assert expire_uploads(str(tmp_path), ttl=3600) == 1
+    assert abandoned.status == 'failed' and abandoned.error == 'upload expired'
+    assert not (tmp_path / 'abandoned.pdf.part').exists()
+    assert analysis.state == 'completed'
+
+    model.refresh_from_database()
+    assert model.last_resume_id >= later.id
+    assert model.fitted_resume_ids == set()
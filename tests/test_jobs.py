@@ -0,0 +1,92 @@
+import jobs
+from models import AnalysisJob, ResumeAnalysis
+
+def start_job(db_session, analysis):
+    job = AnalysisJob(analysis.id)
+    job.status = 'running'
+    db_session.add(job)
+    db_session.commit()
+    return job
+
+def test_job_leaves_files_completed_during_the_run_queued(app, db_session, user, make_analysis, add_resume,
+                                                          monkeypatch):
+    analysis = make_analysis(user, files=2)
+    job = start_job(db_session, analysis)
+
+    def run_analysis(analysis, resume_files, *args, **kwargs):
+        # Another file of the upload completes while this job is running
+        add_resume(analysis, 'Spark pipelines feeding a warehouse', status='pending')
+        return [('resume_0.txt', 1.0)]
+    monkeypatch.setattr(jobs, 'run_analysis', run_analysis)
+
+    assert jobs.run_job(job, app.config)
+    assert job.status == 'done'
+    assert analysis.state == 'queued'
+    assert analysis.jobs.filter_by(status='queued').count() == 1
+
+def test_job_does_not_complete_an_analysis_with_another_live_job(app, db_session, user, make_analysis,
+                                                                 monkeypatch):
+    analysis = make_analysis(user, files=2)
+    job = start_job(db_session, analysis)
+    other = start_job(db_session, analysis)
+    monkeypatch.setattr(jobs, 'run_analysis', lambda *args, **kwargs: [('resume_0.txt', 1.0)])
+
+    assert jobs.run_job(job, app.config)
+    assert analysis.state == 'processing'
+    assert other.status == 'running'
+
+    other.status = 'queued'
+    db_session.commit()
+    assert jobs.run_job(start_job(db_session, analysis), app.config)
+    assert analysis.state == 'queued'
+    assert analysis.jobs.filter_by(status='queued').count() == 1
+
+    assert jobs.run_job(other, app.config)
+    assert analysis.state == 'completed'
+
+RESUMES = [
+    'Backend engineer building Flask services with PostgreSQL, Redis queues and Docker images, '
+    'owning the deployment pipeline, code reviews and the on call rotation for payments',
+    'Data analyst writing pandas notebooks and dashboards for the marketing team',
+    'Frontend developer shipping React components with TypeScript and Storybook',
+    'Site reliability engineer running Kubernetes clusters and Terraform modules',
+    'Backend engineer building Flask services with PostgreSQL, Redis queues and Docker images, '
+    'owning the deployment pipeline, code reviews and the on call rotation for billing',
+]
+
+def run_in_chunks(app, analysis, add_resume, monkeypatch, idf_model):
+    resume_files = [add_resume(analysis, text) for text in RESUMES]
+    scored = []
+
+    def score_resumes_cached(job_document, resume_documents, *args):
+        scored.append(len(resume_documents))
+        return [0.5] * len(resume_documents)
+    monkeypatch.setattr(jobs, 'score_resumes_cached', score_resumes_cached)
+    monkeypatch.setattr(jobs, 'get_idf_model', lambda: idf_model)
+    monkeypatch.setattr(jobs, 'get_lsa_model', lambda: None)
+
+    results = jobs.run_analysis(analysis, resume_files, app.config['UPLOAD_FOLDER'], max_workers=0, chunk_size=2)
+    assert len(results) == len(RESUMES)
+    assert resume_files[4].duplicate_of is resume_files[0]
+    return scored
+
+def test_chunks_score_only_their_new_clusters(app, db_session, user, preprocessor, add_resume, monkeypatch):
+    from idf_model import IdfModel
+
+    analysis = ResumeAnalysis(user.id, 'Backend engineer with Flask and PostgreSQL')
+    db_session.add(analysis)
+    db_session.commit()
+    idf_model = IdfModel(min_documents=0)
+    idf_model.partial_fit([['flask', 'postgresql'], ['react', 'typescript']])
+    idf_model.rebuild()
+
+    # The duplicate in the last chunk reuses the score of its first file
+    assert run_in_chunks(app, analysis, add_resume, monkeypatch, idf_model) == [2, 2]
+
+def test_batch_fitted_scores_are_redone_over_the_batch(app, db_session, user, preprocessor, add_resume,
+                                                       monkeypatch):
+    analysis = ResumeAnalysis(user.id, 'Backend engineer with Flask and PostgreSQL')
+    db_session.add(analysis)
+    db_session.commit()
+
+    assert run_in_chunks(app, analysis, add_resume, monkeypatch, None) == [2, 2, 4]
@@ -0,0 +1,26 @@
+from idf_model import IdfModel
+from lsa_model import LsaModel
+
+DOCUMENTS = [['python', 'flask', 'sql', 'docker'], ['java', 'spring', 'sql', 'oracle'],
+             ['python', 'pandas', 'spark', 'sql'], ['go', 'kubernetes', 'terraform', 'docker'],
+             ['python', 'django', 'postgres', 'docker'], ['rust', 'tokio', 'grpc', 'kubernetes']]
+
+def fitted(documents):
+    idf_model = IdfModel(min_documents=0)
+    idf_model.partial_fit(documents)
+    idf_model.rebuild()
+    model = LsaModel(n_components=2, min_documents=0)
+    model.fit(documents, idf_model)
+    return model
+
+def test_version_is_derived_from_the_fitted_content(tmp_path):
+    first = fitted(DOCUMENTS)
+    assert first.version != 0
+    assert fitted(DOCUMENTS).version == first.version
+    assert fitted(DOCUMENTS[:5]).version != first.version
+    assert first.version < 2 ** 63  # Stored in ResumeFile.embedding_version
+
+    first.save(str(tmp_path / 'lsa_model.joblib'))
+    reloaded = LsaModel(str(tmp_path / 'lsa_model.joblib'))
+    assert reloaded.load()
+    assert reloaded.version == first.version
@@ -0,0 +1,55 @@
+import datetime
+
+import pytest
+
+from models import ResumeAnalysis
+from pagination import keyset_paginate, encode_cursor
+
+def tied_analyses(db_session, user, count):
+    created_at = datetime.datetime(2024, 5, 1, 9, 30)
+    analyses = [ResumeAnalysis(user.id, f"Job description {number}", job_title=f"Opening {number}")
+                for number in range(count)]
+    for analysis in analyses:
+        analysis.created_at = created_at
+    db_session.add_all(analyses)
+    db_session.commit()
+    return analyses
+
+def page(user, after=None, before=None):
+    return keyset_paginate(ResumeAnalysis.query.filter_by(user_id=user.id),
+                           [ResumeAnalysis.created_at, ResumeAnalysis.id], 3, after=after, before=before)
+
+def test_pages_round_trip_across_tied_timestamps(db_session, user):
+    ids = sorted((analysis.id for analysis in tied_analyses(db_session, user, 8)), reverse=True)
+
+    forward = [page(user)]
+    while forward[-1].has_next:
+        forward.append(page(user, after=forward[-1].next_cursor))
+    assert [[analysis.id for analysis in p] for p in forward] == [ids[0:3], ids[3:6], ids[6:8]]
+    assert not forward[0].has_prev
+
+    backward = [forward[-1]]
+    while backward[-1].has_prev:
+        backward.append(page(user, before=backward[-1].prev_cursor))
+    assert [[analysis.id for analysis in p] for p in backward] == [ids[6:8], ids[3:6], ids[0:3]]
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor',
+    'bm90IGpzb24',  # Base64 of something that is not JSON
+    encode_cursor(['2024-05-01T09:30:00']),
+    encode_cursor([20240501, 1]),
+    encode_cursor(['yesterday', 1]),
+    encode_cursor(['2024-05-01T09:30:00', True]),
+    encode_cursor(['2024-05-01T09:30:00', 10 ** 30]),
+])
+def test_tampered_cursor_falls_back_to_the_first_page(db_session, client, user, cursor):
+    analyses = tied_analyses(db_session, user, 2)
+
+    for direction in ('after', 'before'):
+        response = client.get('/history', query_string={direction: cursor})
+        assert response.status_code == 302
+        assert response.headers['Location'].endswith('/history')
+
+        response = client.get(response.headers['Location'])
+        assert response.status_code == 200
+        assert b'Opening 1' in response.data
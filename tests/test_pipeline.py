@@ -0,0 +1,36 @@
+import os
+import time
+import multiprocessing
+
+import pytest
+
+import pipeline
+
+pytestmark = pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(),
+                                reason='the sandbox tests patch the extractor inherited by forked children')
+
+def fake_extract(file_path, options=None):
+    """Misbehave according to the file name"""
+    if file_path == 'slow.pdf':
+        time.sleep(30)
+    elif file_path == 'huge.pdf':
+        bytearray(1024 * 1024 * 1024)
+    elif file_path == 'crash.pdf':
+        os._exit(1)
+    return f"text of {file_path}", ['text'], {}
+
+@pytest.fixture
+def misbehaving_extractor(monkeypatch):
+    monkeypatch.setattr(pipeline, 'extract_and_preprocess', fake_extract)
+
+def test_sandbox_failures_stay_with_their_file(misbehaving_extractor):
+    paths = ['good.pdf', 'slow.pdf', 'huge.pdf', 'crash.pdf', 'other.pdf']
+    started = time.monotonic()
+    results = pipeline.process_files(paths, max_workers=2, timeout=2, memory_limit_mb=64)
+    assert time.monotonic() - started < 20
+
+    assert [result['error_type'] for result in results] == [None, 'timeout', 'memory', 'crashed', None]
+    assert results[0]['text'] == 'text of good.pdf'
+    assert results[4]['text'] == 'text of other.pdf'
+    assert 'timed out after 2 seconds' in results[1]['error']
+    assert '64 MB' in results[2]['error']
@@ -0,0 +1,20 @@
+from preprocessing import TextPreprocessor
+
+TEXT = ('Managed databases and deployed services; the services were monitored by engineers '
+        'running 24/7 on-call rotations, leading teams and writing APIs for payments.')
+
+def uncached_tokens(preprocessor, text):
+    """Tokens lemmatized one by one, without the memoized lemmatizer"""
+    tokens = text.lower().translate(preprocessor.translation_table).split()
+    return [preprocessor.lemmatizer.lemmatize(token) for token in tokens if token not in preprocessor.stop_words]
+
+def test_memoized_lemmas_match_the_uncached_path(preprocessor):
+    expected = uncached_tokens(preprocessor, TEXT)
+    assert preprocessor.tokenize(TEXT) == expected
+    assert preprocessor.tokenize(TEXT) == expected  # Served from the cache
+    assert preprocessor.cache_info().hits > 0
+
+    # A cache smaller than the vocabulary evicts lemmas without changing them
+    small = TextPreprocessor(lemma_cache_size=2)
+    assert small.tokenize(TEXT) == expected
+    assert small.tokenize(TEXT) == expected
@@ -0,0 +1,33 @@
+import pytest
+
+from models import ResumeFile
+from query_budget import QueryBudgetExceeded
+
+@pytest.fixture
+def analyses(db_session, user, make_analysis):
+    """Several 30-file analyses, one migrated from before skill hits were stored"""
+    created = [make_analysis(user, files=30) for _ in range(3)]
+    migrated = make_analysis(user, files=30, skill_hits=False)
+    assert ResumeFile.query.filter_by(analysis_id=migrated.id, skill_hits=None).count() == 30
+    return created + [migrated]
+
+def test_budgets_are_enforced(app):
+    assert app.config['QUERY_BUDGET_ENFORCE']
+
+@pytest.mark.parametrize('path', ['/dashboard', '/history', '/history?count=0'])
+def test_listings_stay_within_budget(client, analyses, path):
+    assert client.get(path).status_code == 200
+
+def test_results_stay_within_budget(client, analyses):
+    for analysis in analyses:
+        assert client.get(f'/analysis/{analysis.id}').status_code == 200
+        assert client.get(f'/analysis/{analysis.id}?page=2').status_code == 200
+
+def test_budget_violation_fails_the_view(app, client, analyses, monkeypatch):
+    # Reading every file's text, as the results page once did for stale skill hits
+    def per_row_reports(analysis, resume_files):
+        return {resume_file.id: {} for resume_file in resume_files if resume_file.extracted_text}
+    monkeypatch.setattr('app.skill_reports', per_row_reports)
+
+    with pytest.raises(QueryBudgetExceeded):
+        client.get(f'/analysis/{analyses[-1].id}')
@@ -0,0 +1,30 @@
+from models import ResumeFile
+from query_budget import QueryCounter
+from jobs import backfill_skill_hits
+from skills import get_skill_matcher
+
+def text_reads(statements):
+    return [statement for statement in statements if 'resume_texts.data' in statement]
+
+def test_results_view_never_reads_resume_text(app, client, user, make_analysis):
+    analysis = make_analysis(user, files=30)
+
+    with QueryCounter() as counter:
+        response = client.get(f'/analysis/{analysis.id}')
+    assert response.status_code == 200
+    assert text_reads(counter.statements) == []
+
+def test_stale_skill_hits_are_skipped_then_backfilled(app, db_session, client, user, make_analysis):
+    if get_skill_matcher() is None:
+        return
+    analysis = make_analysis(user, files=30, skill_hits=False)
+
+    with QueryCounter() as counter:
+        response = client.get(f'/analysis/{analysis.id}')
+    assert response.status_code == 200
+    assert text_reads(counter.statements) == []
+
+    assert backfill_skill_hits(batch_size=7) >= 30
+    stale = ResumeFile.query.filter_by(analysis_id=analysis.id, skill_hits=None).count()
+    assert stale == 0
+    assert backfill_skill_hits() == 0
@@ -0,0 +1,82 @@
+from cache import ScoreCache
+from idf_model import IdfModel
+from lsa_model import LsaModel
+from scoring import score_vectors, section_documents, score_resumes_cached
+from sections import tokenize_sections
+
+CORPUS = [['python', 'flask', 'sql', 'docker'], ['java', 'spring', 'sql', 'oracle'],
+          ['python', 'pandas', 'spark', 'sql'], ['go', 'kubernetes', 'terraform', 'docker'],
+          ['nurse', 'hospital', 'patient', 'care'], ['teacher', 'school', 'classroom', 'pupil'],
+          ['python', 'django', 'postgres', 'docker'], ['accountant', 'ledger', 'audit', 'tax']]
+
+SKILLS_MATCH = {'skills': ['python', 'flask', 'docker'], 'experience': ['nurse', 'hospital', 'patient']}
+EXPERIENCE_MATCH = {'skills': ['nurse', 'hospital', 'patient'], 'experience': ['python', 'flask', 'docker']}
+
+RESUMES = ['Skills\nPython Flask Docker\nExperience\nBackend engineer',
+           'Skills\nJava Spring Oracle\nExperience\nPlatform engineer']
+
+WEIGHTS = {'skills': 0.7, 'education': 0.0, 'experience': 0.3, 'certifications': 0.0}
+
+def idf_model(corpus=CORPUS):
+    model = IdfModel(min_documents=0)
+    model.partial_fit(corpus)
+    model.rebuild()
+    return model
+
+def lsa_model():
+    model = LsaModel(n_components=3, min_documents=0)
+    model.fit(CORPUS, idf_model())
+    return model
+
+def test_score_vectors_applies_section_weights():
+    model = lsa_model()
+    job_vector = model.transform([['python', 'flask', 'docker']])[0]
+    resume_sections = [SKILLS_MATCH, EXPERIENCE_MATCH]
+    whole = [sections['skills'] + sections['experience'] for sections in resume_sections]
+    vectors = model.transform(whole)
+    section_vectors = model.transform(section_documents(resume_sections))
+
+    unweighted = score_vectors(job_vector, vectors)
+    assert unweighted[0] == unweighted[1]  # Same words, same whole-resume vector
+
+    skills_first = {'skills': 0.9, 'education': 0.0, 'experience': 0.1, 'certifications': 0.0}
+    scores = score_vectors(job_vector, vectors, section_vectors, resume_sections, skills_first)
+    assert scores[0] > scores[1]
+
+    experience_first = {'skills': 0.1, 'education': 0.0, 'experience': 0.9, 'certifications': 0.0}
+    scores = score_vectors(job_vector, vectors, section_vectors, resume_sections, experience_first)
+    assert scores[1] > scores[0]
+
+def cached_scores(preprocessor, model, cache, resumes=RESUMES):
+    documents, sections = zip(*(tokenize_sections(text, preprocessor) for text in resumes))
+    return score_resumes_cached(preprocessor.tokenize('Python developer with Flask and Docker'), list(documents),
+                                model, cache, WEIGHTS, list(sections))
+
+def test_score_cache_hits_identical_documents(preprocessor):
+    model, cache = idf_model(), ScoreCache()
+    first = cached_scores(preprocessor, model, cache)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    assert cached_scores(preprocessor, model, cache) == first
+    assert (cache.hits, cache.misses) == (2, 2)
+
+def test_score_cache_misses_after_the_model_changes(preprocessor):
+    cache = ScoreCache()
+    cached_scores(preprocessor, idf_model(), cache)
+
+    refitted = idf_model(CORPUS + [['python', 'fastapi', 'docker', 'redis']])
+    cached_scores(preprocessor, refitted, cache)
+    assert (cache.hits, cache.misses) == (0, 4)
+    assert cache.model_version.endswith(str(refitted.version))
+
+def test_score_cache_misses_when_sections_differ(preprocessor):
+    model, cache = idf_model(), ScoreCache()
+    tokens = preprocessor.tokenize('Python Flask Docker nurse hospital')
+    in_skills = {'skills': tokens[:3], 'experience': tokens[3:]}
+    in_experience = {'skills': tokens[3:], 'experience': tokens[:3]}
+    job = preprocessor.tokenize('Python developer with Flask and Docker')
+
+    first = score_resumes_cached(job, [tokens], model, cache, WEIGHTS, [in_skills])
+    second = score_resumes_cached(job, [tokens], model, cache, WEIGHTS, [in_experience])
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert first[0] > second[0]
@@ -0,0 +1,49 @@
+import fitz
+
+from utils import extract_text_from_file, validate_extracted_text
+from sections import split_sections
+from cache import ScoreCache
+
+RESUME_LINES = [
+    'Jane Doe',
+    'Summary',
+    'Backend developer with eight years of experience.',
+    'Skills',
+    'Python, Flask, SQL, Docker',
+    'Experience',
+    'Senior Engineer at Example Corp, 2018 - 2024',
+    'Education',
+    'BSc Computer Science, Example University',
+]
+
+def found_sections(text):
+    return {section for section, _ in split_sections(text)}
+
+def test_validated_text_keeps_line_breaks():
+    text = validate_extracted_text('Skills  \n\n  Python \t SQL\nExperience\n' + 'x' * 60)
+    assert text == 'Skills\nPython SQL\nExperience'
+
+def test_sections_found_in_extracted_txt(tmp_path):
+    path = tmp_path / 'resume.txt'
+    path.write_text('\n'.join(RESUME_LINES), encoding='utf-8')
+
+    sections = found_sections(extract_text_from_file(str(path)))
+    assert {'skills', 'experience', 'education'} <= sections
+
+def test_sections_found_in_extracted_pdf(tmp_path):
+    path = tmp_path / 'resume.pdf'
+    with fitz.open() as doc:
+        page = doc.new_page()
+        for number, line in enumerate(RESUME_LINES):
+            page.insert_text((72, 72 + 18 * number), line)
+        doc.save(str(path))
+
+    sections = found_sections(extract_text_from_file(str(path)))
+    assert {'skills', 'experience', 'education'} <= sections
+
+def test_score_cache_hash_covers_sections():
+    tokens = ['python', 'sql', 'engineer']
+    as_skills = ScoreCache.hash_document(tokens, {'skills': ['python', 'sql'], 'experience': ['engineer']})
+    as_experience = ScoreCache.hash_document(tokens, {'experience': tokens})
+    assert as_skills != as_experience
+    assert ScoreCache.hash_document(tokens) != as_skills
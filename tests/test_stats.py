@@ -0,0 +1,51 @@
+import datetime
+
+from models import db, ResumeAnalysis, ResumeFile, DailyStats
+from stats import StatsRollup, get_totals
+
+def analysis_at(make_analysis, user, created_at, files=2):
+    analysis = make_analysis(user, files=files)
+    analysis.created_at = created_at
+    db.session.commit()
+    return analysis
+
+def direct_counts(user):
+    """Per-day (analyses, resumes) counted straight from the analyses"""
+    counts = {}
+    for analysis in ResumeAnalysis.query.filter_by(user_id=user.id):
+        day = counts.setdefault(analysis.created_at.date(), [0, 0])
+        day[0] += 1
+        day[1] += ResumeFile.query.filter_by(analysis_id=analysis.id).count()
+    return counts
+
+def rolled_up_counts(user):
+    return {row.day: [row.analysis_count, row.resume_count]
+            for row in DailyStats.query.filter_by(user_id=user.id) if row.analysis_count}
+
+def assert_matches_direct_count(user):
+    counts = direct_counts(user)
+    assert rolled_up_counts(user) == counts
+    totals = get_totals(user.id)
+    assert [totals.analysis_count, totals.resume_count] == [sum(c[0] for c in counts.values()),
+                                                            sum(c[1] for c in counts.values())]
+
+def test_rollup_matches_direct_counts(db_session, user, make_analysis):
+    midnight = datetime.datetime.combine(datetime.datetime.utcnow().date(), datetime.time.min)
+    rollup = StatsRollup()
+
+    analysis_at(make_analysis, user, midnight - datetime.timedelta(hours=20))
+    late = analysis_at(make_analysis, user, midnight - datetime.timedelta(minutes=10), files=3)
+    rollup.run()
+    assert_matches_direct_count(user)
+
+    # Analyses added on both sides of the day boundary
+    analysis_at(make_analysis, user, midnight - datetime.timedelta(minutes=5))
+    analysis_at(make_analysis, user, midnight + datetime.timedelta(minutes=5), files=4)
+    rollup.run()
+    assert_matches_direct_count(user)
+
+    # A deletion within the recomputed days
+    db_session.delete(late)
+    db_session.commit()
+    rollup.run()
+    assert_matches_direct_count(user)
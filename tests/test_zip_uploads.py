@@ -0,0 +1,48 @@
+import io
+import os
+import zipfile
+
+from models import ScoringWeights
+
+MEMBER_TEXT = 'Skills\nPython SQL Docker\nExperience\nBackend engineer {number}\n' + 'x' * 4000
+
+def resume_archive(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for number in range(members):
+            archive.writestr(f"resume_{number}.txt", MEMBER_TEXT.format(number=number))
+    buffer.seek(0)
+    return buffer
+
+def test_archive_members_beyond_memory_budget_are_saved(app, db_session, client, user, monkeypatch, tmp_path):
+    weights = ScoringWeights(user.id, 'Default', {'skills': 0.4, 'education': 0.2, 'experience': 0.3,
+                                                  'certifications': 0.1})
+    db_session.add(weights)
+    db_session.commit()
+
+    received = {}
+    def run_analysis(analysis, resume_files, upload_folder, in_memory_uploads=None, **kwargs):
+        received['files'] = [(f.stored_filename, f.content_hash) for f in resume_files]
+        received['in_memory'] = {f.stored_filename for f in in_memory_uploads}
+        received['in_memory_bytes'] = sum(len(upload.data) for upload in in_memory_uploads.values())
+        return []
+    monkeypatch.setattr('app.run_analysis', run_analysis)
+
+    folder = tmp_path / 'uploads'
+    folder.mkdir()
+    budget = 3 * len(MEMBER_TEXT)
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(folder))
+    monkeypatch.setitem(app.config, 'IN_MEMORY_UPLOADS_MAX_BYTES', budget)
+
+    client.post('/analyze', data={
+        'job_title': 'Backend Developer',
+        'job_description': 'Python developer with SQL and Docker experience ' * 3,
+        'weights_id': weights.id,
+        'resume_files': [(resume_archive(10), 'resumes.zip')],
+    }, content_type='multipart/form-data')
+
+    assert len(received['files']) == 10
+    assert 0 < received['in_memory_bytes'] <= budget
+    on_disk = {name for name, _ in received['files']} - received['in_memory']
+    assert len(on_disk) >= 7
+    assert all(os.path.exists(folder / name) for name in on_disk)
@@ -1,15 +1,85 @@
 import os
+import hashlib
 import logging
+import zlib
+import zipfile
 import mimetypes
+from io import BytesIO
 from pathlib import Path
+from collections import namedtuple
 
 # Specific file format libraries
 import fitz  # PyMuPDF for PDF files
 import docx  # python-docx for DOCX files
+from lxml import etree  # Streaming parser for the DOCX fast path
 
 # Configure logging
 logger = logging.getLogger('resume_analyzer.utils')
 
+# Bump whenever extraction output changes, to invalidate cached text
+EXTRACTOR_VERSION = 5
+
+# Default extraction limits; a resume never needs more than this
+MAX_PDF_PAGES = 50
+MAX_EXTRACTED_CHARS = 200000
+
+# An upload held in memory instead of being saved to disk first
+InMemoryUpload = namedtuple('InMemoryUpload', ['filename', 'data'])
+
+def buffer_upload(file_storage, file_path, max_memory_bytes=0, chunk_size=64 * 1024):
+    """
+    Read an uploaded file while hashing it in the same pass.
+    Files up to max_memory_bytes are kept in memory; larger files are
+    written to file_path as they are read.
+    Returns a tuple of (size in bytes, SHA-256 hex digest, data), where
+    data is None when the file was written to disk.
+    """
+    digest = hashlib.sha256()
+    chunks = []
+    size = 0
+    out = None
+    
+    try:
+        while True:
+            chunk = file_storage.stream.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+            
+            if out is None and size > max_memory_bytes:
+                # Too large for memory: spill what was buffered so far to disk
+                out = open(file_path, 'wb')
+                out.writelines(chunks)
+                chunks = []
+            
+            if out is None:
+                chunks.append(chunk)
+            else:
+                out.write(chunk)
+    finally:
+        if out is not None:
+            out.close()
+    
+    data = b''.join(chunks) if out is None else None
+    return size, digest.hexdigest(), data
+
+def save_upload(file_storage, file_path, chunk_size=64 * 1024):
+    """
+    Save an uploaded file while hashing it in the same pass.
+    Returns a tuple of (size in bytes, SHA-256 hex digest)
+    """
+    size, content_hash, data = buffer_upload(file_storage, file_path, chunk_size=chunk_size)
+    if data is not None:
+        # Empty upload; still create the file
+        write_upload(file_path, data)
+    return size, content_hash
+
+def write_upload(file_path, data):
+    """Persist an in-memory upload"""
+    with open(file_path, 'wb') as out:
+        out.write(data)
+
 def detect_file_type(file_path):
     """
     Detect file type using file extension and MIME type.
@@ -22,16 +92,205 @@ def detect_file_type(file_path):
     
     return file_ext, mime_type
 
+# Number of leading bytes inspected by the content sniffer
+SNIFF_BYTES = 8192
+
+# Detected types that have an extractor
+SUPPORTED_TYPES = {'pdf', 'docx', 'txt'}
+
+PDF_MAGIC = b'%PDF-'
+ZIP_MAGIC = b'PK\x03\x04'
+OLE2_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+RTF_MAGIC = b'{\\rtf'
+
+def _looks_like_text(head):
+    """Heuristic: no NUL bytes and decodes as UTF-8 or mostly printable Latin-1"""
+    if not head or b'\x00' in head:
+        return False
+    try:
+        # A multi-byte character may be cut off at the end of the sample
+        head.decode('utf-8')
+        return True
+    except UnicodeDecodeError as e:
+        if e.start >= len(head) - 3:
+            return True
+    printable = sum(1 for byte in head if byte >= 32 or byte in (9, 10, 13))
+    return printable / len(head) > 0.95
+
+def _zip_document_type(names):
+    """Name the OOXML document type of a ZIP from its member names"""
+    names = list(names)
+    if any(name.startswith('word/') for name in names):
+        return 'docx'
+    if any(name.startswith('xl/') for name in names):
+        return 'xlsx'
+    if any(name.startswith('ppt/') for name in names):
+        return 'pptx'
+    return 'zip'
+
+def sniff_file_type(head, source=None):
+    """
+    Detect the real type of a file from its leading bytes.
+    
+    Args:
+        head: The first SNIFF_BYTES bytes of the file
+        source: Optional path or bytes of the whole file, used to read the
+            ZIP central directory when the head does not reveal an OOXML part
+    
+    Returns:
+        One of 'pdf', 'docx', 'xlsx', 'pptx', 'zip', 'ole2', 'rtf', 'txt',
+        'binary' or 'empty'
+    """
+    if not head:
+        return 'empty'
+    
+    # PDF readers accept the header anywhere in the first KB
+    if PDF_MAGIC in head[:1024]:
+        return 'pdf'
+    
+    if head.startswith(ZIP_MAGIC):
+        # Local file headers name the first members; word/ usually shows up early
+        if b'word/' in head:
+            return 'docx'
+        if source is not None:
+            try:
+                archive_source = BytesIO(source) if isinstance(source, bytes) else source
+                with zipfile.ZipFile(archive_source) as archive:
+                    return _zip_document_type(archive.namelist())
+            except zipfile.BadZipFile:
+                return 'binary'
+        return 'zip'
+    
+    if head.startswith(OLE2_MAGIC):
+        return 'ole2'
+    
+    if head.startswith(RTF_MAGIC):
+        return 'rtf'
+    
+    return 'txt' if _looks_like_text(head) else 'binary'
+
+def sniff_upload(file_storage):
+    """Sniff an uploaded file without consuming its stream"""
+    stream = file_storage.stream
+    position = stream.tell()
+    head = stream.read(SNIFF_BYTES)
+    
+    source = None
+    if head.startswith(ZIP_MAGIC) and b'word/' not in head:
+        # Only a ZIP whose first members are not Word parts needs the full file
+        stream.seek(position)
+        source = BytesIO(stream.read())
+    
+    stream.seek(position)
+    return sniff_file_type(head, source)
+
+def rejection_reason(detected_type):
+    """User-facing reason why a detected type cannot be analyzed, or None"""
+    if detected_type in SUPPORTED_TYPES:
+        return None
+    if detected_type == 'ole2':
+        return ("Old DOC format detected. Please convert the file to DOCX "
+                "using Microsoft Word or LibreOffice and upload again.")
+    if detected_type == 'empty':
+        return "The file is empty."
+    return f"File content is not a supported document (detected: {detected_type})."
+
+def sniff_bytes(data):
+    """Sniff an in-memory file"""
+    return sniff_file_type(data[:SNIFF_BYTES], data)
+
+# Limits applied to uploaded ZIP archives of resumes
+ZIP_MAX_MEMBERS = 500
+ZIP_MAX_UNCOMPRESSED_BYTES = 200 * 1024 * 1024
+ZIP_MAX_COMPRESSION_RATIO = 100
+
+def iter_zip_members(stream, allowed_extensions, max_members=ZIP_MAX_MEMBERS,
+                     max_total_bytes=ZIP_MAX_UNCOMPRESSED_BYTES, max_ratio=ZIP_MAX_COMPRESSION_RATIO):
+    """
+    Read the files of an uploaded ZIP archive one member at a time.
+
+    Nothing is unpacked to disk. Each member is decompressed into memory
+    with a bounded read, so a member whose header understates its size
+    cannot get past the uncompressed-size limit.
+
+    Args:
+        stream: Seekable file object holding the archive
+        allowed_extensions: Extensions of members worth reading
+        max_members: Maximum number of files in the archive
+        max_total_bytes: Maximum uncompressed size of all members read
+        max_ratio: Maximum uncompressed/compressed ratio of a member
+
+    Yields:
+        (filename, data, reason) tuples; data is None and reason says why
+        when a member is skipped
+
+    Raises:
+        ValueError: If the archive cannot be read or has too many files
+    """
+    try:
+        archive = zipfile.ZipFile(stream)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise ValueError(f"Not a valid ZIP archive: {e}")
+
+    with archive:
+        members = [info for info in archive.infolist()
+                   if not info.is_dir() and not info.filename.startswith('__MACOSX/')]
+        if len(members) > max_members:
+            raise ValueError(f"Archive contains {len(members)} files; the limit is {max_members}.")
+
+        remaining = max_total_bytes
+        for info in members:
+            name = os.path.basename(info.filename)
+            if not name or name.startswith('.'):
+                continue  # Hidden files and OS metadata
+
+            extension = name.rsplit('.', 1)[1].lower() if '.' in name else ''
+            if extension not in allowed_extensions or extension == 'zip':
+                yield name, None, "Unsupported file extension."
+                continue
+            if info.flag_bits & 0x1:
+                yield name, None, "File is encrypted."
+                continue
+            if info.compress_size and info.file_size / info.compress_size > max_ratio:
+                yield name, None, f"Compression ratio exceeds {max_ratio}:1."
+                continue
+            if info.file_size > remaining:
+                yield name, None, f"Archive exceeds the {max_total_bytes // (1024 * 1024)} MB uncompressed limit."
+                continue
+
+            try:
+                with archive.open(info) as member:
+                    data = member.read(remaining + 1)
+            except (zipfile.BadZipFile, NotImplementedError, RuntimeError, EOFError, zlib.error) as e:
+                logger.warning(f"Unreadable archive member {info.filename}: {e}")
+                yield name, None, "File is corrupt or uses an unsupported compression method."
+                continue
+
+            if len(data) > remaining:
+                yield name, None, f"Archive exceeds the {max_total_bytes // (1024 * 1024)} MB uncompressed limit."
+                continue
+
+            remaining -= len(data)
+            yield name, data, None
+
 def validate_extracted_text(text):
     """
     Validate the extracted text to ensure it's not empty or corrupted.
-    Returns cleaned text.
+    Accepts a string or an iterable of text chunks (e.g. PDF pages),
+    so a stream can be cleaned without first joining it into one string.
+    Returns cleaned text: whitespace is collapsed within each line and
+    blank lines are dropped, but line breaks are kept so section headings
+    stay on lines of their own (see sections.split_sections).
     """
     if not text:
         return ""
     
+    chunks = [text] if isinstance(text, str) else text
+    
     # Remove extremely long words (likely parsing errors)
-    cleaned_text = ' '.join(word for word in text.split() if len(word) < 50)
+    lines = (' '.join(word for word in line.split() if len(word) < 50)
+             for chunk in chunks for line in chunk.splitlines())
+    cleaned_text = '\n'.join(line for line in lines if line)
     
     # Check if text is too short
     if len(cleaned_text.strip()) < 10:
@@ -39,34 +298,143 @@ def validate_extracted_text(text):
     
     return cleaned_text
 
-def extract_text_from_pdf(file_path):
-    """Extract text from PDF files using PyMuPDF"""
-    text = ""
+def open_pdf(source):
+    """Open a PDF from a path, bytes or a binary file-like object"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=bytes(source), filetype='pdf')
+    if hasattr(source, 'read'):
+        return fitz.open(stream=source.read(), filetype='pdf')
+    return fitz.open(source)
+
+def iter_pdf_pages(source, max_pages=MAX_PDF_PAGES, max_chars=MAX_EXTRACTED_CHARS):
+    """
+    Yield the text of each PDF page using PyMuPDF.
+    Stops after max_pages pages or once max_chars characters were yielded,
+    so an oversized document is never parsed in full.
+    """
+    name = source if isinstance(source, str) else '<buffer>'
     try:
-        with fitz.open(file_path) as doc:
-            for page in doc:
-                text += page.get_text()
-        return text
+        with open_pdf(source) as doc:
+            collected = 0
+            for page_number, page in enumerate(doc):
+                if max_pages and page_number >= max_pages:
+                    logger.info(f"Stopped PDF extraction of {name} at page limit ({max_pages} of {doc.page_count})")
+                    break
+                
+                page_text = page.get_text()
+                if max_chars and collected + len(page_text) > max_chars:
+                    yield page_text[:max_chars - collected]
+                    logger.info(f"Stopped PDF extraction of {name} at character limit ({max_chars})")
+                    break
+                
+                collected += len(page_text)
+                yield page_text
     except Exception as e:
-        logger.error(f"Error extracting text from PDF {file_path}: {e}")
+        logger.error(f"Error extracting text from PDF {name}: {e}")
         raise ValueError(f"Could not extract text from PDF: {str(e)}")
 
-def extract_text_from_docx(file_path):
-    """Extract text from DOCX files using python-docx"""
-    text = ""
-    try:
-        doc = docx.Document(file_path)
-        for para in doc.paragraphs:
-            text += para.text + "\n"
-        
-        # Also get text from tables
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    text += cell.text + " "
-                text += "\n"
+def extract_text_from_pdf(file_path, max_pages=MAX_PDF_PAGES, max_chars=MAX_EXTRACTED_CHARS):
+    """Extract text from PDF files (path or in-memory buffer) using PyMuPDF"""
+    return ''.join(iter_pdf_pages(file_path, max_pages=max_pages, max_chars=max_chars))
+
+# WordprocessingML element names used by the DOCX fast path
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_TEXT = W_NS + 't'
+W_TAB = W_NS + 'tab'
+W_RUN = W_NS + 'r'
+W_BREAKS = (W_NS + 'br', W_NS + 'cr')
+W_PARAGRAPH = W_NS + 'p'
+W_TABLE_ROW = W_NS + 'tr'
+W_TABLE_CELL = W_NS + 'tc'
+
+def extract_text_from_docx_xml(source, max_chars=MAX_EXTRACTED_CHARS):
+    """
+    Extract text from a DOCX file by streaming word/document.xml with lxml.
+    Paragraph and table text is emitted in document order; cells are
+    separated by spaces and rows by newlines. Parsed elements are cleared
+    as soon as they are consumed, so memory stays flat on large documents.
+    """
+    parts = []
+    collected = 0
+    cell_depth = 0
+    
+    with zipfile.ZipFile(source) as archive:
+        with archive.open('word/document.xml') as document_xml:
+            tags = (W_TEXT, W_TAB, W_PARAGRAPH, W_TABLE_ROW, W_TABLE_CELL) + W_BREAKS
+            for event, elem in etree.iterparse(document_xml, events=('start', 'end'), tag=tags):
+                tag = elem.tag
                 
-        return text
+                if tag == W_TABLE_CELL:
+                    cell_depth += 1 if event == 'start' else -1
+                    continue
+                if event == 'start':
+                    continue
+                
+                if tag == W_TEXT:
+                    if elem.text:
+                        parts.append(elem.text)
+                        collected += len(elem.text)
+                elif tag == W_TAB:
+                    # Tab stop definitions (w:pPr/w:tabs/w:tab) are not text
+                    if elem.getparent().tag == W_RUN:
+                        parts.append('\t')
+                elif tag in W_BREAKS:
+                    parts.append('\n')
+                else:
+                    # End of a paragraph or table row
+                    if tag == W_PARAGRAPH:
+                        parts.append(' ' if cell_depth else '\n')
+                    else:
+                        parts.append('\n')
+                    
+                    # Free everything parsed so far
+                    elem.clear()
+                    parent = elem.getparent()
+                    if parent is not None:
+                        while elem.getprevious() is not None:
+                            del parent[0]
+                
+                if max_chars and collected >= max_chars:
+                    logger.info(f"Stopped DOCX extraction at character limit ({max_chars})")
+                    break
+    
+    return ''.join(parts)
+
+def extract_text_from_docx_python_docx(source):
+    """Extract text from DOCX files using the python-docx object model"""
+    parts = []
+    doc = docx.Document(source)
+    for para in doc.paragraphs:
+        parts.append(para.text + "\n")
+    
+    # Also get text from tables; merged cells are returned once per grid
+    # position, so skip the repeats
+    for table in doc.tables:
+        for row in table.rows:
+            seen_cells = set()
+            for cell in row.cells:
+                if id(cell._tc) in seen_cells:
+                    continue
+                seen_cells.add(id(cell._tc))
+                parts.append(cell.text + " ")
+            parts.append("\n")
+    
+    return ''.join(parts)
+
+def extract_text_from_docx(file_path, max_chars=MAX_EXTRACTED_CHARS):
+    """
+    Extract text from DOCX files (path or binary file-like object).
+    Uses the streaming XML fast path and falls back to python-docx.
+    """
+    try:
+        return extract_text_from_docx_xml(file_path, max_chars=max_chars)
+    except Exception as e:
+        logger.warning(f"Fast DOCX extraction failed, falling back to python-docx: {e}")
+        if hasattr(file_path, 'seek'):
+            file_path.seek(0)
+    
+    try:
+        return extract_text_from_docx_python_docx(file_path)
     except Exception as e:
         logger.error(f"Error extracting text from DOCX {file_path}: {e}")
         raise ValueError(f"Could not extract text from DOCX: {str(e)}")
@@ -80,27 +448,37 @@ def extract_text_from_doc(file_path):
     )
     raise ValueError(message)
 
-def extract_text_from_txt(file_path):
-    """Extract text from plain text files"""
+def extract_text_from_txt(file_path, max_chars=MAX_EXTRACTED_CHARS):
+    """Extract text from plain text files (path or bytes)"""
+    if isinstance(file_path, (bytes, bytearray)):
+        # UTF-8 needs at most 4 bytes per character
+        data = bytes(file_path[:max_chars * 4]) if max_chars else bytes(file_path)
+        text = data.decode('utf-8', errors='replace')
+        return text[:max_chars] if max_chars else text
+    
+    limit = max_chars or -1
     try:
         with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
-            return file.read()
+            return file.read(limit)
     except Exception as e:
         try:
             # Try alternate encoding if utf-8 fails
             with open(file_path, 'r', encoding='latin-1') as file:
-                return file.read()
+                return file.read(limit)
         except Exception as e2:
             logger.error(f"Error extracting text from TXT {file_path}: {e2}")
             raise ValueError(f"Could not extract text from TXT: {str(e2)}")
 
-def extract_text_from_file(file_path):
+def extract_text_from_file(file_path, max_pages=MAX_PDF_PAGES, max_chars=MAX_EXTRACTED_CHARS):
     """
     Extract text from various file formats.
-    Supports PDF, DOCX, DOC, and TXT files.
+    Supports PDF, DOCX and TXT files; the format is detected from the
+    file content rather than the extension.
     
     Args:
-        file_path: Path to the file
+        file_path: Path to the file, or an InMemoryUpload
+        max_pages: Maximum number of PDF pages to read
+        max_chars: Character budget for PDF, DOCX and TXT extraction
     
     Returns:
         Extracted text as string
@@ -108,36 +486,51 @@ def extract_text_from_file(file_path):
     Raises:
         ValueError: If file format is unsupported or text extraction fails
     """
-    if not os.path.exists(file_path):
-        logger.error(f"File does not exist: {file_path}")
-        raise FileNotFoundError(f"File not found: {file_path}")
+    if isinstance(file_path, InMemoryUpload):
+        # Extractors read straight from the uploaded bytes
+        name, source = file_path.filename, file_path.data
+    else:
+        if not os.path.exists(file_path):
+            logger.error(f"File does not exist: {file_path}")
+            raise FileNotFoundError(f"File not found: {file_path}")
+        name, source = file_path, file_path
     
-    # Detect file type
-    file_ext, mime_type = detect_file_type(file_path)
+    # Detect the real file type from the content; the extension may lie
+    if isinstance(source, bytes):
+        head = source[:SNIFF_BYTES]
+    else:
+        with open(source, 'rb') as f:
+            head = f.read(SNIFF_BYTES)
+    file_type = sniff_file_type(head, source)
+    extension, _ = detect_file_type(name)
+    if file_type != extension:
+        logger.info(f"File {name} has extension '{extension}' but content type '{file_type}'")
     
     # Extract text based on file type
     try:
-        if file_ext == 'pdf':
-            text = extract_text_from_pdf(file_path)
-        elif file_ext == 'docx':
-            text = extract_text_from_docx(file_path)
-        elif file_ext == 'doc':
+        if file_type == 'pdf':
+            # Pages are streamed straight into validation
+            text = iter_pdf_pages(source, max_pages=max_pages, max_chars=max_chars)
+        elif file_type == 'docx':
+            docx_source = BytesIO(source) if isinstance(source, bytes) else source
+            text = extract_text_from_docx(docx_source, max_chars=max_chars)
+        elif file_type == 'ole2':
             # Will raise a user-friendly error suggesting conversion
-            text = extract_text_from_doc(file_path)
-        elif file_ext == 'txt':
-            text = extract_text_from_txt(file_path)
+            text = extract_text_from_doc(name)
+        elif file_type == 'txt':
+            text = extract_text_from_txt(source, max_chars=max_chars)
         else:
-            logger.error(f"Unsupported file format: {file_ext}")
-            raise ValueError(f"Unsupported file format: {file_ext}")
+            logger.error(f"Unsupported file format: {file_type}")
+            raise ValueError(rejection_reason(file_type))
         
         # Validate and clean the extracted text
         text = validate_extracted_text(text)
         
         # Log text length
-        logger.info(f"Extracted {len(text)} characters from {file_path}")
+        logger.info(f"Extracted {len(text)} characters from {name}")
         
         return text
     
     except Exception as e:
-        logger.error(f"Error extracting text from {file_path}: {e}")
+        logger.error(f"Error extracting text from {name}: {e}")
         raise ValueError(f"Error extracting text: {str(e)}")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Resume Analyzer Background Worker
+Processes analyses queued by /analyze in background mode:
+1. Claims the oldest queued job from the database
+2. Extracts, preprocesses and scores its resume files chunk by chunk
+3. Records per-file progress so the status endpoint can report it
+
+Run one or more workers next to the web server:
+    python worker.py [--once] [--poll-interval SECONDS]
+"""
+
+import os
+import sys
+import time
+import socket
+import logging
+import argparse
+
+from app import app
+from models import db
+from idf_model import get_idf_model
+from lsa_model import get_lsa_model
+from stats import get_stats_rollup
+from jobs import claim_next_job, run_job, requeue_stale_jobs, expire_uploads
+
+logger = logging.getLogger('resume_analyzer.worker')
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Process queued resume analyses')
+    parser.add_argument('--once', action='store_true',
+                        help='Process the queued jobs and exit instead of polling')
+    parser.add_argument('--poll-interval', type=float,
+                        default=app.config['ANALYSIS_JOB_POLL_INTERVAL'],
+                        help='Seconds to wait between polls when the queue is empty')
+    return parser.parse_args()
+
+def main():
+    """Main worker loop"""
+    args = parse_args()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Worker {worker_id} started")
+
+    with app.app_context():
+        while True:
+            try:
+                requeue_stale_jobs(app.config['ANALYSIS_JOB_STALE_AFTER'])
+                if expire_uploads(app.config['UPLOAD_FOLDER'], app.config['CHUNKED_UPLOAD_TTL']):
+                    # Expired files no longer hold back the IDF model
+                    get_idf_model().schedule_refresh(app)
+                job = claim_next_job(worker_id)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error polling job queue: {e}")
+                job = None
+
+            if job is not None:
+                logger.info(f"Worker {worker_id} claimed job {job.id} (analysis {job.analysis_id})")
+                if run_job(job, app.config):
+                    # Fold the new resumes into the corpus IDF and LSA models and the statistics
+                    get_idf_model().schedule_refresh(app)
+                    if get_lsa_model() is not None:
+                        get_lsa_model().schedule_fit(app)
+                    get_stats_rollup().schedule(app, force=True)
+                db.session.remove()
+                continue
+
+            if args.once:
+                break
+
+            time.sleep(args.poll_interval)
+
+    logger.info(f"Worker {worker_id} stopped")
+    return 0
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        sys.exit(0)